@@ -1,14 +1,60 @@
 # app/main.py
+import time
+_import_started = time.perf_counter()
+
 import os
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from dotenv import load_dotenv
 
 load_dotenv()  # loads .env in project root if present
 
 from fastapi.middleware.cors import CORSMiddleware
-
-app = FastAPI(title="VesakCare API")
+from app.services.metrics import TimingMiddleware
+from app.services.assets import static_assets
+from app.services.sessions import require_session
+from app.services.startup import startup_report, warm_up
+from app.services.events import standin_publisher
+from app.services.renderer import shutdown_pool
+from app.services.audit import audit_log
+from app.services.resilience import UpstreamUnavailable, upstream_cause
+
+logger = logging.getLogger("vesak.startup")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Upstream DNS/TLS + cache prefetch runs while the frontend is read and hashed
+    warming = asyncio.create_task(warm_up())
+    loaded = time.perf_counter()
+    await asyncio.to_thread(static_assets.load)
+    startup_report.record("static_load", loaded)
+    await warming
+    startup_report.record("lifespan", started)
+    startup_report.ready_at = time.time()
+    logger.info("startup ready: %s", startup_report.phases)
+    # gzip/brotli variants are CPU heavy; build them after we start serving
+    compressing = asyncio.create_task(asyncio.to_thread(static_assets.compress))
+    if standin_publisher:
+        standin_publisher.start()
+    audit_log.start()
+    yield
+    if standin_publisher:
+        await standin_publisher.stop()
+    # Store queued audit entries while the upstream client is still open
+    await audit_log.stop()
+    await compressing
+    shutdown_pool()  # PDF render workers
+    # Release pooled upstream connections on shutdown
+    from app.services.supabase_client import close_client
+    await close_client()
+
+app = FastAPI(title="VesakCare API", lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -25,53 +71,99 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Idempotent-Replayed"],
 )
 
+# Added last so it wraps CORS too: per-route latency + Server-Timing header
+app.add_middleware(TimingMiddleware)
+
+# Supabase unreachable (deadline, circuit open, connection errors) is a 503 with
+# Retry-After, including where a router wrapped the error in a 400 / 500 / 502
+def unavailable(error: UpstreamUnavailable) -> JSONResponse:
+    return JSONResponse({"detail": f"Service temporarily unavailable: {error}"}, status_code=503,
+                        headers={"Retry-After": str(int(error.retry_after))})
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    return unavailable(exc)
+
+@app.exception_handler(StarletteHTTPException)
+async def http_error_handler(request: Request, exc: StarletteHTTPException):
+    cause = upstream_cause(exc) if exc.status_code in (400, 500, 502) else None
+    if cause is not None:
+        return unavailable(cause)
+    return await http_exception_handler(request, exc)
+
+# Every API router except /api/auth requires a verified session token
+authenticated = [Depends(require_session)]
+
 # Import routers (these will be created next)
 from app.routers.clients import router as clients_router
 from app.routers.invoices import router as invoices_router
 from app.routers.documents import router as documents_router
 
-app.include_router(clients_router, prefix="/api/clients", tags=["clients"])
-app.include_router(invoices_router, prefix="/api/invoices", tags=["invoices"])
-app.include_router(documents_router, prefix="/api/documents", tags=["documents"])
+app.include_router(clients_router, prefix="/api/clients", tags=["clients"], dependencies=authenticated)
+app.include_router(invoices_router, prefix="/api/invoices", tags=["invoices"], dependencies=authenticated)
+app.include_router(documents_router, prefix="/api/documents", tags=["documents"], dependencies=authenticated)
 
 from app.routers.sequences import router as sequences_router
-app.include_router(sequences_router, prefix="/api/sequences", tags=["sequences"])
+app.include_router(sequences_router, prefix="/api/sequences", tags=["sequences"], dependencies=authenticated)
 
 
 
 from app.routers.staff import router as staff_router
-app.include_router(staff_router, prefix="/api/staff", tags=["staff"])
+app.include_router(staff_router, prefix="/api/staff", tags=["staff"], dependencies=authenticated)
 
 from app.routers.customers import router as customers_router
-app.include_router(customers_router, prefix="/api/customers", tags=["customers"])
+app.include_router(customers_router, prefix="/api/customers", tags=["customers"], dependencies=authenticated)
 
 from app.routers.rates import router as rates_router
-app.include_router(rates_router, prefix="/api/rates", tags=["rates"])
+app.include_router(rates_router, prefix="/api/rates", tags=["rates"], dependencies=authenticated)
 
 from app.routers.auth import router as auth_router
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 
 from app.routers.users import router as users_router
-app.include_router(users_router, prefix="/api/users", tags=["users"])
+app.include_router(users_router, prefix="/api/users", tags=["users"], dependencies=authenticated)
 
 from app.routers.employees import router as employees_router
-app.include_router(employees_router, prefix="/api/employees", tags=["employees"])
+app.include_router(employees_router, prefix="/api/employees", tags=["employees"], dependencies=authenticated)
 
 from app.routers.expenses import router as expenses_router
-app.include_router(expenses_router, prefix="/api/expenses", tags=["expenses"])
+app.include_router(expenses_router, prefix="/api/expenses", tags=["expenses"], dependencies=authenticated)
 
 from app.routers.locations import router as locations_router
-app.include_router(locations_router, prefix="/api/locations", tags=["locations"])
+app.include_router(locations_router, prefix="/api/locations", tags=["locations"], dependencies=authenticated)
 
 from app.routers.budgets import router as budgets_router
-app.include_router(budgets_router, prefix="/api/budgets", tags=["budgets"])
+app.include_router(budgets_router, prefix="/api/budgets", tags=["budgets"], dependencies=authenticated)
 
 from app.routers.employee_leaves import router as employee_leaves_router
-app.include_router(employee_leaves_router, prefix="/api/employee-leaves", tags=["employee-leaves"])
+app.include_router(employee_leaves_router, prefix="/api/employee-leaves", tags=["employee-leaves"], dependencies=authenticated)
+
+from app.routers.financials import router as financials_router
+app.include_router(financials_router, prefix="/api/financials", tags=["financials"], dependencies=authenticated)
+
+from app.routers.monitoring import router as monitoring_router, metrics_router
+app.include_router(monitoring_router, prefix="/api/monitoring", tags=["monitoring"], dependencies=authenticated)
+app.include_router(metrics_router)
+
+from app.routers.search import router as search_router
+app.include_router(search_router, prefix="/api/search", tags=["search"], dependencies=authenticated)
+
+from app.routers.payroll import router as payroll_router
+app.include_router(payroll_router, prefix="/api/payroll", tags=["payroll"], dependencies=authenticated)
+
+from app.routers.events import router as events_router
+app.include_router(events_router, prefix="/api/events", tags=["events"], dependencies=authenticated)
+
+from app.routers.audit import router as audit_router
+app.include_router(audit_router, prefix="/api/audit", tags=["audit"], dependencies=authenticated)
 
 
 # Mount the 'static' folder (frontend) at web root
 # MUST BE LAST to prevent catching API routes
-app.mount("/", StaticFiles(directory="static", html=True), name="static")
+# Fingerprinted template JS is served immutable, HTML revalidates (see assets.py)
+app.mount("/", static_assets, name="static")
+
+startup_report.record("imports", _import_started)
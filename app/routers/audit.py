@@ -0,0 +1,63 @@
+# app/routers/audit.py
+from fastapi import APIRouter, Depends, HTTPException, Response
+from datetime import date, timedelta
+from typing import Optional
+from app.services.supabase_client import supabase, execute
+from app.services.pagination import select_fields, keyset, page, clamp_page_size
+from app.services.sessions import SessionUser, require_session
+from app.routers.users import VISIBLE_ROLES
+
+router = APIRouter()
+
+@router.get("", summary="Audit trail of writes, newest first")
+async def api_audit_log(
+    response: Response,
+    table: Optional[str] = None,
+    row_id: Optional[str] = None,
+    actor: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page_size: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    session: SessionUser = Depends(require_session),
+):
+    """
+    Entries from audit_log, each with the field-level `changes` ({field: {from, to}})
+    of one row. Filter by `table` (service_rates for rates) and `row_id` for the
+    history of a single record. The next page's cursor is returned in X-Next-Cursor.
+    Entries are written in batches, so the last second or so of writes may not be
+    visible yet.
+
+    Open to the roles that may list users (VISIBLE_ROLES). Changes to `users`
+    (roles, permissions, page access) are only shown to roles that see every user.
+    """
+    # AUTH_REQUIRED=0 sessions have no role and are not restricted
+    sees_users = True
+    if session.role:
+        if session.role not in VISIBLE_ROLES:
+            raise HTTPException(status_code=403, detail=f"Role '{session.role}' cannot read the audit log")
+        sees_users = VISIBLE_ROLES[session.role] is None
+    if table == "users" and not sees_users:
+        raise HTTPException(status_code=403, detail=f"Role '{session.role}' cannot read user changes")
+
+    query = supabase.table("audit_log").select(select_fields(fields, required=("id", "created_at")))
+    if table:
+        query = query.eq("table_name", table)
+    elif not sees_users:
+        query = query.neq("table_name", "users")
+    if row_id:
+        query = query.eq("row_id", row_id)
+    if actor:
+        query = query.eq("actor", actor)
+    if action:
+        query = query.eq("action", action)
+    if date_from:
+        query = query.gte("created_at", date_from.isoformat())
+    if date_to:
+        query = query.lt("created_at", (date_to + timedelta(days=1)).isoformat())
+
+    page_size = clamp_page_size(page_size)
+    res = await execute(keyset(query, page_size, cursor))
+    return page(res.data, page_size, response)
@@ -1,22 +1,49 @@
 # app/routers/auth.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, BackgroundTasks
 from pydantic import BaseModel
-import hashlib
-from app.services.supabase_client import supabase
+import logging
+from app.services.supabase_client import supabase, execute
+from app.services.passwords import hash_password, verify_password
+from app.services.sessions import (
+    SESSION_COOKIE, SESSION_TTL, SessionUser, issue_token, require_session, denylist,
+)
 
 router = APIRouter()
+logger = logging.getLogger("vesak.auth")
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
+class SessionRequest(BaseModel):
+    username: str
+
+USER_COLUMNS = "id, username, password_hash, role, is_active, permissions, page_access"
+
+def session_response(response: Response, request: Request, user: dict) -> dict:
+    """Issues a session token for `user`, sets it as a cookie and returns the login payload."""
+    token, expires_at = issue_token(user)
+    response.set_cookie(
+        SESSION_COOKIE, token, max_age=SESSION_TTL, httponly=True,
+        samesite="strict", secure=request.url.scheme == "https",
+    )
+    return {
+        "success": True,
+        "token": token,
+        "expires_at": expires_at,
+        "user": {
+            "id": user["id"],
+            "username": user["username"],
+            "role": user["role"],
+            "permissions": user.get("permissions") or {},
+            "page_access": user.get("page_access") or {},
+        }
+    }
+
 @router.post("/login", summary="Authenticate User")
-def api_login(request: LoginRequest):
-    # Hash password with SHA-256
-    password_hash = hashlib.sha256(request.password.encode('utf-8')).hexdigest()
-    
+async def api_login(request: LoginRequest, http_request: Request, response: Response, background: BackgroundTasks):
     # Query database for username
-    res = supabase.table("users").select("id, username, password_hash, role, is_active").eq("username", request.username).execute()
+    res = await execute(supabase.table("users").select(USER_COLUMNS).eq("username", request.username))
     users = res.data
     
     if not users:
@@ -27,21 +54,62 @@ def api_login(request: LoginRequest):
     if not user.get("is_active"):
         raise HTTPException(status_code=403, detail="Account is disabled. Contact Super Admin.")
         
-    if user.get("password_hash") != password_hash:
+    # scrypt runs in the password pool, off the event loop
+    ok, needs_rehash = await verify_password(request.password, user.get("password_hash"))
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid username or password")
-        
-    # Return user payload
-    return {
-        "success": True,
-        "user": {
-            "id": user["id"],
-            "username": user["username"],
-            "role": user["role"]
-        }
-    }
+
+    if needs_rehash:
+        # Legacy SHA-256 (or outdated cost) hash: upgrade after the response is sent
+        background.add_task(rehash_password, user["id"], request.password)
+
+    return session_response(response, http_request, user)
+
+async def rehash_password(user_id: str, password: str):
+    try:
+        new_hash = await hash_password(password)
+        await execute(supabase.table("users").update({"password_hash": new_hash}).eq("id", user_id))
+    except Exception:
+        logger.exception("Could not upgrade password hash for user %s", user_id)
+
+@router.post("/session", summary="Exchange a Supabase Auth session for an API session")
+async def api_exchange_session(body: SessionRequest, request: Request, response: Response):
+    """
+    For users signed in through Supabase Auth on the frontend: verifies their
+    Supabase access token once and issues our session token in its place.
+    """
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() != "bearer ":
+        raise HTTPException(status_code=401, detail="Missing Supabase access token")
+    try:
+        auth_res = await supabase.auth.get_user(auth[7:].strip())
+        email = (auth_res.user.email or "").lower() if auth_res and auth_res.user else ""
+    except Exception:
+        email = ""
+    if not email or email not in (body.username.lower(), f"{body.username}@vesak.local".lower()):
+        raise HTTPException(status_code=401, detail="Invalid Supabase session")
+
+    res = await execute(supabase.table("users").select(USER_COLUMNS).eq("username", body.username))
+    if not res.data:
+        raise HTTPException(status_code=401, detail="User record not found in access control list.")
+    user = res.data[0]
+    if not user.get("is_active"):
+        raise HTTPException(status_code=403, detail="Account is disabled. Contact Super Admin.")
+    return session_response(response, request, user)
+
+@router.post("/logout", summary="Revoke the current session")
+async def api_logout(response: Response, session: SessionUser = Depends(require_session)):
+    if session.jti:
+        denylist.revoke_token(session.jti, session.exp)
+    response.delete_cookie(SESSION_COOKIE)
+    return {"success": True}
+
+@router.get("/me", summary="Current session")
+async def api_me(session: SessionUser = Depends(require_session)):
+    return session.model_dump(exclude={"jti", "iat"})
 
 @router.get("/config", summary="Get Supabase Public Config")
-def get_supabase_config():
+async def get_supabase_config():
     import os
     return {
         "supabaseUrl": os.getenv("SUPABASE_URL", ""),
@@ -2,7 +2,10 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
-from app.services.supabase_client import supabase
+from app.services.supabase_client import supabase, execute, with_actor, get_budgets
+from app.services.cache import reference_cache, json_response
+from app.services.sessions import get_user_name
+from app.services.audit import log_changes
 
 router = APIRouter()
 
@@ -18,15 +21,14 @@ class BudgetInput(BaseModel):
     fiscal_year: int = 2026
 
 @router.get("/", summary="List all budgets")
-def api_get_budgets():
-    res = supabase.table("budgets").select("*").order("category").execute()
-    return res.data
+async def api_get_budgets(request: Request):
+    return json_response(request, await get_budgets())
 
 @router.get("/misc-categories", summary="Get existing misc category names for autocomplete")
-def api_get_misc_categories(q: str = ""):
+async def api_get_misc_categories(q: str = ""):
     try:
-        res = supabase.table("budgets").select("custom_category").eq("category", "Misc").not_.is_("custom_category", "null").execute()
-        categories = list(set(item["custom_category"] for item in res.data if item.get("custom_category")))
+        budgets = await get_budgets()
+        categories = list(set(item["custom_category"] for item in budgets if item.get("category") == "Misc" and item.get("custom_category")))
         if q:
             q_lower = q.lower()
             categories = [c for c in categories if q_lower in c.lower()]
@@ -35,23 +37,26 @@ def api_get_misc_categories(q: str = ""):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/", summary="Upsert budget")
-def api_upsert_budget(request: Request, budget: BudgetInput):
+async def api_upsert_budget(request: Request, budget: BudgetInput):
     payload = budget.model_dump(exclude_unset=True)
-    payload["created_by"] = request.headers.get("X-User-Name", "System")
+    payload["created_by"] = get_user_name(request)
 
     if budget.id:
         payload["id"] = budget.id
 
     try:
-        res = supabase.table("budgets").upsert(payload).execute()
+        res = await execute(with_actor(supabase.table("budgets").upsert(payload), get_user_name(request)))
+        reference_cache.invalidate("budgets")
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{id}", summary="Delete a budget")
-def api_delete_budget(id: str):
+async def api_delete_budget(request: Request, id: str):
     try:
-        supabase.table("budgets").delete().eq("id", id).execute()
+        res = await execute(supabase.table("budgets").delete().eq("id", id))
+        reference_cache.invalidate("budgets")
+        await log_changes("budgets", get_user_name(request), res.data)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
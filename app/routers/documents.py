@@ -1,17 +1,215 @@
 # app/routers/documents.py
-from fastapi import APIRouter, HTTPException, Request
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
 from app.services.supabase_client import create_document
+from app.services.sessions import get_user_name
+from app.services import document_store
+from app.services.document_store import Upload, UploadTooLarge
+from app.services.idempotency import idempotent
+from app.services.renderer import (
+    render, store, load_invoice, invoice_context, letter_context, file_name,
+    month_invoices, iter_batch, zip_stream, BATCH_STATUSES, MAX_BATCH,
+)
+from app.services.pdf import UnsupportedText
 
 router = APIRouter()
 
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
+# Concurrent uploads per batch; rendering is bounded by the process pool itself
+STORE_CONCURRENCY = 4
+
+@router.post("/upload", summary="Upload a document as a new version")
+async def api_upload_document(request: Request, name: str, doc_type: str = "official", title: Optional[str] = None,
+                              invoice_id: Optional[str] = None):
+    """
+    Stores the file as the next version of `name` (e.g. "official/letter-12.pdf").
+    The body is either the raw file (Content-Type is kept) or multipart with a
+    `file` part and an optional JSON `metadata` part. Content is streamed to a
+    spool file while it is hashed; bytes already in storage are not uploaded
+    again, and re-saving the current version changes nothing.
+    """
+    metadata = None
+    upload = Upload()
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            part = form.get("file")
+            if part is None or isinstance(part, str):
+                raise HTTPException(status_code=400, detail="multipart upload needs a 'file' part")
+            content_type = part.content_type or "application/octet-stream"
+            while chunk := await part.read(document_store.READ_SIZE):
+                upload.write(chunk)
+            if form.get("metadata"):
+                metadata = json.loads(form["metadata"])
+        else:
+            content_type = request.headers.get("content-type") or "application/octet-stream"
+            await upload.feed(request.stream())
+        if upload.size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+
+        document, changed = await document_store.save(
+            upload, name, doc_type, title=title, user_name=get_user_name(request),
+            invoice_id=invoice_id, metadata=metadata, content_type=content_type.split(";")[0].strip(),
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        upload.close()
+    return {"status": "success", "data": document, "changed": changed}
+
+@router.get("/{document_id}/versions", summary="Version history of a document")
+async def api_document_versions(document_id: str):
+    document = await document_store.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"status": "success", "data": list(reversed(document_store.versions(document)))}
+
+@router.get("/{document_id}/file", summary="Download a document (latest or a given version)")
+async def api_document_file(document_id: str, version: Optional[int] = None):
+    document = await document_store.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    history = document_store.versions(document)
+    if version is not None:
+        entry = next((v for v in history if v.get("version") == version), None)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Version {version} not found")
+    else:
+        # Rows saved before versioning only have file_url
+        entry = history[-1] if history else {"file_url": document.get("file_url")}
+    if not entry.get("file_url"):
+        raise HTTPException(status_code=404, detail="Document has no file")
+
+    try:
+        body = await document_store.open_blob(entry["file_url"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File missing from storage")
+    meta = document.get("metadata") or {}
+    headers = {"Content-Disposition": f'attachment; filename="{meta.get("file_name") or "document"}"'}
+    if entry.get("size"):
+        headers["Content-Length"] = str(entry["size"])
+    if entry.get("sha256"):
+        headers["ETag"] = f'"{entry["sha256"]}"'
+    return StreamingResponse(body, media_type=entry.get("content_type") or "application/octet-stream",
+                             headers=headers)
 
 @router.post("/", summary="Save official document metadata")
-def api_create_document(request: Request, payload: dict):
+async def api_create_document(request: Request, payload: dict):
+    # Idempotency-Key: a repeat returns the first document instead of inserting another
+    return await idempotent(request, "documents.create", lambda: create_document_once(request, payload))
+
+async def create_document_once(request: Request, payload: dict):
     payload['created_by_name'] = get_user_name(request)
-    
-    res = create_document(payload)
+
+    res = await create_document(payload)
     if getattr(res, "error", None):
         raise HTTPException(status_code=400, detail=str(res.error))
     return res.data
+
+class RenderRequest(BaseModel):
+    template: str = "invoice"
+    invoice_id: Optional[str] = None   # template=invoice: rendered from the stored invoice
+    data: Optional[dict] = None        # template=letter: the official document form fields
+    store: bool = True
+
+class BatchRenderRequest(BaseModel):
+    month_year: str                    # YYYY-MM
+    statuses: list[str] = list(BATCH_STATUSES)
+    store: bool = True
+
+@router.post("/render", summary="Render an invoice or official letter to PDF on the server")
+async def api_render_document(request: Request, body: RenderRequest, download: bool = False):
+    """
+    Builds the PDF from the same invoice row get_invoice returns (or the letter
+    fields in `data`), uploads it to storage and records it in official_documents.
+    `?download=true` returns the PDF itself instead of the document row.
+    Honours Idempotency-Key like document creation.
+    """
+    return await idempotent(request, "documents.render", lambda: render_document(request, body, download))
+
+async def render_document(request: Request, body: RenderRequest, download: bool):
+    try:
+        if body.template == "invoice":
+            if not body.invoice_id:
+                raise HTTPException(status_code=400, detail="invoice_id is required for the invoice template")
+            invoice_id = body.invoice_id
+            context = invoice_context(await load_invoice(invoice_id))
+        else:
+            invoice_id = None
+            context = letter_context(body.data or {})
+        pdf = await render(body.template, context)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UnsupportedText as e:
+        # Render this one in the browser instead
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    name = file_name(body.template, context)
+    document = None
+    if body.store:
+        try:
+            document = await store(pdf, body.template, context, name, get_user_name(request), invoice_id)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Rendered but could not store {name}: {e}")
+
+    if download:
+        headers = {"Content-Disposition": f'attachment; filename="{name}"'}
+        if document:
+            headers["X-Document-Id"] = str(document.get("id"))
+        return Response(pdf, media_type="application/pdf", headers=headers)
+    return {"status": "success", "data": document, "file_name": name, "size": len(pdf)}
+
+@router.post("/render/batch", summary="Render a month of invoices to PDF, zipped")
+async def api_render_batch(request: Request, body: BatchRenderRequest):
+    """
+    Every invoice in `month_year` with one of `statuses` (Confirmed / Active /
+    Completed by default), rendered in the process pool and streamed back as one
+    zip while the renders finish. Invoices that failed to render or store are
+    listed in errors.json, the last entry of the archive.
+    """
+    try:
+        rows = await month_invoices(body.month_year, tuple(body.statuses))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No invoices for {body.month_year}")
+    if len(rows) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"{len(rows)} invoices; batches are limited to {MAX_BATCH}")
+
+    user_name = get_user_name(request)
+    gate = asyncio.Semaphore(STORE_CONCURRENCY)
+    errors, storing = [], []
+
+    async def keep(name, pdf, context, row):
+        try:
+            await store(pdf, "invoice", context, name, user_name, row.get("id"))
+        except Exception as e:
+            errors.append({"invoice_id": row.get("id"), "error": f"store failed: {e}"})
+        finally:
+            gate.release()
+
+    async def files():
+        async for row, result in iter_batch(rows, "invoice"):
+            if isinstance(result, Exception):
+                errors.append({"invoice_id": row.get("id"), "error": str(result)})
+                continue
+            name, pdf, context = result
+            if body.store:
+                # Waiting for a free upload slot also holds back further renders
+                await gate.acquire()
+                storing.append(asyncio.create_task(keep(name, pdf, context, row)))
+            yield name, pdf
+        await asyncio.gather(*storing)
+        if errors:
+            yield "errors.json", json.dumps(errors, indent=2).encode("utf-8")
+
+    return StreamingResponse(zip_stream(files()), media_type="application/zip", headers={
+        "Content-Disposition": f'attachment; filename="invoices-{body.month_year}.zip"',
+    })
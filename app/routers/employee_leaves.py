@@ -1,14 +1,16 @@
 # app/routers/employee_leaves.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Query
 from pydantic import BaseModel
 from typing import Optional, List
-from app.services.supabase_client import supabase
+from app.services.supabase_client import supabase, execute
+from app.services.bulk import bulk_upsert
+from app.services.pagination import iter_pages
+from app.services.export import export_response
+from app.services.sessions import get_user_name
+from app.services.payroll import payroll_cache, salary_terms, leave_days, month_bounds
 
 router = APIRouter()
 
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
-
 class LeaveInput(BaseModel):
     id: Optional[str] = None
     employee_id: str
@@ -16,37 +18,79 @@ class LeaveInput(BaseModel):
     leave_dates: Optional[List[str]] = []  # e.g. ['2026-02-05', '2026-02-12']
     overtime_days: Optional[int] = 0
     working_days: Optional[int] = 26
+    # Computed server-side from the employee's CTC on single upserts; still
+    # accepted (and stored as sent) for bulk imports of historical records
     daily_rate: Optional[float] = None
     net_salary: Optional[float] = None
     notes: Optional[str] = None
 
+@router.get("/export", summary="Stream leave / payroll records as CSV or XLSX")
+async def api_export_leaves(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    employee_id: Optional[str] = None,
+    month_year: Optional[str] = None,
+):
+    """Pages through employee_leaves (with employee name / location embedded) and streams rows out."""
+    def query():
+        q = supabase.table("employee_leaves").select("*,employee:employees(name,work_location,designation)")
+        if employee_id:
+            q = q.eq("employee_id", employee_id)
+        if month_year:
+            q = q.eq("month_year", month_year)
+        return q
+
+    return export_response(iter_pages(query, column="month_year"), format, "payroll")
+
 @router.get("/{employee_id}", summary="Get leave records for an employee")
-def api_get_leaves(employee_id: str, month_year: Optional[str] = None):
+async def api_get_leaves(employee_id: str, month_year: Optional[str] = None):
     query = supabase.table("employee_leaves").select("*").eq("employee_id", employee_id)
     if month_year:
         query = query.eq("month_year", month_year)
-    res = query.order("month_year", desc=True).execute()
+    res = await execute(query.order("month_year", desc=True))
     return res.data
 
 @router.post("/", summary="Upsert a leave record")
-def api_upsert_leave(request: Request, leave: LeaveInput):
+async def api_upsert_leave(request: Request, leave: LeaveInput):
     payload = leave.model_dump(exclude_unset=True)
     payload["created_by_name"] = get_user_name(request)
 
     try:
-        res = supabase.table("employee_leaves").upsert(
+        month_bounds(leave.month_year)
+        emp = await execute(supabase.table("employees").select("earnings_per_month")
+                            .eq("id", leave.employee_id).maybe_single())
+        ctc = (emp.data or {}).get("earnings_per_month") if emp else None
+        terms = salary_terms(ctc, leave.working_days, leave_days(payload, leave.month_year), leave.overtime_days)
+        payload["daily_rate"] = terms["daily_rate"]
+        payload["net_salary"] = terms["net_salary"]
+
+        res = await execute(supabase.table("employee_leaves").upsert(
             payload, 
             on_conflict="employee_id,month_year",
             returning="representation"
-        ).execute()
+        ))
+        payroll_cache.invalidate(leave.month_year)
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", summary="Bulk upsert leave records (JSON array or NDJSON)")
+async def api_bulk_upsert_leaves(request: Request):
+    user_name = get_user_name(request)
+
+    def to_payload(leave: LeaveInput) -> dict:
+        payload = leave.model_dump(exclude_unset=True)
+        payload["created_by_name"] = user_name
+        return payload
+
+    report = await bulk_upsert(request, "employee_leaves", LeaveInput, to_payload, on_conflict="employee_id,month_year")
+    payroll_cache.invalidate()
+    return report.as_dict()
+
 @router.delete("/{record_id}", summary="Delete a leave record")
-def api_delete_leave(record_id: str):
+async def api_delete_leave(record_id: str):
     try:
-        res = supabase.table("employee_leaves").delete().eq("id", record_id).execute()
+        res = await execute(supabase.table("employee_leaves").delete().eq("id", record_id))
+        payroll_cache.invalidate()
         return {"status": "deleted"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,14 +1,15 @@
 # app/routers/employees.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-from app.services.supabase_client import supabase
+from app.services.supabase_client import supabase, execute, with_actor
+from app.services.pagination import select_fields, quote, keyset, page, clamp_page_size
+from app.services.bulk import bulk_upsert
+from app.services.sessions import get_user_name
+from app.services.payroll import payroll_cache
 
 router = APIRouter()
 
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
-
 class EmployeeInput(BaseModel):
     id: Optional[str] = None
     name: str
@@ -57,49 +58,74 @@ class EmployeeInput(BaseModel):
     terminated_by: Optional[str] = None
 
 @router.get("/", summary="List all employees")
-def api_get_employees():
-    res = supabase.table("employees").select("*").order("name").execute()
-    return res.data
+async def api_get_employees(
+    response: Response,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    work_type: Optional[str] = None,
+):
+    """
+    Full list ordered by name unless `page_size`/`cursor` is given, in which case
+    rows are paged newest-first and the next cursor comes back in X-Next-Cursor.
+    """
+    paged = page_size is not None or cursor is not None
+    query = supabase.table("employees").select(select_fields(fields, required=("id", "created_at") if paged else ()))
+    if status:
+        query = query.eq("status", status)
+    if location:
+        query = query.eq("work_location", location)
+    if work_type:
+        query = query.eq("work_type", work_type)
+
+    if not paged:
+        res = await execute(query.order("name"))
+        return res.data
+
+    page_size = clamp_page_size(page_size or 100)
+    res = await execute(keyset(query, page_size, cursor))
+    return page(res.data, page_size, response)
 
 @router.get("/office", summary="List office staff only")
-def api_get_office_staff():
-    res = supabase.table("employees").select("*").eq("work_type", "Office Staff").order("name").execute()
+async def api_get_office_staff():
+    res = await execute(supabase.table("employees").select("*").eq("work_type", "Office Staff").order("name"))
     return res.data
     
 @router.get("/field", summary="List field staff only")
-def api_get_field_staff():
-    res = supabase.table("employees").select("*").eq("work_type", "Field Staff").order("name").execute()
+async def api_get_field_staff():
+    res = await execute(supabase.table("employees").select("*").eq("work_type", "Field Staff").order("name"))
     return res.data
 
 @router.post("/", summary="Upsert employee record")
-def api_upsert_employee(request: Request, emp: EmployeeInput):
+async def api_upsert_employee(request: Request, emp: EmployeeInput):
     payload = emp.model_dump(exclude_unset=True)
-    
-    # Add audit tracing if needed based on the table's capabilities (if added later)
-    # The current schema for employees didn't specify created_by_name but usually good practice
-    
+
     try:
-        res = supabase.table("employees").upsert(payload, returning="representation").execute()
+        res = await execute(with_actor(supabase.table("employees").upsert(payload, returning="representation"),
+                                       get_user_name(request)))
+        payroll_cache.invalidate()
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{id}", summary="Get employee by ID")
-def api_get_employee_by_id(id: str):
-    res = supabase.table("employees").select("*").eq("id", id).single().execute()
-    if not res.data:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    return res.data
+@router.post("/bulk", summary="Bulk upsert employees (JSON array or NDJSON)")
+async def api_bulk_upsert_employees(request: Request):
+    report = await bulk_upsert(request, "employees", EmployeeInput, lambda emp: emp.model_dump(exclude_unset=True),
+                               audit_actor=get_user_name(request))
+    payroll_cache.invalidate()
+    return report.as_dict()
 
 @router.get("/search/{mobile}", summary="Search employee by mobile")
-def api_search_employee_by_mobile(mobile: str):
-    res = supabase.table("employees").select("*").eq("mobile", mobile).execute()
+async def api_search_employee_by_mobile(mobile: str):
+    res = await execute(supabase.table("employees").select("*").eq("mobile", mobile))
     if not res.data:
         raise HTTPException(status_code=404, detail="Employee not found")
     return res.data[0]
 
 @router.get("/by-location", summary="Search employees by location for staff allocation")
-def api_get_employees_by_location(
+async def api_get_employees_by_location(
     location: str,
     sub_location: str = None,
     query: str = None
@@ -117,17 +143,19 @@ def api_get_employees_by_location(
 
     if sub_location:
         q = q.eq("sub_location", sub_location)
-    
-    res = q.order("name").execute()
-    data = res.data or []
 
-    # Client-side text filter on name/mobile if query provided
-    if query and data:
-        query_lower = query.lower()
-        data = [e for e in data if 
-            (e.get("name") and query_lower in e["name"].lower()) or
-            (e.get("mobile") and query_lower in e["mobile"])
-        ]
-    
-    return data
+    # Name / mobile substring match runs in Postgres (trigram indexes, phase27)
+    if query:
+        pattern = quote(f"*{query}*")
+        q = q.or_(f"name.ilike.{pattern},mobile.like.{pattern}")
 
+    res = await execute(q.order("name"))
+    return res.data or []
+
+# Declared last so /by-location and /search/{mobile} are not captured as an id
+@router.get("/{id}", summary="Get employee by ID")
+async def api_get_employee_by_id(id: str):
+    res = await execute(supabase.table("employees").select("*").eq("id", id).single())
+    if not res.data:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return res.data
@@ -0,0 +1,36 @@
+# app/routers/events.py
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.services.events import event_bus, TOPICS, RETRY_FRAME
+
+router = APIRouter()
+
+@router.get("", summary="Server-sent change notifications (invoices, rates, locations)")
+async def api_events(request: Request, topics: Optional[str] = None):
+    """
+    text/event-stream of `invoices` / `rates` / `locations` events, each
+    `{"op": ..., "ids": [...]}` (bulk writes send `count`), plus `resync` when the client missed
+    events and should reload in full. Reconnects resume from Last-Event-ID.
+    """
+    wanted = [t.strip() for t in topics.split(",") if t.strip()] if topics else list(TOPICS)
+    unknown = set(wanted) - set(TOPICS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+
+    async def stream():
+        sub = event_bus.subscribe(wanted, last_event_id)
+        try:
+            yield RETRY_FRAME
+            while True:
+                yield await sub.queue.get()
+        finally:
+            # Client went away (or shutdown): the generator is cancelled / closed
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",   # stop reverse proxies buffering the stream
+    })
@@ -1,15 +1,16 @@
 # app/routers/expenses.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Optional
 from datetime import date
-from app.services.supabase_client import supabase
+from app.services.supabase_client import supabase, execute, with_actor
+from app.services.pagination import select_fields, keyset, page, clamp_page_size
+from app.services.bulk import bulk_upsert
+from app.services.sessions import get_user_name
+from app.services.audit import log_changes
 
 router = APIRouter()
 
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
-
 class ExpenseInput(BaseModel):
     id: Optional[str] = None
     expense_date: date
@@ -22,28 +23,67 @@ class ExpenseInput(BaseModel):
     is_active: bool = True
 
 @router.get("/", summary="List all expenses")
-def api_get_expenses():
-    res = supabase.table("expenses").select("*").order("expense_date", desc=True).execute()
-    return res.data
+async def api_get_expenses(
+    response: Response,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """
+    Full list ordered by expense_date unless `page_size`/`cursor` is given, in which
+    case rows are paged newest-first and the next cursor comes back in X-Next-Cursor.
+    """
+    paged = page_size is not None or cursor is not None
+    query = supabase.table("expenses").select(select_fields(fields, required=("id", "created_at") if paged else ()))
+    if category:
+        query = query.eq("category", category)
+    if date_from:
+        query = query.gte("expense_date", date_from.isoformat())
+    if date_to:
+        query = query.lte("expense_date", date_to.isoformat())
 
-@router.post("/", summary="Upsert expense record")
-def api_upsert_expense(request: Request, exp: ExpenseInput):
+    if not paged:
+        res = await execute(query.order("expense_date", desc=True))
+        return res.data
+
+    page_size = clamp_page_size(page_size or 100)
+    res = await execute(keyset(query, page_size, cursor))
+    return page(res.data, page_size, response)
+
+def expense_payload(exp: ExpenseInput, user_name: str) -> dict:
     payload = exp.model_dump(exclude_unset=True)
     payload["expense_date"] = payload["expense_date"].isoformat()
 
     if not exp.id:
-        payload["created_by_name"] = get_user_name(request)
+        payload["created_by_name"] = user_name
+    return payload
+
+@router.post("/", summary="Upsert expense record")
+async def api_upsert_expense(request: Request, exp: ExpenseInput):
+    payload = expense_payload(exp, get_user_name(request))
 
     try:
-        res = supabase.table("expenses").upsert(payload, returning="representation").execute()
+        res = await execute(with_actor(supabase.table("expenses").upsert(payload, returning="representation"),
+                                       get_user_name(request)))
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", summary="Bulk upsert expenses (JSON array or NDJSON)")
+async def api_bulk_upsert_expenses(request: Request):
+    user_name = get_user_name(request)
+    report = await bulk_upsert(request, "expenses", ExpenseInput, lambda exp: expense_payload(exp, user_name),
+                               audit_actor=user_name)
+    return report.as_dict()
+
 @router.delete("/{id}", summary="Delete an expense")
-def api_delete_expense(id: str):
+async def api_delete_expense(request: Request, id: str):
     try:
-        res = supabase.table("expenses").delete().eq("id", id).execute()
+        res = await execute(supabase.table("expenses").delete().eq("id", id))
+        await log_changes("expenses", get_user_name(request), res.data)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
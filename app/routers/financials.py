@@ -0,0 +1,113 @@
+# app/routers/financials.py
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from datetime import date
+from app.services.supabase_client import supabase, execute, get_budgets
+
+router = APIRouter()
+
+GROUP_DIMENSIONS = ("month", "location", "service")
+
+def _num(value) -> float:
+    try:
+        return round(float(value or 0), 2)
+    except (TypeError, ValueError):
+        return 0.0
+
+def group_invoice_rollups(rows: list, group_by: list) -> list:
+    """Re-groups the monthly rollup rows by the requested dimensions (cost scales with groups, not invoices)."""
+    groups = {}
+    for r in rows:
+        key = tuple(r.get(dim) or "" for dim in group_by)
+        g = groups.setdefault(key, {
+            **dict(zip(group_by, key)),
+            "invoice_count": 0, "revenue": 0.0, "amount_paid": 0.0, "nurse_payouts": 0.0,
+        })
+        g["invoice_count"] += int(r.get("invoice_count") or 0)
+        g["revenue"] += _num(r.get("revenue"))
+        g["amount_paid"] += _num(r.get("amount_paid"))
+        g["nurse_payouts"] += _num(r.get("nurse_payouts"))
+    for g in groups.values():
+        for k in ("revenue", "amount_paid", "nurse_payouts"):
+            g[k] = round(g[k], 2)
+    return sorted(groups.values(), key=lambda g: tuple(str(g[d]) for d in group_by))
+
+def budget_variance(budgets: list, expense_rows: list) -> list:
+    actual_by_category = {}
+    for r in expense_rows:
+        cat = r.get("category") or ""
+        actual_by_category[cat] = actual_by_category.get(cat, 0.0) + _num(r.get("expenses"))
+
+    result = []
+    for b in budgets:
+        budget = _num(b.get("budget_amount"))
+        actual = round(actual_by_category.get(b.get("category") or "", 0.0), 2)
+        result.append({
+            "category": b.get("category"),
+            "custom_category": b.get("custom_category"),
+            "budget": budget,
+            "actual": actual,
+            "variance": round(budget - actual, 2),
+            "utilisation_pct": round(actual / budget * 100) if budget > 0 else 0,
+        })
+    return result
+
+@router.get("/summary", summary="Aggregated revenue, payouts, expenses and budget variance")
+async def api_financial_summary(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: str = Query("month", description="Comma-separated: month, location, service"),
+):
+    """
+    Reads the precomputed monthly rollups (see migrations/phase24_financial_aggregates.sql)
+    in one RPC and the cached budgets in parallel, then groups in-process.
+    """
+    dims = [d.strip() for d in group_by.split(",") if d.strip()]
+    bad = [d for d in dims if d not in GROUP_DIMENSIONS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by dimension(s): {', '.join(bad)}")
+
+    params = {
+        "p_from": date_from.isoformat() if date_from else None,
+        "p_to": date_to.isoformat() if date_to else None,
+    }
+    try:
+        summary_res, budgets = await asyncio.gather(
+            execute(supabase.rpc("financial_summary", params)),
+            get_budgets(),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    rollups = summary_res.data or {}
+    invoice_rows = rollups.get("invoices") or []
+    expense_rows = rollups.get("expenses") or []
+
+    revenue = round(sum(_num(r.get("revenue")) for r in invoice_rows), 2)
+    expenses = round(sum(_num(r.get("expenses")) for r in expense_rows), 2)
+    payroll = _num(rollups.get("payroll"))
+    gross = round(revenue - payroll, 2)
+
+    expenses_by_category = {}
+    expenses_by_month = {}
+    for r in expense_rows:
+        cat = r.get("category") or ""
+        expenses_by_category[cat] = round(expenses_by_category.get(cat, 0.0) + _num(r.get("expenses")), 2)
+        expenses_by_month[r["month"]] = round(expenses_by_month.get(r["month"], 0.0) + _num(r.get("expenses")), 2)
+
+    return {
+        "totals": {
+            "revenue": revenue,
+            "amount_paid": round(sum(_num(r.get("amount_paid")) for r in invoice_rows), 2),
+            "nurse_payouts": round(sum(_num(r.get("nurse_payouts")) for r in invoice_rows), 2),
+            "payroll": payroll,
+            "expenses": expenses,
+            "gross_earnings": gross,
+            "net_earnings": round(gross - expenses, 2),
+        },
+        "groups": group_invoice_rollups(invoice_rows, dims) if dims else [],
+        "expenses_by_month": [{"month": m, "expenses": v} for m, v in sorted(expenses_by_month.items())],
+        "expenses_by_category": [{"category": c, "expenses": v} for c, v in sorted(expenses_by_category.items(), key=lambda kv: -kv[1])],
+        "budget_variance": budget_variance(budgets, expense_rows),
+    }
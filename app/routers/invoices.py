@@ -2,35 +2,51 @@
 from fastapi import APIRouter, HTTPException
 from app.services.supabase_client import create_invoice, update_invoice, get_invoice, list_invoices
 
-from fastapi import APIRouter, HTTPException, Request
-from datetime import datetime
-from app.services.supabase_client import create_invoice, update_invoice, get_invoice, list_invoices, supabase
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from datetime import datetime, date, timedelta
+from typing import Optional
+from app.services.supabase_client import create_invoice, update_invoice, get_invoice, list_invoices, get_location_abbreviation, supabase, execute
+from app.services.pagination import select_fields, quote, keyset, page, clamp_page_size, iter_pages
+from app.services.export import export_response
+from app.services.sequence_allocator import invoice_numbers, SequenceUnavailable
+from app.services.sessions import get_user_name
+from app.services.payroll import payroll_cache
+from app.services.change_feed import changes_since, parse_timestamp, CursorExpired, MAX_CHANGES
+from app.services.events import publish
+from app.services.audit import log_changes
+from app.services.idempotency import idempotent
+from app.services.resilience import UpstreamUnavailable
 
 router = APIRouter()
 
-def get_user_name(request: Request) -> str:
-    # Frontend will send the user's name in a custom header (X-User-Name)
-    # Alternatively, we could decode the Supabase JWT, but this is simpler for V1
-    return request.headers.get("X-User-Name", "System")
-
 @router.post("/", summary="Create invoice")
-def api_create_invoice(request: Request, payload: dict):
+async def api_create_invoice(request: Request, payload: dict):
+    """
+    Send an Idempotency-Key header to make retries safe: a repeat with the same
+    key gets the first response back instead of a second invoice (and number).
+    """
+    return await idempotent(request, "invoices.create", lambda: create_invoice_once(request, payload))
+
+async def create_invoice_once(request: Request, payload: dict):
     payload['created_by_name'] = get_user_name(request)
     
     # Auto-generate invoice_number if applicable upon creation
-    assign_invoice_no_if_needed(payload, existing_invoice_number=None)
+    await assign_invoice_no_if_needed(payload, existing_invoice_number=None)
     
-    res = create_invoice(payload)
+    res = await create_invoice(payload)
     if getattr(res, "error", None):
         raise HTTPException(status_code=400, detail=str(res.error))
+    payroll_cache.invalidate()
+    publish("invoices", op="create", ids=[r.get("id") for r in res.data or []])
+    await log_changes("invoices", payload['created_by_name'], {}, res.data)
     return res.data
 
 @router.put("/{invoice_id}", summary="Update invoice")
-def api_update_invoice(request: Request, invoice_id: str, payload: dict):
+async def api_update_invoice(request: Request, invoice_id: str, payload: dict):
     payload['updated_by_name'] = get_user_name(request)
     
     # Fetch existing to avoid overriding invoice_number or generating a new one if it already has one
-    existing_res = get_invoice(invoice_id)
+    existing_res = await get_invoice(invoice_id)
     existing_invoice_number = existing_res.data.get("invoice_number") if existing_res and not getattr(existing_res, "error", None) else None
     
     # Pass the existing customer_name and location if not in payload, needed for generation
@@ -40,28 +56,134 @@ def api_update_invoice(request: Request, invoice_id: str, payload: dict):
         if "location" not in payload:
             payload["location"] = existing_res.data.get("location")
             
-    assign_invoice_no_if_needed(payload, existing_invoice_number)
+    await assign_invoice_no_if_needed(payload, existing_invoice_number)
     
-    res = update_invoice(invoice_id, payload)
+    res = await update_invoice(invoice_id, payload)
     if getattr(res, "error", None):
         raise HTTPException(status_code=400, detail=str(res.error))
+    # Payouts may move between months or staff, so drop every cached month
+    payroll_cache.invalidate()
+    publish("invoices", op="update", ids=[invoice_id])
+    # The row read above is the audit "before"; no extra round-trip
+    before = {invoice_id: existing_res.data} if existing_res and existing_res.data else None
+    await log_changes("invoices", payload['updated_by_name'], before, res.data)
     return res.data
 
+@router.get("/changes", summary="Invoices changed since a cursor (delta sync)")
+async def api_invoice_changes(
+    since: str,
+    after_id: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=MAX_CHANGES),
+    fields: Optional[str] = None,
+):
+    """
+    Inserted / updated rows with updated_at >= `since`, oldest first, plus ids of
+    deleted invoices (tombstones). Pass the returned `cursor` (and `cursor_id`)
+    back as `since` (and `after_id`); keep going while `has_more` is true.
+    410 means the cursor is too old and the client should reload the full list.
+    """
+    try:
+        since_ts = parse_timestamp(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO-8601 timestamp")
+    columns = select_fields(fields, required=("id", "created_at", "updated_at"))
+    try:
+        return await changes_since("invoices", since_ts, after_id, limit, columns)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+@router.get("/export", summary="Stream invoices as CSV or XLSX")
+async def api_export_invoices(
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    customer: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    date_column: str = Query("created_at", pattern="^(created_at|date)$"),
+    labels: Optional[str] = None,
+    serial: Optional[str] = None,
+):
+    """
+    Pages through Supabase and streams rows out as they arrive; takes the same
+    filters as the list endpoint. `date_column=date` filters on the service date
+    instead of created_at. `labels=` gives one header per field of `fields=`, and
+    `serial=` names a leading 1..n column.
+    """
+    columns = select_fields(fields, required=("id", "created_at"))
+    output = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    headers = [l.strip() for l in labels.split(",")] if labels else None
+    if headers and (output is None or len(headers) != len(output)):
+        raise HTTPException(status_code=400, detail="labels= needs one label per field in fields=")
+    filters = dict(status=status, location=location, customer=customer, date_from=date_from, date_to=date_to,
+                   date_column=date_column)
+    pages = iter_pages(lambda: invoice_query(columns, **filters))
+    return export_response(pages, format, "invoices", columns=output, labels=headers, serial=serial)
+
 @router.get("/{invoice_id}", summary="Fetch invoice")
-def api_get_invoice(invoice_id: str):
-    res = get_invoice(invoice_id)
+async def api_get_invoice(invoice_id: str):
+    res = await get_invoice(invoice_id)
     if getattr(res, "error", None):
         raise HTTPException(status_code=404, detail="Invoice not found")
     return res.data
 
 @router.get("/", summary="List invoices")
-def api_list_invoices(limit: int = 200):
-    res = list_invoices(limit=limit)
-    if getattr(res, "error", None):
-        raise HTTPException(status_code=500, detail=str(res.error))
-    return res.data
+async def api_list_invoices(
+    response: Response,
+    limit: int = 200,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    customer: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """
+    Without `page_size`/`cursor` this behaves as before (newest `limit` rows).
+    With them, pages newest-first on (created_at, id); the next page's cursor is
+    returned in the X-Next-Cursor header. `fields=` projects columns so list views
+    can skip the `data` / `staff_data` snapshots.
+    """
+    filters = dict(status=status, location=location, customer=customer, date_from=date_from, date_to=date_to)
+    if page_size is None and cursor is None:
+        query = invoice_query(select_fields(fields), **filters)
+        res = await execute(query.order("created_at", desc=True).limit(limit))
+        if getattr(res, "error", None):
+            raise HTTPException(status_code=500, detail=str(res.error))
+        return res.data
 
-def assign_invoice_no_if_needed(payload: dict, existing_invoice_number: str = None):
+    page_size = clamp_page_size(page_size or limit)
+    query = invoice_query(select_fields(fields, required=("id", "created_at")), **filters)
+    res = await execute(keyset(query, page_size, cursor))
+    return page(res.data, page_size, response)
+
+def invoice_query(
+    columns: str = "*",
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    customer: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    date_column: str = "created_at",
+):
+    """Filtered invoices select shared by the list, export and change-feed endpoints."""
+    query = supabase.table("invoices").select(columns)
+    if status:
+        query = query.eq("status", status)
+    if location:
+        query = query.or_(f"location.eq.{quote(location)},customer_location.eq.{quote(location)}")
+    if customer:
+        query = query.or_(f"customer_name.ilike.{quote('*' + customer + '*')},customer_mobile.eq.{quote(customer)}")
+    if date_from:
+        query = query.gte(date_column, date_from.isoformat())
+    if date_to:
+        query = query.lt(date_column, (date_to + timedelta(days=1)).isoformat())
+    return query
+
+async def assign_invoice_no_if_needed(payload: dict, existing_invoice_number: str = None):
     """
     Generates invoice_number in format: IN-{ABBR}-{DDMMYY}-{SEQ}-{Client Name}
     Only generated when status is Confirmed/Active/Completed/Staff Issue.
@@ -81,24 +203,27 @@ def assign_invoice_no_if_needed(payload: dict, existing_invoice_number: str = No
         if loc_name:
             abbreviation = loc_name[:3].upper()
             try:
-                loc_res = supabase.table("locations").select("abbreviation").eq("name", loc_name).maybe_single().execute()
-                if loc_res.data and loc_res.data.get("abbreviation"):
-                    abbreviation = loc_res.data["abbreviation"].upper()
-            except Exception:
-                pass
+                # Served from the reference cache (stale if Supabase is down); invalidated when locations change
+                loc_abbr = await get_location_abbreviation(loc_name)
+            except UpstreamUnavailable as e:
+                # A guessed abbreviation would be printed on the invoice for good
+                raise HTTPException(status_code=503, detail=f"Location lookup unavailable, please retry: {e}")
+            if loc_abbr:
+                abbreviation = loc_abbr.upper()
         
         now = datetime.now()
         month_year = now.strftime("%m%y") # MMYY for the sequence
         ddmmyy = now.strftime("%d%m%y")   # DDMMYY for the string
         
         try:
-            seq_res = supabase.rpc("get_next_invoice_seq", {"p_month_year": month_year}).execute()
-            seq_val = seq_res.data
-            seq_padded = str(seq_val).zfill(3)
-        except Exception as e:
-            # Fallback if RPC fails or table doesn't exist
-            seq_padded = "001"
-            
+            # Numbers come from a locally held block (one RPC per block, see
+            # sequence_allocator.py). Never invent a number: a duplicate is worse
+            # than a failed confirmation the user can retry.
+            seq_val = await invoice_numbers.next(month_year)
+        except SequenceUnavailable as e:
+            raise HTTPException(status_code=503, detail=f"Invoice number unavailable, please retry: {e}")
+        seq_padded = str(seq_val).zfill(3)
+
         client_name_clean = str(client_name).strip() if client_name else "Client"
         
         # Format: IN-PUN-170226-001-Viprachit Walkay
@@ -1,11 +1,16 @@
 # app/routers/locations.py
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from typing import Optional
-from app.services.supabase_client import supabase
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+from app.services.supabase_client import supabase, execute, with_actor, get_locations, edit_sub_locations
+from app.services.cache import reference_cache, json_response
+from app.services.sessions import get_user_name
+from app.services.events import publish
 
 router = APIRouter()
 
+MAX_SUB_LOCATION_CHANGES = 500
+
 class LocationInput(BaseModel):
     id: Optional[str] = None
     name: str
@@ -14,72 +19,87 @@ class LocationInput(BaseModel):
     is_active: bool = True
 
 @router.get("", summary="List all active locations")
-def api_get_locations():
-    res = supabase.table("locations").select("*").eq("is_active", True).order("name").execute()
-    return res.data
+async def api_get_locations(request: Request):
+    return json_response(request, await get_locations(active_only=True))
 
 @router.get("/all", summary="List ALL locations (including inactive) for admin")
-def api_get_all_locations():
-    res = supabase.table("locations").select("*").order("name").execute()
-    return res.data
-
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
+async def api_get_all_locations(request: Request):
+    return json_response(request, await get_locations(active_only=False))
 
 @router.post("", summary="Add or update a location")
-def api_upsert_location(request: Request, loc: LocationInput):
+async def api_upsert_location(request: Request, loc: LocationInput):
     payload = loc.model_dump(exclude_unset=True)
-    payload["created_by"] = request.headers.get("X-User-Name", "System")
+    payload["created_by"] = get_user_name(request)
 
     try:
-        res = supabase.table("locations").upsert(payload, returning="representation").execute()
+        res = await execute(with_actor(supabase.table("locations").upsert(payload, returning="representation"),
+                                       get_user_name(request)))
+        reference_cache.invalidate("locations")
+        publish("locations", op="upsert", ids=[row.get("id") for row in res.data or []])
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.patch("/{id}/toggle", summary="Toggle location active/inactive")
-def api_toggle_location(id: str, is_active: bool = True):
+async def api_toggle_location(request: Request, id: str, is_active: bool = True):
     try:
-        res = supabase.table("locations").update({"is_active": is_active}).eq("id", id).execute()
+        res = await execute(with_actor(supabase.table("locations").update({"is_active": is_active}).eq("id", id),
+                                       get_user_name(request)))
+        reference_cache.invalidate("locations")
+        publish("locations", op="update", ids=[id])
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+class SubLocationChange(BaseModel):
+    location_id: str
+    op: Literal["add", "remove"]
+    name: str
+
+class SubLocationBatch(BaseModel):
+    changes: list[SubLocationChange] = Field(..., min_length=1, max_length=MAX_SUB_LOCATION_CHANGES)
+
+async def apply_sub_location_changes(changes: list, actor: str) -> list:
+    """One RPC: the array is edited inside Postgres under the row lock (no read-modify-write)."""
+    rows = await edit_sub_locations(changes, actor)
+    reference_cache.invalidate("locations")
+    if rows:
+        publish("locations", op="sub_locations", ids=[row.get("id") for row in rows])
+    return rows
+
 @router.post("/{id}/sub-location", summary="Add a single sub-location to a location")
-def api_add_sub_location(id: str, name: str):
+async def api_add_sub_location(request: Request, id: str, name: str):
     """Adds a sub-location name to the location's sub_locations JSONB array if not already present."""
     try:
-        # Fetch the current location
-        loc = supabase.table("locations").select("sub_locations").eq("id", id).maybe_single().execute()
-        if not loc or not loc.data:
-            raise HTTPException(status_code=404, detail="Location not found")
-
-        current_subs = loc.data.get("sub_locations", []) or []
-        if name not in current_subs:
-            current_subs.append(name)
-
-        res = supabase.table("locations").update({"sub_locations": current_subs}).eq("id", id).execute()
-        return {"status": "success", "data": res.data}
-    except HTTPException:
-        raise
+        rows = await apply_sub_location_changes([{"location_id": id, "op": "add", "name": name}], get_user_name(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Location not found")
+    return {"status": "success", "data": rows}
 
 @router.delete("/{id}/sub-location", summary="Delete a specific sub-location from a location")
-def api_delete_sub_location(id: str, name: str):
+async def api_delete_sub_location(request: Request, id: str, name: str):
     """Removes a sub-location by name from the location's sub_locations JSONB array."""
     try:
-        # Fetch the current location
-        loc = supabase.table("locations").select("sub_locations").eq("id", id).maybe_single().execute()
-        if not loc or not loc.data:
-            raise HTTPException(status_code=404, detail="Location not found")
-
-        current_subs = loc.data.get("sub_locations", []) or []
-        updated_subs = [s for s in current_subs if s != name]
+        rows = await apply_sub_location_changes([{"location_id": id, "op": "remove", "name": name}], get_user_name(request))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Location not found")
+    return {"status": "success", "data": rows}
 
-        res = supabase.table("locations").update({"sub_locations": updated_subs}).eq("id", id).execute()
-        return {"status": "success", "data": res.data}
-    except HTTPException:
-        raise
+@router.post("/sub-locations/bulk", summary="Add / remove many sub-locations across locations in one call")
+async def api_bulk_sub_locations(request: Request, batch: SubLocationBatch):
+    """
+    Applies every change in order inside one transaction: either all of them
+    land or none do. Locations that do not exist are listed under `missing`.
+    """
+    changes = [c.model_dump() for c in batch.changes]
+    try:
+        rows = await apply_sub_location_changes(changes, get_user_name(request))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    found = {str(r.get("id")) for r in rows}
+    missing = sorted({c["location_id"] for c in changes} - found)
+    return {"status": "success", "data": rows, "missing": missing}
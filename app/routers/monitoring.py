@@ -0,0 +1,77 @@
+# app/routers/monitoring.py
+import os
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from app.services.cache import reference_cache
+from app.services.sequence_allocator import invoice_numbers, document_numbers
+from app.services.metrics import render_metrics
+from app.services.assets import static_assets
+from app.services.startup import startup_report
+from app.services.payroll import payroll_cache
+from app.services.supabase_client import reads
+from app.services.events import event_bus
+from app.services.audit import audit_log
+from app.services.idempotency import idempotency_store
+from app.services import resilience
+from app.services.sessions import AUTH_REQUIRED
+
+router = APIRouter()
+
+# Scrapers authenticate with `Authorization: Bearer $METRICS_TOKEN`. The metrics
+# name every route, table and RPC with their latencies and error counts, so
+# without a token /metrics is closed (open only with AUTH_REQUIRED=0).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+def require_metrics_token(request: Request):
+    if not METRICS_TOKEN:
+        if AUTH_REQUIRED:
+            raise HTTPException(status_code=403, detail="Metrics are disabled (METRICS_TOKEN is not set)")
+        return
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+# Mounted at the root (/metrics) where Prometheus scrapers expect it
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics", summary="Prometheus metrics", include_in_schema=False,
+                    dependencies=[Depends(require_metrics_token)])
+async def api_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache", summary="Cache hit/miss counters")
+async def api_cache_stats():
+    return {"caches": [reference_cache.stats(), payroll_cache.stats()]}
+
+@router.get("/sequences", summary="Sequence block allocator counters")
+async def api_sequence_stats():
+    return {"allocators": [invoice_numbers.stats(), document_numbers.stats()]}
+
+@router.get("/static", summary="Precomputed static asset sizes")
+async def api_static_stats():
+    return static_assets.stats()
+
+@router.get("/startup", summary="Cold-start phase timings")
+async def api_startup_stats():
+    return startup_report.to_dict()
+
+@router.get("/singleflight", summary="Coalesced upstream read counters")
+async def api_singleflight_stats():
+    return reads.stats()
+
+@router.get("/events", summary="Event stream connections and fan-out counters")
+async def api_event_stats():
+    return event_bus.stats()
+
+@router.get("/audit", summary="Audit queue depth and write-behind counters")
+async def api_audit_stats():
+    return audit_log.stats()
+
+@router.get("/idempotency", summary="Idempotency key store counters")
+async def api_idempotency_stats():
+    return idempotency_store.stats()
+
+@router.get("/upstream", summary="Circuit breaker state, deadlines and injected faults")
+async def api_upstream_stats():
+    return resilience.stats()
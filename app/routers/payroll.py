@@ -0,0 +1,38 @@
+# app/routers/payroll.py
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+from app.services.payroll import get_payroll, month_bounds
+from app.services.cache import json_response
+
+router = APIRouter()
+
+@router.get("/{month_year}", summary="Monthly payroll for all employees")
+async def api_get_payroll(
+    request: Request,
+    month_year: str,
+    employee_id: Optional[str] = None,
+    location: Optional[str] = None,
+    refresh: bool = False,
+):
+    """
+    Net salary, overtime and invoice-linked earnings for every employee, computed
+    server-side from employees, employee_leaves and invoices in one batched pass
+    and cached per month (see app/services/payroll.py). Filters apply to the
+    cached result (totals stay month-wide); refresh=true recomputes the month.
+    """
+    try:
+        month_bounds(month_year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = await get_payroll(month_year, refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if employee_id or location:
+        rows = [r for r in result["employees"]
+                if (not employee_id or r["employee_id"] == employee_id)
+                and (not location or r["work_location"] == location)]
+        result = {**result, "employees": rows}
+    return json_response(request, result)
@@ -1,9 +1,18 @@
+import logging
 from fastapi import APIRouter, HTTPException, Query, Request, Request
 from pydantic import BaseModel
 from typing import Optional, List
-from app.services.supabase_client import upsert_service_rate, list_service_rates, get_service_rate, supabase
+from app.services.supabase_client import upsert_service_rate, list_service_rates, get_service_rates, supabase, execute
+from app.services.cache import reference_cache, json_response
+from app.services.rate_index import rate_index, RATE_INDEX_ENABLED
+from app.services.bulk import bulk_upsert
+from app.services.sessions import get_user_name
+from app.services.events import publish
+from app.services.audit import log_changes
+from app.services.resilience import UpstreamUnavailable
 
 router = APIRouter()
+logger = logging.getLogger("vesak.rates")
 
 class RateInput(BaseModel):
     id: Optional[str] = None
@@ -17,16 +26,8 @@ class RateInput(BaseModel):
     period: Optional[str] = "Per Day"
     market_rate: float
 
-def get_user_name(request: Request) -> str:
-    return request.headers.get("X-User-Name", "System")
-
-@router.post("", summary="Save or Update a service rate")
-async def create_or_update_rate(request: Request, rate: RateInput):
-    """
-    Creates or updates a service rate.
-    Min Rate = Market Rate + 8%
-    Max Rate = Market Rate + 15% (Quote Rate)
-    """
+def rate_payload(rate: RateInput, user_name: str) -> dict:
+    """Builds the service_rates row, deriving min/max from the market rate."""
     min_rate = round(rate.market_rate * 1.08, 2)
     max_rate = round(rate.market_rate * 1.15, 2)
     
@@ -42,29 +43,61 @@ async def create_or_update_rate(request: Request, rate: RateInput):
         "market_rate": rate.market_rate,
         "min_rate": min_rate,
         "max_rate": max_rate,
-        "created_by_name": get_user_name(request),
-        "updated_by_name": get_user_name(request)
+        "created_by_name": user_name,
+        "updated_by_name": user_name
     }
     
     if rate.id:
         payload["id"] = rate.id
+    return payload
+
+@router.post("", summary="Save or Update a service rate")
+async def create_or_update_rate(request: Request, rate: RateInput):
+    """
+    Creates or updates a service rate.
+    Min Rate = Market Rate + 8%
+    Max Rate = Market Rate + 15% (Quote Rate)
+    """
+    payload = rate_payload(rate, get_user_name(request))
         
     try:
         # Check if updating by ID or creating new
-        res = upsert_service_rate(payload)
+        res = await upsert_service_rate(payload, payload["updated_by_name"])
+        reference_cache.invalidate("service_rates")
+        for row in res.data or []:
+            rate_index.upsert(row)
+        publish("rates", op="upsert", ids=[row.get("id") for row in res.data or []])
         return {"status": "success", "data": res.data}
     except Exception as e:
-        print(f"Error saving rate: {e}")
+        logger.warning("Error saving rate: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", summary="Bulk save service rates (JSON array or NDJSON)")
+async def bulk_create_or_update_rates(request: Request):
+    user_name = get_user_name(request)
+
+    def on_written(rows: list):
+        for row in rows:
+            rate_index.upsert(row)
+
+    try:
+        report = await bulk_upsert(request, "service_rates", RateInput, lambda rate: rate_payload(rate, user_name),
+                                   on_written=on_written, audit_actor=user_name)
+    finally:
+        reference_cache.invalidate("service_rates")
+    if report.upserted:
+        # Too many ids to be useful; listeners reload the rate table
+        publish("rates", op="bulk", count=report.upserted)
+    return report.as_dict()
+
 @router.get("", summary="List filtered service rates")
 async def get_rates(
+    request: Request,
     location: Optional[str] = None, 
     service_category: Optional[str] = None
 ):
     try:
-        res = list_service_rates(location, service_category)
-        return res.data
+        return json_response(request, await get_service_rates(location, service_category))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -78,49 +111,42 @@ async def lookup_rate(
 ):
     """
     Finds a specific rate for the Inquiry Form.
-    Fallback: tries sub_location first, then location-level rate.
+    Fallback: tries sub_location first, then location-level rate, then any rate for the location.
+    Resolved from the in-memory rate index; with RATE_INDEX=0 the same chain runs
+    in the resolve_service_rate() Postgres function in a single call.
+    {} means no rate matches; a failed lookup is an error (503 / 502), not {}.
     """
     try:
-        # 1. Try specific sub-location rate first
-        if sub_location:
-            q = supabase.table("service_rates") \
-                .select("*") \
-                .eq("location", location) \
-                .eq("sub_location", sub_location) \
-                .eq("service_category", service) \
-                .eq("plan_type", plan) \
-                .eq("shift_type", shift) \
-                .maybe_single() \
-                .execute()
-            if q and q.data:
-                return q.data
+        if RATE_INDEX_ENABLED:
+            await rate_index.ensure_loaded(_load_all_rates)
+            return rate_index.resolve(location, service, plan, shift, sub_location) or {}
 
-        # 2. Fallback to location-level rate (sub_location is NULL)
-        res = supabase.table("service_rates") \
-            .select("*") \
-            .eq("location", location) \
-            .is_("sub_location", "null") \
-            .eq("service_category", service) \
-            .eq("plan_type", plan) \
-            .eq("shift_type", shift) \
-            .maybe_single() \
-            .execute()
-        if res and res.data:
-            return res.data
+        res = await execute(supabase.rpc("resolve_service_rate", {
+            "p_location": location,
+            "p_service": service,
+            "p_plan": plan,
+            "p_shift": shift,
+            "p_sub_location": sub_location,
+        }))
+        return res.data or {}
+    except UpstreamUnavailable:
+        raise
+    except Exception:
+        logger.exception("Rate lookup failed for %s / %s / %s / %s", location, service, plan, shift)
+        raise HTTPException(status_code=502, detail="Rate lookup failed")
 
-        # 3. Last fallback: original function (no sub_location filter)
-        res = get_service_rate(location, service, plan, shift)
-        if res and res.data:
-            return res.data
-        return {}
-    except Exception as e:
-        print(f"Rate lookup error: {e}")
-        return {}
+async def _load_all_rates() -> list:
+    res = await list_service_rates()
+    return res.data or []
 
 @router.delete("/{rate_id}")
-async def delete_rate(rate_id: str):
+async def delete_rate(request: Request, rate_id: str):
     try:
-        res = supabase.table("service_rates").delete().eq("id", rate_id).execute()
+        res = await execute(supabase.table("service_rates").delete().eq("id", rate_id))
+        reference_cache.invalidate("service_rates")
+        rate_index.remove(rate_id)
+        publish("rates", op="delete", ids=[rate_id])
+        await log_changes("service_rates", get_user_name(request), res.data)
         return {"status": "success", "data": res.data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,32 @@
+# app/routers/search.py
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.services.supabase_client import search_directory
+
+router = APIRouter()
+
+SEARCH_KINDS = ("customer", "staff", "employee")
+
+@router.get("", summary="Typeahead search over customers, staff and employees")
+async def api_search(
+    q: str = Query(..., min_length=2, description="Name or mobile fragment"),
+    kinds: Optional[str] = Query(None, description="Comma-separated subset of customer,staff,employee"),
+    location: Optional[str] = Query(None, description="Restrict results to this location (staff have none and are left out)"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Prefix and fuzzy (trigram) matches in one indexed round-trip, ranked:
+    exact > prefix > word prefix > similarity; 2-character queries match
+    prefixes only. Each result carries `kind`, `id`, `name`, `mobile`,
+    `location`, `sub_location` and `score`.
+    """
+    wanted = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else list(SEARCH_KINDS)
+    bad = [k for k in wanted if k not in SEARCH_KINDS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid kind(s): {', '.join(bad)}")
+
+    try:
+        res = await search_directory(q, wanted, location, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "results": res.data or []}
@@ -1,9 +1,11 @@
 # app/routers/users.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
-import hashlib
-from app.services.supabase_client import supabase
+from app.services.passwords import hash_password
+from app.services.supabase_client import supabase, execute
+from app.services.sessions import SessionUser, require_session, denylist, get_user_name
+from app.services.audit import log_changes
 
 router = APIRouter()
 
@@ -24,6 +26,21 @@ ROLE_HIERARCHY = {
     "Operator":        []
 }
 
+def require_manages(session: SessionUser, target_role: str):
+    """403 unless the caller's role may manage users holding `target_role`."""
+    # Sessions without a role only exist with AUTH_REQUIRED=0 (local use)
+    if session.role and target_role not in ROLE_HIERARCHY.get(session.role, []):
+        raise HTTPException(
+            status_code=403,
+            detail=f"User with role '{session.role}' is not allowed to manage role '{target_role}'"
+        )
+
+async def load_user(user_id: str) -> dict:
+    res = await execute(supabase.table("users").select("*").eq("id", user_id).limit(1))
+    if not res.data:
+        raise HTTPException(status_code=404, detail="User not found")
+    return res.data[0]
+
 # Roles each viewer is allowed to SEE in their user list
 VISIBLE_ROLES = {
     "Founding Member": None,  # sees ALL
@@ -48,22 +65,37 @@ class UserInput(BaseModel):
     page_access: Optional[dict] = {}
 
 @router.get("/", summary="List users (filtered by viewer role)")
-def api_get_users(viewer_role: Optional[str] = Query(None)):
+async def api_get_users(
+    viewer_role: Optional[str] = Query(None, deprecated=True),
+    session: SessionUser = Depends(require_session),
+):
     query = supabase.table("users").select(
         "id, username, display_name, role, is_active, created_at, last_login, created_by, permissions, page_access"
     ).order("created_at")
 
+    # The viewer's role comes from the session token; the query param is only
+    # honoured for unauthenticated local use (AUTH_REQUIRED=0)
+    if session.role:
+        viewer_role = session.role
+        if viewer_role not in VISIBLE_ROLES:
+            raise HTTPException(status_code=403, detail=f"Role '{viewer_role}' cannot list users")
+
     # Apply role-based filtering
     if viewer_role and viewer_role in VISIBLE_ROLES:
         allowed = VISIBLE_ROLES[viewer_role]
         if allowed is not None:
             query = query.in_("role", allowed)
 
-    res = query.execute()
+    res = await execute(query)
     return res.data
 
 @router.post("/", summary="Create or update user")
-def api_upsert_user(user: UserInput):
+async def api_upsert_user(user: UserInput, session: SessionUser = Depends(require_session)):
+    # Creator identity comes from the session, not the request body
+    if session.role:
+        user.creator_role = session.role
+        user.created_by = session.username
+
     # Tiered role creation enforcement
     if not user.id:
         if not user.creator_role or user.role not in ROLE_HIERARCHY.get(user.creator_role, []):
@@ -71,6 +103,15 @@ def api_upsert_user(user: UserInput):
                 status_code=403,
                 detail=f"User with role '{user.creator_role}' is not allowed to create role '{user.role}'"
             )
+        before = {}
+    else:
+        # Updates: the caller must manage both the current and the new role
+        current = await load_user(user.id)
+        if session.id and user.id == session.id and user.role != current.get("role"):
+            raise HTTPException(status_code=403, detail="You cannot change your own role")
+        require_manages(session, current.get("role"))
+        require_manages(session, user.role)
+        before = {str(current["id"]): current}
 
     payload = {
         "username": user.username,
@@ -92,28 +133,47 @@ def api_upsert_user(user: UserInput):
         raise HTTPException(status_code=400, detail="Password is required for new users")
 
     if user.password:
-        payload["password_hash"] = hashlib.sha256(user.password.encode('utf-8')).hexdigest()
+        payload["password_hash"] = await hash_password(user.password)
 
     try:
-        res = supabase.table("users").upsert(payload).execute()
+        res = await execute(supabase.table("users").upsert(payload))
+        if user.id:
+            # Role / access changes take effect on the next login
+            denylist.revoke_user(user.id)
+        await log_changes("users", session.username or "System", before, res.data)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.patch("/{user_id}/reset-password", summary="Reset user password")
-def api_reset_password(user_id: str, payload: dict):
+async def api_reset_password(request: Request, user_id: str, payload: dict,
+                             session: SessionUser = Depends(require_session)):
     new_password = payload.get("password")
     if not new_password:
         raise HTTPException(status_code=400, detail="New password required")
 
-    password_hash = hashlib.sha256(new_password.encode('utf-8')).hexdigest()
+    current = await load_user(user_id)
+    require_manages(session, current.get("role"))
+    password_hash = await hash_password(new_password)
     try:
-        res = supabase.table("users").update({"password_hash": password_hash}).eq("id", user_id).execute()
+        before = {str(current["id"]): current}
+        res = await execute(supabase.table("users").update({"password_hash": password_hash}).eq("id", user_id))
+        denylist.revoke_user(user_id)
+        await log_changes("users", get_user_name(request), before, res.data, action="reset_password")
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.patch("/{user_id}/toggle", summary="Toggle user active status")
-def api_toggle_user_status(user_id: str, is_active: bool):
-    res = supabase.table("users").update({"is_active": is_active}).eq("id", user_id).execute()
+async def api_toggle_user_status(request: Request, user_id: str, is_active: bool,
+                                 session: SessionUser = Depends(require_session)):
+    if session.id and user_id == session.id:
+        raise HTTPException(status_code=403, detail="You cannot change your own status")
+    current = await load_user(user_id)
+    require_manages(session, current.get("role"))
+    before = {str(current["id"]): current}
+    res = await execute(supabase.table("users").update({"is_active": is_active}).eq("id", user_id))
+    if not is_active:
+        denylist.revoke_user(user_id)
+    await log_changes("users", get_user_name(request), before, res.data)
     return {"status": "success"}
@@ -0,0 +1,179 @@
+# app/services/assets.py
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+from typing import Optional
+from starlette.responses import Response, PlainTextResponse
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only without it
+    brotli = None
+
+# Build-free asset pipeline. At startup every file under static/ is read once and
+# hashed; template JS also gets a fingerprinted name (templates/dashboard.3f9a1c2b.js)
+# which the HTML pages are rewritten to use. gzip / brotli variants are computed
+# afterwards in the background (compress()), so they never delay the first request.
+# Fingerprinted files never change, so they are cached for a year as immutable;
+# HTML always revalidates so a deploy is picked up on the next page load.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = (".html", ".js", ".css", ".json", ".svg", ".txt")
+MIN_COMPRESS_SIZE = 1024
+
+_SCRIPT_RE = re.compile(r'src="((?:/?static/)?templates/)([\w-]+)\.js(?:\?v=\d+)?"')
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    """{coding: q} from an Accept-Encoding header; a coding with q=0 is refused."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+class Asset:
+    __slots__ = ("body", "gzip", "br", "digest", "media_type", "cache_control", "compressible")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, compressible: bool):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.compressible = compressible and len(body) >= MIN_COMPRESS_SIZE
+        self.gzip = self.br = None
+
+    def compress(self):
+        if self.compressible and self.gzip is None:
+            self.gzip = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(self.body, quality=11)
+
+    def variant(self, accept_encoding: str):
+        # Each encoding is its own representation, so it gets its own strong ETag.
+        # The highest q wins (br on a tie); "*" covers codings not listed.
+        accepted = accepted_encodings(accept_encoding)
+        best = None
+        for body, coding, suffix in ((self.br, "br", "-br"), (self.gzip, "gzip", "-gz")):
+            q = accepted.get(coding, accepted.get("*", 0.0))
+            if body is not None and q > 0 and (best is None or q > best[0]):
+                best = (q, body, coding, suffix)
+        if best is not None:
+            _, body, coding, suffix = best
+            return body, coding, f'"{self.digest}{suffix}"'
+        return self.body, None, f'"{self.digest}"'
+
+def _media_type(path: str) -> str:
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type.endswith("javascript"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+class StaticAssets:
+    """
+    ASGI app replacing StaticFiles for the frontend mount. Serves only the
+    files found at load() time (no filesystem access per request), with
+    strong ETags, Accept-Encoding negotiation and per-type Cache-Control.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets = {}        # url path ("templates/shared.js") -> Asset
+        self.fingerprints = {}  # "templates/shared.js" -> "templates/shared.<hash>.js"
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.assets)
+
+    def load(self):
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    files[rel] = f.read()
+
+        assets, fingerprints = {}, {}
+        for rel, body in files.items():
+            if rel.startswith("templates/") and rel.endswith(".js"):
+                digest = hashlib.sha256(body).hexdigest()[:8]
+                hashed = f"{rel[:-3]}.{digest}.js"
+                fingerprints[rel] = hashed
+                assets[hashed] = Asset(body, _media_type(rel), IMMUTABLE, compressible=True)
+
+        for rel, body in files.items():
+            if rel.endswith(".html"):
+                body = self._rewrite_scripts(body, fingerprints)
+            assets[rel] = Asset(body, _media_type(rel), REVALIDATE, compressible=rel.endswith(COMPRESSIBLE))
+
+        self.assets, self.fingerprints = assets, fingerprints
+
+    def compress(self):
+        """Fills in gzip / brotli variants (CPU heavy; run in a thread after startup)."""
+        for asset in list(self.assets.values()):
+            asset.compress()
+
+    @staticmethod
+    def _rewrite_scripts(html: bytes, fingerprints: dict) -> bytes:
+        def repl(m):
+            hashed = fingerprints.get(f"templates/{m.group(2)}.js")
+            if hashed is None:
+                return m.group(0)
+            return f'src="{m.group(1)}{hashed[len("templates/"):]}"'
+        return _SCRIPT_RE.sub(repl, html.decode("utf-8")).encode("utf-8")
+
+    def _lookup(self, path: str) -> Optional[Asset]:
+        rel = path.lstrip("/")
+        if rel == "" or rel.endswith("/"):
+            rel += "index.html"
+        return self.assets.get(rel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if not self.loaded:
+            self.load()
+
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+            return await response(scope, receive, send)
+
+        asset = self._lookup(scope["path"])
+        if asset is None:
+            return await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+
+        headers = dict((k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in scope["headers"])
+        body, encoding, etag = asset.variant(headers.get("accept-encoding", ""))
+        base = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+
+        # Any encoding's tag proves the client holds the current content
+        if_none_match = headers.get("if-none-match", "")
+        if if_none_match and (if_none_match.strip() == "*" or asset.digest in if_none_match):
+            return await Response(status_code=304, headers=base)(scope, receive, send)
+
+        if encoding:
+            base["Content-Encoding"] = encoding
+        await Response(body, media_type=asset.media_type, headers=base)(scope, receive, send)
+
+    def stats(self) -> dict:
+        raw = sum(len(a.body) for a in self.assets.values())
+        gz = sum(len(a.gzip or a.body) for a in self.assets.values())
+        br = sum(len(a.br or a.gzip or a.body) for a in self.assets.values())
+        return {"files": len(self.assets), "fingerprinted": len(self.fingerprints),
+                "bytes": raw, "gzip_bytes": gz, "brotli_bytes": br}
+
+static_assets = StaticAssets(os.getenv("STATIC_DIR", "static"))
@@ -0,0 +1,190 @@
+# app/services/audit.py
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from app.services.supabase_client import supabase, execute
+from app.services.metrics import audit_entries
+
+# Write-behind audit trail. Inserts and updates of locations, service_rates,
+# budgets, expenses and employees are diffed in the database by the phase34
+# trigger (the write names its actor with with_actor()), so no row is read
+# just for the audit. Everything else - deletes, and invoices / users, whose
+# routers already hold the old row - hands before/after to log_changes(); the
+# field-level diff is queued in memory and a background task inserts it into
+# audit_log in batches, so a request never waits on the audit insert.
+#
+# The queue is bounded (AUDIT_QUEUE_SIZE). When it is full (audit_log is slow
+# or down) writers wait up to AUDIT_ENQUEUE_TIMEOUT for room, then the entry is
+# dropped and counted rather than holding the request any longer.
+AUDIT_ENABLED = os.getenv("AUDIT_LOG", "1") not in ("0", "false", "False")
+QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+ENQUEUE_TIMEOUT = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "0.5"))
+RETRIES = 3
+
+# Bumped on every write, so they would only add noise to each diff
+IGNORED_FIELDS = {"updated_at", "updated_by_name"}
+# Recorded as changed, never with their values
+REDACTED_FIELDS = {"password_hash", "password"}
+REDACTED = "[redacted]"
+
+logger = logging.getLogger("vesak.audit")
+
+def diff(before: dict, after: dict) -> dict:
+    """{field: {"from": old, "to": new}} for every field whose value differs."""
+    before, after = before or {}, after or {}
+    changes = {}
+    for field in sorted(before.keys() | after.keys()):
+        if field in IGNORED_FIELDS:
+            continue
+        old, new = before.get(field), after.get(field)
+        if old == new:
+            continue
+        if field in REDACTED_FIELDS:
+            old, new = old and REDACTED, new and REDACTED
+        changes[field] = {"from": old, "to": new}
+    return changes
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class AuditLog:
+    def __init__(self, maxsize: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.queue = asyncio.Queue(maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._task = None
+        self._held = []   # the batch the writer has taken off the queue but not yet stored
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.waited = 0
+        self.failed_batches = 0
+        self.last_error = None
+        self.last_flush_at = None
+
+    async def record(self, entry: dict):
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            # Backpressure: the writer is behind, so this request waits for room
+            self.waited += 1
+            try:
+                await asyncio.wait_for(self.queue.put(entry), ENQUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                audit_entries.inc("dropped")
+                logger.warning("audit queue full, dropped %s %s on %s",
+                               entry["action"], entry["row_id"], entry["table_name"])
+                return
+        self.queued += 1
+        audit_entries.inc("queued")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5):
+        """Stops the writer and stores whatever is still queued (bounded by `timeout`)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        pending, self._held = self._held, []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        try:
+            for start in range(0, len(pending), self.batch_size):
+                await asyncio.wait_for(self._flush(pending[start:start + self.batch_size]), timeout)
+        except asyncio.TimeoutError:
+            logger.error("audit shutdown timed out; %d entries not stored", len(pending) - start)
+
+    async def _run(self):
+        while True:
+            self._held = [await self.queue.get()]
+            # Let a batch build up unless one is already waiting
+            if self.queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+            while len(self._held) < self.batch_size and not self.queue.empty():
+                self._held.append(self.queue.get_nowait())
+            await self._flush(self._held)
+            self._held = []
+
+    async def _flush(self, batch: list):
+        for attempt in range(RETRIES):
+            try:
+                # Entries carry their own id, so a batch retried after an
+                # ambiguous failure (or at shutdown) is not stored twice
+                await execute(supabase.table("audit_log").upsert(
+                    batch, on_conflict="id", ignore_duplicates=True, returning="minimal"))
+                self.written += len(batch)
+                self.last_flush_at = _now()
+                audit_entries.inc("written", amount=len(batch))
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt < RETRIES - 1:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        self.failed_batches += 1
+        self.dropped += len(batch)
+        audit_entries.inc("dropped", amount=len(batch))
+        logger.error("audit batch of %d entries dropped after %d attempts: %s", len(batch), RETRIES, self.last_error)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": AUDIT_ENABLED,
+            "running": self._task is not None,
+            "queue": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "waited_for_room": self.waited,
+            "failed_batches": self.failed_batches,
+            "last_flush_at": self.last_flush_at,
+            "last_error": self.last_error,
+        }
+
+audit_log = AuditLog()
+
+async def log_changes(table: str, actor: str, before: dict = None, after: list = None, action: str = None):
+    """
+    Queues one entry per changed row of `after`: creates when the row is not in
+    `before`, updates (skipped when nothing changed) when it is. Without `after`
+    every row of `before` is logged as deleted. `before` is the old rows by id
+    (or as returned by a delete); `action` overrides the derived name.
+    """
+    if not AUDIT_ENABLED:
+        return
+    known = before is not None
+    if isinstance(before, list):
+        before = {str(row.get("id")): row for row in before}
+    before = dict(before or {})
+    rows = [(str(row.get("id")), row) for row in after or []]
+    for row_id, row in rows:
+        old = before.pop(row_id, None)
+        name = action or ("write" if not known else "update" if old is not None else "create")
+        changes = diff(old, row)
+        if changes:
+            await audit_log.record(_entry(table, row_id, name, actor, changes))
+    if after is None:
+        for row_id, old in before.items():
+            await audit_log.record(_entry(table, row_id, action or "delete", actor, diff(old, None)))
+
+def _entry(table: str, row_id: str, action: str, actor: str, changes: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "table_name": table,
+        "row_id": row_id,
+        "action": action,
+        "actor": actor,
+        "changes": changes,
+        "created_at": _now(),
+    }
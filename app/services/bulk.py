@@ -0,0 +1,138 @@
+# app/services/bulk.py
+import os
+import json
+from typing import Callable, Optional, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from app.services.supabase_client import supabase, execute, with_actor
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+MAX_REPORTED_ERRORS = 1000
+
+def _is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return "ndjson" in content_type or "jsonl" in content_type
+
+async def iter_records(request: Request):
+    """
+    Yields (index, record) from either a JSON array body or an NDJSON stream.
+    NDJSON is parsed line by line as it arrives, so large files are never held
+    in memory at once. Unparseable lines are yielded as ValueError instances.
+    """
+    if not _is_ndjson(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or an NDJSON stream")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or an NDJSON stream")
+        for i, record in enumerate(body):
+            yield i, record
+        return
+
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _parse_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, _parse_line(buffer)
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+class BulkReport:
+    def __init__(self):
+        self.received = 0
+        self.upserted = 0
+        self.errors = []
+
+    def fail(self, index: int, error):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "error": error})
+
+    def as_dict(self) -> dict:
+        failed = self.received - self.upserted
+        return {
+            "status": "success" if not failed else ("partial" if self.upserted else "failed"),
+            "received": self.received,
+            "upserted": self.upserted,
+            "failed": failed,
+            "errors": self.errors,
+        }
+
+async def _write_chunk(table: str, chunk: list, on_conflict: str, report: BulkReport, on_written, audit_actor):
+    returning = "representation" if on_written else "minimal"
+
+    # PostgREST fills missing keys for every row of a multi-row upsert, so rows
+    # are grouped by key set to avoid nulling columns a row did not send.
+    groups = {}
+    for index, payload in chunk:
+        groups.setdefault(frozenset(payload), []).append((index, payload))
+
+    for rows in groups.values():
+        try:
+            res = await execute(with_actor(supabase.table(table).upsert(
+                [p for _, p in rows], on_conflict=on_conflict, default_to_null=False, returning=returning,
+            ), audit_actor))
+            report.upserted += len(rows)
+            if on_written:
+                on_written(res.data or [])
+        except Exception:
+            # Retry row by row so the report pinpoints the offending records
+            for index, payload in rows:
+                try:
+                    res = await execute(with_actor(supabase.table(table).upsert(
+                        payload, on_conflict=on_conflict, default_to_null=False, returning=returning,
+                    ), audit_actor))
+                    report.upserted += 1
+                    if on_written:
+                        on_written(res.data or [])
+                except Exception as e:
+                    report.fail(index, str(e))
+
+async def bulk_upsert(
+    request: Request,
+    table: str,
+    model: Type[BaseModel],
+    to_payload: Callable[[BaseModel], dict],
+    on_conflict: str = "",
+    chunk_size: Optional[int] = None,
+    on_written: Optional[Callable[[list], None]] = None,
+    audit_actor: Optional[str] = None,
+) -> BulkReport:
+    """
+    Validates each record with `model`, converts it with `to_payload` and writes
+    multi-row upserts of `chunk_size` rows. Invalid rows are reported, not fatal.
+    `on_written` receives the rows returned by each successful write;
+    `audit_actor` names the writer for the audit trigger (phase34).
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    report = BulkReport()
+    chunk = []
+
+    async for index, record in iter_records(request):
+        report.received += 1
+        if isinstance(record, Exception):
+            report.fail(index, str(record))
+            continue
+        try:
+            payload = to_payload(model.model_validate(record))
+        except ValidationError as e:
+            report.fail(index, e.errors(include_url=False, include_context=False))
+            continue
+        chunk.append((index, payload))
+        if len(chunk) >= chunk_size:
+            await _write_chunk(table, chunk, on_conflict, report, on_written, audit_actor)
+            chunk = []
+
+    if chunk:
+        await _write_chunk(table, chunk, on_conflict, report, on_written, audit_actor)
+    return report
@@ -0,0 +1,132 @@
+# app/services/cache.py
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.services.resilience import UpstreamUnavailable
+
+class TTLCache:
+    """
+    Small in-process LRU cache with per-entry TTL.
+    Keys are tuples whose first element is the source table, so writes can
+    invalidate everything derived from a table with invalidate("locations").
+    Expired entries stay (until evicted or invalidated) so get_stale() can
+    still answer while the upstream is unreachable. Every invalidate() bumps a
+    generation, so a load that started before it is not cached after it.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generation = 0       # bumped by invalidate() of the whole cache
+        self._generations = {}     # table -> bumped by invalidate(table)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+        self.discarded_loads = 0
+
+    def get(self, key):
+        """Returns (found, value)."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def get_stale(self, key):
+        """Returns (found, value) ignoring the TTL; for use when a reload failed."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        self.stale_hits += 1
+        return True, entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self, table: str) -> tuple:
+        """Changes whenever `table` (or the whole cache) is invalidated."""
+        return self._generation, self._generations.get(table, 0)
+
+    def invalidate(self, table: str = None):
+        """Drops every entry for `table`, or the whole cache when no table is given."""
+        if table is None:
+            self._data.clear()
+            self._generation += 1
+        else:
+            for key in [k for k in self._data if k[0] == table]:
+                del self._data[key]
+            self._generations[table] = self._generations.get(table, 0) + 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_hits": self.stale_hits,
+            "discarded_loads": self.discarded_loads,
+        }
+
+# Reference data (locations, service rates, budgets) changes a few times a month.
+reference_cache = TTLCache(
+    "reference",
+    maxsize=int(os.getenv("REFERENCE_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("REFERENCE_CACHE_TTL", "300")),
+)
+
+async def cached(cache: TTLCache, key: tuple, loader):
+    """
+    Returns the cached value for `key`, awaiting `loader()` to fill it on a miss.
+    While Supabase is unreachable an expired value is served instead of failing.
+    A value whose load overlapped an invalidate() of its table is returned but
+    not cached: it may predate the write that invalidated it.
+    """
+    found, value = cache.get(key)
+    if found:
+        return value
+    generation = cache.generation(key[0])
+    try:
+        value = await loader()
+    except UpstreamUnavailable:
+        found, value = cache.get_stale(key)
+        if found:
+            return value
+        raise
+    if cache.generation(key[0]) != generation:
+        cache.discarded_loads += 1
+        return value
+    cache.set(key, value)
+    return value
+
+def json_response(request: Request, data) -> Response:
+    """
+    JSON response with a strong ETag. Browsers revalidate with If-None-Match and
+    get an empty 304 when nothing changed.
+    """
+    body = json.dumps(jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
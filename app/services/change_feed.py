@@ -0,0 +1,98 @@
+# app/services/change_feed.py
+import os
+import re
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from app.services.supabase_client import supabase, execute, quote, upstream_time
+
+# Delta sync over updated_at (phase30 migration). A client keeps the cursor
+# from its last response and asks for everything changed since; deletes come
+# back as tombstones from deleted_rows.
+#
+# updated_at is the writing transaction's start time, so a slow transaction can
+# commit a row older than a cursor already handed out. Once a client is caught
+# up, and while the newest change it was sent is younger than OVERLAP seconds,
+# the cursor is therefore held OVERLAP seconds behind it and the next poll
+# re-reads that window; merging is idempotent, so repeats are harmless. Once
+# that change is older than OVERLAP by Supabase's own clock (upstream_time(),
+# the Date of its responses) the window has settled and the cursor moves past
+# it, so an idle client gets an empty response instead of the same rows every
+# poll. This host's clock is never used, so clock skew cannot skip changes.
+OVERLAP = float(os.getenv("CHANGE_FEED_OVERLAP", "10"))
+RETENTION_DAYS = int(os.getenv("CHANGE_FEED_RETENTION_DAYS", "30"))
+MAX_CHANGES = 1000
+
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+class CursorExpired(ValueError):
+    """The cursor predates tombstone retention: the client must reload in full."""
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO-8601 from PostgREST or a client; naive values are taken as UTC."""
+    text = value.strip().replace(" ", "T").replace("Z", "+00:00")
+    # Python 3.10's fromisoformat needs exactly 3 or 6 fractional digits
+    text = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _iso(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).isoformat()
+
+async def changes_since(table: str, since: datetime, after_id: Optional[str] = None,
+                        limit: int = MAX_CHANGES, select: str = "*") -> dict:
+    """
+    Rows of `table` inserted / updated at or after `since` (strictly after
+    (since, after_id) when paging), oldest first, plus ids deleted since then.
+    """
+    now = datetime.now(timezone.utc)
+    if since < now - timedelta(days=RETENTION_DAYS):
+        raise CursorExpired(f"cursor is older than {RETENTION_DAYS} days")
+
+    ts = _iso(since)
+    query = supabase.table(table).select(select)
+    tombstones = supabase.table("deleted_rows").select("row_id,deleted_at").eq("table_name", table)
+    if after_id:
+        query = query.or_(f"updated_at.gt.{quote(ts)},and(updated_at.eq.{quote(ts)},id.gt.{quote(after_id)})")
+        # Tombstones at exactly `since` went out with the page that set the cursor
+        tombstones = tombstones.gt("deleted_at", ts)
+    else:
+        query = query.gte("updated_at", ts)
+        tombstones = tombstones.gte("deleted_at", ts)
+    rows_res, tombstones_res = await asyncio.gather(
+        execute(query.order("updated_at").order("id").limit(limit + 1)),
+        execute(tombstones),
+    )
+
+    rows = rows_res.data or []
+    has_more = len(rows) > limit
+    if has_more:
+        # Mid catch-up: exact keyset position, no overlap
+        rows = rows[:limit]
+        cursor, cursor_id = rows[-1]["updated_at"], str(rows[-1]["id"])
+    else:
+        last_row = parse_timestamp(rows[-1]["updated_at"]) if rows and rows[-1].get("updated_at") else None
+        seen = [parse_timestamp(t["deleted_at"]) for t in tombstones_res.data or [] if t.get("deleted_at")]
+        if last_row:
+            seen.append(last_row)
+        latest = max(seen, default=since)
+        server_now = upstream_time()
+        if server_now is None or server_now - latest < timedelta(seconds=OVERLAP):
+            cursor, cursor_id = _iso(max(since, latest - timedelta(seconds=OVERLAP))), None
+        elif last_row is not None and last_row == latest:
+            # Settled: exact keyset position after the newest row
+            cursor, cursor_id = rows[-1]["updated_at"], str(rows[-1]["id"])
+        elif not seen:
+            # Settled and nothing new: the cursor stays where it was
+            cursor, cursor_id = ts, after_id
+        else:
+            # Settled on a tombstone: just past it
+            cursor, cursor_id = _iso(latest + timedelta(microseconds=1)), None
+
+    return {
+        "changes": rows,
+        "deleted": [t["row_id"] for t in tombstones_res.data or []],
+        "cursor": cursor,
+        "cursor_id": cursor_id,
+        "has_more": has_more,
+    }
@@ -0,0 +1,295 @@
+# app/services/document_store.py
+import os
+import base64
+import shutil
+import hashlib
+import asyncio
+import logging
+import tempfile
+import mimetypes
+import weakref
+from pathlib import Path
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.services.supabase_client import (
+    supabase, execute, http_client, create_document, SUPABASE_URL, SUPABASE_SERVICE_KEY,
+)
+
+# Versioned document storage. File contents are content-addressed
+# (blobs/ab/<sha256>.pdf), so saving the same bytes twice never uploads twice,
+# and official_documents.metadata keeps the version history of each logical
+# name ("official/letter-12.pdf", "invoices/<invoice id>.pdf"). Uploads are
+# spooled to disk while they are hashed, then sent to storage in CHUNK_SIZE
+# pieces.
+#
+# DOCUMENT_STORE=local keeps blobs under DOCUMENT_STORE_DIR instead of Supabase
+# Storage (development, benchmarks, smoke tests); both expose exists/put/open.
+DOCUMENT_STORE = os.getenv("DOCUMENT_STORE", "supabase")
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", "data/documents")
+DOCUMENTS_BUCKET = os.getenv("DOCUMENTS_BUCKET", "documents")
+MAX_UPLOAD_BYTES = int(os.getenv("DOCUMENT_MAX_UPLOAD_MB", "50")) * 1024 * 1024
+MAX_VERSIONS = int(os.getenv("DOCUMENT_MAX_VERSIONS", "50"))
+
+# Supabase's resumable (TUS) endpoint takes exactly 6 MB per PATCH except the last
+CHUNK_SIZE = 6 * 1024 * 1024
+# Uploads stay in memory up to this size, then spill to a temp file
+SPOOL_BYTES = 1024 * 1024
+READ_SIZE = 64 * 1024
+# Blob keys already known to exist in storage (saves the existence check)
+KNOWN_BLOBS = 4096
+
+logger = logging.getLogger("vesak.documents")
+
+class UploadTooLarge(Exception):
+    pass
+
+class Upload:
+    """Spools incoming chunks to a temp file while hashing and counting them."""
+
+    def __init__(self, limit: int = MAX_UPLOAD_BYTES):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        self.limit = limit
+        self.size = 0
+        self._sha = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.limit:
+            raise UploadTooLarge(f"Upload exceeds {self.limit // (1024 * 1024)} MB")
+        self._sha.update(chunk)
+        self.file.write(chunk)
+
+    async def feed(self, chunks):
+        async for chunk in chunks:
+            if chunk:
+                self.write(chunk)
+        return self
+
+    @classmethod
+    def of(cls, content: bytes) -> "Upload":
+        upload = cls(limit=max(len(content), 1))
+        upload.write(content)
+        return upload
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def chunks(self, size: int = CHUNK_SIZE):
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+# --- Backends ---
+
+class SupabaseStore:
+    """Supabase Storage over the shared HTTP client (same pool and metrics as PostgREST)."""
+
+    name = "supabase"
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self.base = f"{SUPABASE_URL}/storage/v1"
+        self.headers = {"Authorization": f"Bearer {SUPABASE_SERVICE_KEY}", "apikey": SUPABASE_SERVICE_KEY}
+
+    async def exists(self, key: str) -> bool:
+        res = await http_client.head(f"{self.base}/object/authenticated/{self.bucket}/{key}", headers=self.headers)
+        return res.status_code == 200
+
+    async def put(self, key: str, upload: Upload, content_type: str):
+        if upload.size <= CHUNK_SIZE:
+            res = await http_client.post(
+                f"{self.base}/object/{self.bucket}/{key}",
+                content=next(upload.chunks(), b""),
+                headers={**self.headers, "Content-Type": content_type, "x-upsert": "true"},
+            )
+            res.raise_for_status()
+            return
+        await self._put_resumable(key, upload, content_type)
+
+    async def _put_resumable(self, key: str, upload: Upload, content_type: str):
+        def b64(value: str) -> str:
+            return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+        tus = {**self.headers, "Tus-Resumable": "1.0.0"}
+        res = await http_client.post(f"{self.base}/upload/resumable", headers={
+            **tus,
+            "x-upsert": "true",
+            "Upload-Length": str(upload.size),
+            "Upload-Metadata": ",".join(f"{k} {b64(v)}" for k, v in (
+                ("bucketName", self.bucket), ("objectName", key), ("contentType", content_type))),
+        })
+        res.raise_for_status()
+        location = res.headers["Location"]
+        offset = 0
+        for chunk in upload.chunks(CHUNK_SIZE):
+            res = await http_client.patch(location, content=chunk, headers={
+                **tus,
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            })
+            res.raise_for_status()
+            offset += len(chunk)
+
+    async def open(self, key: str):
+        async with http_client.stream("GET", f"{self.base}/object/authenticated/{self.bucket}/{key}",
+                                      headers=self.headers) as res:
+            if res.status_code in (400, 404):
+                raise FileNotFoundError(key)
+            res.raise_for_status()
+            async for chunk in res.aiter_bytes(READ_SIZE):
+                yield chunk
+
+class LocalStore:
+    """Files under a directory; disk I/O runs in worker threads."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid document key {key!r}")
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).is_file)
+
+    async def put(self, key: str, upload: Upload, content_type: str):
+        path = self._path(key)
+
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(path.name + ".part")
+            upload.file.seek(0)
+            with open(partial, "wb") as out:
+                shutil.copyfileobj(upload.file, out, CHUNK_SIZE)
+            os.replace(partial, path)   # readers never see half a file
+
+        await asyncio.to_thread(write)
+
+    async def open(self, key: str):
+        path = self._path(key)
+        handle = await asyncio.to_thread(open, path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(handle.read, READ_SIZE):
+                yield chunk
+        finally:
+            handle.close()
+
+def _backend():
+    if DOCUMENT_STORE == "local":
+        return LocalStore(DOCUMENT_STORE_DIR)
+    if DOCUMENT_STORE != "supabase":
+        raise RuntimeError(f"DOCUMENT_STORE must be 'supabase' or 'local', not {DOCUMENT_STORE!r}")
+    return SupabaseStore(DOCUMENTS_BUCKET)
+
+backend = _backend()
+
+# --- Blobs ---
+
+_known = OrderedDict()
+_name_locks = weakref.WeakValueDictionary()
+
+def blob_key(sha256: str, content_type: str) -> str:
+    ext = mimetypes.guess_extension(content_type or "") or ".bin"
+    return f"blobs/{sha256[:2]}/{sha256}{ext}"
+
+async def put_blob(upload: Upload, content_type: str) -> tuple:
+    """Stores the content unless an identical blob exists. Returns (key, uploaded)."""
+    key = blob_key(upload.sha256, content_type)
+    uploaded = False
+    if key not in _known and not await backend.exists(key):
+        await backend.put(key, upload, content_type)
+        uploaded = True
+    _known[key] = True
+    _known.move_to_end(key)
+    while len(_known) > KNOWN_BLOBS:
+        _known.popitem(last=False)
+    return key, uploaded
+
+async def open_blob(key: str):
+    """Async iterator over the blob; raises FileNotFoundError before the first chunk, not during it."""
+    chunks = backend.open(key)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+
+    async def body():
+        if first:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return body()
+
+# --- Versions ---
+
+async def find_document(name: str):
+    res = await execute(supabase.table("official_documents").select("*")
+                        .eq("metadata->>name", name).order("created_at", desc=True).limit(1))
+    return (res.data or [None])[0]
+
+async def get_document(document_id: str):
+    res = await execute(supabase.table("official_documents").select("*").eq("id", document_id).limit(1))
+    return (res.data or [None])[0]
+
+def versions(document: dict) -> list:
+    return (document.get("metadata") or {}).get("versions") or []
+
+async def save(upload: Upload, name: str, doc_type: str, *, title: str = None, user_name: str = None,
+               invoice_id: str = None, metadata: dict = None, content_type: str = "application/pdf") -> tuple:
+    """
+    Records `upload` as the next version of the document called `name`.
+    Returns (row, changed); changed is False when the content matches the
+    current version, in which case nothing is uploaded or written.
+    """
+    key, uploaded = await put_blob(upload, content_type)
+    now = datetime.now(timezone.utc).isoformat()
+    version = {"sha256": upload.sha256, "size": upload.size, "file_url": key,
+               "content_type": content_type, "created_at": now, "created_by": user_name}
+
+    # Two saves of one name must not both read version n and both write n + 1
+    lock = _name_locks.get(name)
+    if lock is None:
+        lock = _name_locks[name] = asyncio.Lock()
+    async with lock:
+        current = await find_document(name)
+        history = versions(current) if current else []
+        if history and history[-1].get("sha256") == upload.sha256:
+            return current, False
+
+        version["version"] = (history[-1].get("version", len(history)) if history else 0) + 1
+        history = (history + [version])[-MAX_VERSIONS:]
+        # metadata may carry a friendlier download name than the last part of `name`
+        file_name = (metadata or {}).get("file_name") or name.rsplit("/", 1)[-1]
+        meta = {**((current or {}).get("metadata") or {}), **(metadata or {}),
+                "name": name, "file_name": file_name, "sha256": upload.sha256,
+                "size": upload.size, "current_version": version["version"], "versions": history}
+        logger.info("document %s v%d (%d bytes, %s)", name, version["version"], upload.size,
+                    "uploaded" if uploaded else "deduplicated")
+
+        if current is None:
+            res = await create_document({
+                "title": title or name.rsplit("/", 1)[-1].rsplit(".", 1)[0],
+                "doc_type": doc_type,
+                "invoice_id": invoice_id,
+                "file_url": key,
+                "created_by": user_name,
+                "metadata": meta,
+            })
+        else:
+            changes = {"file_url": key, "metadata": meta}
+            if title:
+                changes["title"] = title
+            res = await execute(supabase.table("official_documents").update(changes).eq("id", current["id"]))
+        return (res.data or [{}])[0], True
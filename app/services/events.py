@@ -0,0 +1,184 @@
+# app/services/events.py
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Iterable
+from app.services.metrics import event_connections, events_published, event_resyncs
+
+# In-process pub/sub behind GET /api/events (server-sent events). Routers
+# publish a small notification after every write; each open stream holds one
+# bounded queue, so an idle browser costs a queue and the task awaiting it.
+# Payloads only say what changed -- clients fetch the rows themselves through
+# the delta feeds / ETag'd lists. One uvicorn worker, so one bus is the whole
+# fan-out; more workers would need a shared broker (e.g. Postgres LISTEN).
+
+TOPICS = ("invoices", "rates", "locations")
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "64"))
+HISTORY = int(os.getenv("EVENTS_HISTORY", "512"))
+HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "20"))
+RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "5000"))
+STANDIN_INTERVAL = float(os.getenv("EVENTS_STANDIN_INTERVAL", "0"))
+
+logger = logging.getLogger("vesak.events")
+
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+RETRY_FRAME = f"retry: {RETRY_MS}\n\n".encode()
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+
+class Event:
+    __slots__ = ("id", "seq", "topic", "data", "frame")
+
+    def __init__(self, boot: int, seq: int, topic: str, data: dict):
+        self.id = f"{boot}-{seq}"
+        self.seq = seq
+        self.topic = topic
+        self.data = data
+        # Encoded once, shared by every subscriber
+        payload = json.dumps(data, default=str, separators=(",", ":"))
+        self.frame = f"id: {self.id}\nevent: {topic}\ndata: {payload}\n\n".encode()
+
+class Subscription:
+    __slots__ = ("topics", "queue")
+
+    def __init__(self, topics: frozenset):
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, frame: bytes, reason: str = "overflow"):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if frame is HEARTBEAT_FRAME:
+                return  # a full queue is proof enough the stream is alive
+            # Too slow to keep up: drop the backlog, the client reloads instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+            event_resyncs.inc(reason)
+
+class EventBus:
+    """
+    Fan-out of change notifications to open event streams. publish() never
+    blocks the writer: a subscriber whose queue is full is sent a single
+    `resync` event in place of its backlog. The last HISTORY events are kept so
+    a reconnecting EventSource (Last-Event-ID) misses nothing.
+    """
+
+    def __init__(self):
+        # Event ids carry the boot time, so ids from before a restart are recognised
+        self.boot = int(time.time())
+        self._seq = 0
+        self._history = deque(maxlen=HISTORY)
+        self._subscribers = set()
+        self._heartbeat = None
+        self.published = 0
+
+    def publish(self, topic: str, data: Optional[dict] = None) -> Event:
+        if topic not in TOPICS:
+            raise ValueError(f"unknown event topic {topic!r}")
+        self._seq += 1
+        event = Event(self.boot, self._seq, topic, data or {})
+        self._history.append(event)
+        self.published += 1
+        events_published.inc(topic)
+        for sub in self._subscribers:
+            if topic in sub.topics:
+                sub.offer(event.frame)
+        return event
+
+    def subscribe(self, topics: Iterable[str] = TOPICS, last_event_id: Optional[str] = None) -> Subscription:
+        sub = Subscription(frozenset(topics))
+        if last_event_id:
+            self._replay(sub, last_event_id)
+        self._subscribers.add(sub)
+        event_connections.inc()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.ensure_future(self._beat())
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        if sub in self._subscribers:
+            self._subscribers.discard(sub)
+            event_connections.dec()
+
+    def _replay(self, sub: Subscription, last_event_id: str):
+        boot, _, seq = last_event_id.partition("-")
+        try:
+            seq = int(seq)
+        except ValueError:
+            seq = -1
+        oldest = self._history[0].seq if self._history else self._seq + 1
+        if boot != str(self.boot) or seq < oldest - 1 or seq > self._seq:
+            # Restarted since, or the gap is longer than the history we keep
+            sub.offer(RESYNC_FRAME)
+            event_resyncs.inc("replay_gap")
+            return
+        for event in self._history:
+            if event.seq > seq and event.topic in sub.topics:
+                sub.offer(event.frame, reason="replay_gap")
+
+    async def _beat(self):
+        # One timer for every stream instead of a timeout per connection. The
+        # comment line keeps proxies from closing idle streams and is how a
+        # dropped client gets noticed (the write to its socket fails).
+        while self._subscribers:
+            await asyncio.sleep(HEARTBEAT)
+            for sub in list(self._subscribers):
+                sub.offer(HEARTBEAT_FRAME)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._subscribers),
+            "published": self.published,
+            "last_event_id": f"{self.boot}-{self._seq}",
+            "history": len(self._history),
+            "queued": sum(sub.queue.qsize() for sub in self._subscribers),
+        }
+
+event_bus = EventBus()
+
+def publish(topic: str, **data) -> Event:
+    """Router-side shorthand: publish("invoices", op="update", ids=[invoice_id])."""
+    return event_bus.publish(topic, data)
+
+class StandInPublisher:
+    """
+    Emits synthetic notifications on a timer, cycling through the topics, for
+    local development and tests where nobody is writing. Enabled at startup
+    with EVENTS_STANDIN_INTERVAL=<seconds>; a client cannot tell these from
+    real ones except for "standin": true in the payload.
+    """
+
+    def __init__(self, bus: EventBus, interval: float):
+        self.bus = bus
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("stand-in event publisher every %.1fs", self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def emit(self, topic: str) -> Event:
+        return self.bus.publish(topic, {"op": "update", "ids": [], "standin": True})
+
+    async def _run(self):
+        n = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            self.emit(TOPICS[n % len(TOPICS)])
+            n += 1
+
+standin_publisher = StandInPublisher(event_bus, STANDIN_INTERVAL) if STANDIN_INTERVAL > 0 else None
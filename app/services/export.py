@@ -0,0 +1,163 @@
+# app/services/export.py
+import io
+import csv
+import json
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from xml.sax.saxutils import escape
+from fastapi.responses import StreamingResponse
+
+# Rows arrive as pages (lists of dicts) from pagination.iter_pages(); each page is
+# encoded and flushed before the next is fetched, so memory stays flat.
+# `labels` replaces the column names in the header row; `serial` names a leading
+# 1..n column (both as the dashboard's old in-browser CSV had them).
+
+def flatten(row: dict, prefix: str = "") -> dict:
+    """Flattens embedded resources ({"employee": {"name": ..}} -> "employee.name")."""
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and prefix == "" and key not in ("data", "staff_data", "metadata"):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def _header(columns: list, labels: Optional[list], serial: Optional[str]) -> list:
+    return ([serial] if serial else []) + list(labels or columns)
+
+async def csv_stream(pages: AsyncIterator[list], columns: Optional[list] = None,
+                     labels: Optional[list] = None, serial: Optional[str] = None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")  # BOM so Excel opens UTF-8 (₹, Marathi names) correctly
+    if columns is not None:
+        writer.writerow(_header(columns, labels, serial))
+    n = 0
+    async for rows in pages:
+        rows = [flatten(r) for r in rows]
+        if columns is None:
+            columns = list(rows[0].keys())
+            writer.writerow(_header(columns, labels, serial))
+        for r in rows:
+            n += 1
+            writer.writerow(([n] if serial else []) + [_cell_text(r.get(c)) for c in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Nothing was flushed yet (empty result): still emit BOM / header
+        yield buffer.getvalue().encode("utf-8")
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable target for zipfile; drained after every page."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def _xlsx_row(values: list) -> str:
+    cells = []
+    for value in values:
+        if isinstance(value, bool) or value is None or not isinstance(value, (int, float)):
+            text = escape(_cell_text(value))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        else:
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+    return "<row>" + "".join(cells) + "</row>"
+
+async def xlsx_stream(pages: AsyncIterator[list], columns: Optional[list] = None,
+                      labels: Optional[list] = None, serial: Optional[str] = None):
+    """
+    Minimal single-sheet XLSX written as a streaming zip (inline strings, no
+    shared-string table), so no spreadsheet library or temp file is needed.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_STATIC.items():
+            zf.writestr(name, content)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            if columns is not None:
+                sheet.write(_xlsx_row(_header(columns, labels, serial)).encode("utf-8"))
+            n = 0
+            async for rows in pages:
+                rows = [flatten(r) for r in rows]
+                if columns is None:
+                    columns = list(rows[0].keys())
+                    sheet.write(_xlsx_row(_header(columns, labels, serial)).encode("utf-8"))
+                cells = []
+                for r in rows:
+                    n += 1
+                    cells.append(_xlsx_row(([n] if serial else []) + [r.get(c) for c in columns]))
+                sheet.write("".join(cells).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    "csv": (csv_stream, "text/csv; charset=utf-8"),
+    "xlsx": (xlsx_stream, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def export_response(pages: AsyncIterator[list], fmt: str, basename: str, columns: Optional[list] = None,
+                    labels: Optional[list] = None, serial: Optional[str] = None) -> StreamingResponse:
+    encoder, media_type = EXPORT_FORMATS[fmt]
+    filename = f"{basename}-{datetime.now().strftime('%Y%m%d-%H%M')}.{fmt}"
+    return StreamingResponse(
+        encoder(pages, columns, labels, serial),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
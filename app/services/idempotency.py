@@ -0,0 +1,214 @@
+# app/services/idempotency.py
+import os
+import base64
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.services.supabase_client import supabase, execute
+from app.services.sessions import get_user_name
+from app.services.resilience import upstream_cause
+
+# Idempotency-Key support for endpoints that create things (invoices, documents).
+# The first request with a key runs; its response is kept for IDEMPOTENCY_TTL and
+# any repeat with the same key and body gets that response back, marked with
+# Idempotent-Replayed: true, without the handler (or Supabase) being called.
+# A repeat that arrives while the first is still running waits for it.
+#
+# Keys live in a bounded in-process LRU. IDEMPOTENCY_PERSIST=1 also writes
+# responses to the idempotency_keys table (phase33) so replays survive a
+# restart; the table is only read when a key is not in memory.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_PERSIST = os.getenv("IDEMPOTENCY_PERSIST", "0") in ("1", "true", "True")
+# How long a repeat waits for the first request before giving up with 409
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+# Larger responses (e.g. PDF downloads) are not kept; a repeat runs again
+MAX_STORED_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY_KB", "2048")) * 1024
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# Errors a retry may well get past are not kept
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+KEPT_HEADERS = ("content-type", "content-disposition", "etag", "x-document-id")
+
+logger = logging.getLogger("vesak.idempotency")
+
+class _Entry:
+    __slots__ = ("fingerprint", "response", "done", "expires")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.response = None   # (status, headers, body) once finished
+        self.done = asyncio.get_running_loop().create_future()
+        self.expires = None
+
+def _storable(response: Response) -> bool:
+    body = getattr(response, "body", None)
+    return (body is not None and len(body) <= MAX_STORED_BODY
+            and response.status_code < 500 and response.status_code not in RETRYABLE_STATUSES)
+
+def _replay(stored: tuple) -> Response:
+    status, headers, body = stored
+    return Response(body, status_code=status, headers={**headers, REPLAYED_HEADER: "true"})
+
+class IdempotencyStore:
+    def __init__(self, maxsize: int = IDEMPOTENCY_MAX_KEYS, ttl: float = IDEMPOTENCY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.mismatched = 0
+        self.evictions = 0
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires is not None and entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _evict(self):
+        # Oldest finished keys go first; in-flight ones are never dropped
+        for key in list(self._entries):
+            if len(self._entries) <= self.maxsize:
+                return
+            if self._entries[key].response is not None:
+                del self._entries[key]
+                self.evictions += 1
+
+    async def run(self, key: str, fingerprint: str, call) -> Response:
+        """Runs `call()` once per key; repeats get the stored response or wait for the running one."""
+        while True:
+            entry = self._get(key)
+            if entry is None and IDEMPOTENCY_PERSIST:
+                entry = await self._load(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                self.mismatched += 1
+                raise HTTPException(status_code=422, detail=f"{HEADER} was already used for a different request")
+            if entry.response is not None:
+                self.replayed += 1
+                return _replay(entry.response)
+            self.waited += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(entry.done), IDEMPOTENCY_WAIT)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=409, detail=f"A request with this {HEADER} is still in progress")
+            # Finished: replay it, or run ourselves if it was not kept
+
+        entry = self._entries[key] = _Entry(fingerprint)
+        self.executed += 1
+        try:
+            response = await call()
+        except HTTPException as e:
+            if upstream_cause(e) is not None:
+                # An outage is not this request's answer; let a retry run again
+                self._release(key, entry)
+                raise
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+        except BaseException:
+            self._release(key, entry)
+            raise
+
+        if not _storable(response):
+            self._release(key, entry)
+            return response
+        entry.response = (response.status_code,
+                          {k: v for k, v in response.headers.items() if k in KEPT_HEADERS}, bytes(response.body))
+        entry.expires = time.monotonic() + self.ttl
+        self._entries.move_to_end(key)
+        self._evict()
+        entry.done.set_result(True)
+        if IDEMPOTENCY_PERSIST:
+            await self._save(key, entry)
+        return response
+
+    def _release(self, key: str, entry: _Entry):
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set_result(False)
+
+    async def _load(self, key: str):
+        try:
+            res = await execute(supabase.table("idempotency_keys").select("*").eq("key", key)
+                                .gt("expires_at", datetime.now(timezone.utc).isoformat()).limit(1))
+        except Exception as e:
+            logger.warning("idempotency key lookup failed: %s", e)
+            res = None
+        # A request with the same key may have started while we were reading
+        entry = self._get(key)
+        if entry is not None or not (res and res.data):
+            return entry
+        row = res.data[0]
+        entry = self._entries[key] = _Entry(row["fingerprint"])
+        entry.response = (row["status_code"], row.get("headers") or {}, base64.b64decode(row["body"] or ""))
+        entry.expires = time.monotonic() + self.ttl
+        entry.done.set_result(True)
+        self._evict()
+        return entry
+
+    async def _save(self, key: str, entry: _Entry):
+        status, headers, body = entry.response
+        now = datetime.now(timezone.utc)
+        try:
+            await execute(supabase.table("idempotency_keys").upsert({
+                "key": key,
+                "fingerprint": entry.fingerprint,
+                "status_code": status,
+                "headers": headers,
+                "body": base64.b64encode(body).decode("ascii"),
+                "expires_at": (now + timedelta(seconds=self.ttl)).isoformat(),
+            }, on_conflict="key", returning="minimal"))
+            if self.executed % 100 == 0:
+                await execute(supabase.table("idempotency_keys").delete(returning="minimal")
+                              .lt("expires_at", now.isoformat()))
+        except Exception as e:
+            # The in-memory copy still covers this process
+            logger.warning("idempotency key not persisted: %s", e)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._entries),
+            "in_flight": sum(1 for e in self._entries.values() if e.response is None),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "persist": IDEMPOTENCY_PERSIST,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "mismatched": self.mismatched,
+            "evictions": self.evictions,
+        }
+
+idempotency_store = IdempotencyStore()
+
+async def idempotent(request: Request, scope: str, call) -> Response:
+    """
+    Router helper: `return await idempotent(request, "invoices.create", lambda: handler(...))`.
+    Without an Idempotency-Key header the call simply runs. Keys are per user and
+    per endpoint; the fingerprint covers the query string and body.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return await call()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+    body = await request.body()
+    fingerprint = hashlib.sha256(request.url.query.encode("utf-8") + b"\0" + body).hexdigest()
+
+    async def respond() -> Response:
+        result = await call()
+        return result if isinstance(result, Response) else JSONResponse(jsonable_encoder(result))
+
+    return await idempotency_store.run(f"{scope}:{get_user_name(request)}:{key}", fingerprint, respond)
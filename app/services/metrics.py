@@ -0,0 +1,208 @@
+# app/services/metrics.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from starlette.routing import Route
+
+# Minimal Prometheus-style registry. Everything runs on one event loop, so plain
+# dicts are enough; no client library is needed for the text exposition format.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_registry = []
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, *labels, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+# --- Metrics ---
+http_duration = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route", "status"))
+http_response_size = Histogram(
+    "http_response_size_bytes", "API response body size by route", ("route",), SIZE_BUCKETS)
+http_exceptions = Counter(
+    "http_request_exceptions_total", "Unhandled exceptions by route", ("route",))
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds", "PostgREST latency by table / RPC", ("target", "method"))
+upstream_response_size = Histogram(
+    "upstream_response_size_bytes", "PostgREST response body size by table / RPC", ("target",), SIZE_BUCKETS)
+upstream_errors = Counter(
+    "upstream_errors_total", "PostgREST error responses and transport failures", ("target", "status"))
+upstream_reads = Counter(
+    "upstream_reads_total", "PostgREST reads sent upstream or coalesced onto an identical in-flight read",
+    ("target", "outcome"))
+event_connections = Gauge(
+    "event_stream_connections", "Open /api/events server-sent event streams")
+events_published = Counter(
+    "events_published_total", "Change notifications published to the event bus", ("topic",))
+event_resyncs = Counter(
+    "event_stream_resyncs_total", "Subscribers told to reload because they fell behind or missed events", ("reason",))
+upstream_retries = Counter(
+    "upstream_retries_total", "Idempotent upstream reads retried after a timeout or connection failure", ("target",))
+breaker_rejections = Counter(
+    "upstream_breaker_rejections_total", "Upstream calls refused at once because the circuit was open", ("upstream",))
+faults_injected = Counter(
+    "upstream_faults_injected_total", "Faults injected by UPSTREAM_FAULTS (test mode)", ("kind",))
+audit_entries = Counter(
+    "audit_entries_total", "Audit log entries queued, written, or dropped (queue full / insert failed)", ("outcome",))
+
+# Per-request upstream time, read by TimingMiddleware for the Server-Timing header.
+# Holds a mutable [seconds, calls] list, so concurrent sub-tasks of one request add to it.
+_upstream_time: ContextVar[Optional[list]] = ContextVar("upstream_time", default=None)
+
+def upstream_target(path: str) -> str:
+    """/rest/v1/invoices -> invoices, /rest/v1/rpc/next_sequence -> rpc:next_sequence"""
+    parts = path.split("/rest/v1/", 1)[-1].strip("/").split("/")
+    if parts[0] == "rpc" and len(parts) > 1:
+        return f"rpc:{parts[1]}"
+    return parts[0] or "unknown"
+
+def record_upstream(target: str, method: str, seconds: float, status: int, size: Optional[int]):
+    upstream_duration.observe(target, method, value=seconds)
+    if size is not None:
+        upstream_response_size.observe(target, value=size)
+    if status >= 400 or status == 0:
+        upstream_errors.inc(target, str(status or "transport"))
+    acc = _upstream_time.get()
+    if acc is not None:
+        acc[0] += seconds
+        acc[1] += 1
+
+def _route_label(scope) -> str:
+    """Path template (/api/invoices/{invoice_id}) so ids do not explode label cardinality."""
+    route = scope.get("route")
+    if route is None:
+        # Only the static mount lives outside /api
+        return "unmatched" if scope["path"].startswith("/api/") else "static"
+    if not isinstance(route, Route):
+        return getattr(route, "name", None) or "mount"   # e.g. the static files mount
+    # FastAPI includes routers lazily, so scope["route"] is the router's own
+    # route and its template lacks the include prefix. The prefix is whatever
+    # precedes the shortest tail of the path that the template matches.
+    path = scope["path"]
+    for cut in [len(path)] + [i for i in range(len(path) - 1, -1, -1) if path[i] == "/"]:
+        if route.path_regex.match(path[cut:]):
+            return path[:cut] + route.path
+    return route.path
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering, streaming responses
+    pass straight through). Records per-route latency / size / errors and adds
+    `Server-Timing: db;dur=..;desc="N calls", app;dur=..` to every response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        acc = [0.0, 0]
+        token = _upstream_time.set(acc)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                timing = f'db;dur={acc[0] * 1000:.1f};desc="{acc[1]} calls", app;dur={elapsed:.1f}'
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            http_exceptions.inc(_route_label(scope))
+            raise
+        finally:
+            _upstream_time.reset(token)
+            route = _route_label(scope)
+            http_duration.observe(scope["method"], route, str(status), value=time.perf_counter() - started)
+            http_response_size.observe(route, value=size)
@@ -0,0 +1,89 @@
+# app/services/pagination.py
+import re
+import json
+import base64
+from typing import Optional
+from fastapi import HTTPException, Response
+from app.services.supabase_client import execute, quote
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_FIELD_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+def select_fields(fields: Optional[str], required: tuple = ()) -> str:
+    """
+    Turns a `fields=a,b,c` query param into a PostgREST select list.
+    Only plain column names are accepted, so callers cannot smuggle embeds or casts.
+    """
+    if not fields:
+        return "*"
+    cols = [f.strip() for f in fields.split(",") if f.strip()]
+    bad = [c for c in cols if not _FIELD_RE.match(c)]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid field(s): {', '.join(bad)}")
+    for col in required:
+        if col not in cols:
+            cols.append(col)
+    return ",".join(cols)
+
+def encode_cursor(row: dict, column: str = "created_at") -> str:
+    raw = json.dumps([row.get(column), row.get("id")]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """(sort_value, row_id); sort_value is None when the last row had no value."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (None if sort_value is None else str(sort_value)), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset(query, page_size: int, cursor: Optional[str] = None, column: str = "created_at"):
+    """
+    Applies newest-first keyset pagination on (column, id), created_at by default.
+    Fetches one extra row so the caller can tell whether another page exists.
+    Rows without a value sort first (Postgres' default for DESC, which the
+    indexes match), so a cursor on one of them continues into the dated rows.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.or_(f"and({column}.is.null,id.lt.{quote(row_id)}),{column}.not.is.null")
+        else:
+            query = query.or_(
+                f"{column}.lt.{quote(sort_value)},"
+                f"and({column}.eq.{quote(sort_value)},id.lt.{quote(row_id)})"
+            )
+    return query.order(column, desc=True).order("id", desc=True).limit(page_size + 1)
+
+def page(rows: list, page_size: int, response: Response) -> list:
+    """Trims the look-ahead row and advertises the next cursor in a response header."""
+    rows = rows or []
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1])
+    return rows
+
+async def iter_pages(query_factory, page_size: int = MAX_PAGE_SIZE, column: str = "created_at"):
+    """
+    Walks every page of `query_factory()` (a fresh filtered select per call) and
+    yields one list of rows per page, so callers never hold the whole table.
+    """
+    cursor = None
+    while True:
+        res = await execute(keyset(query_factory(), page_size, cursor, column))
+        rows = res.data or []
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            cursor = encode_cursor(rows[-1], column)
+        else:
+            cursor = None
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+def clamp_page_size(page_size: int) -> int:
+    return max(1, min(page_size, MAX_PAGE_SIZE))
@@ -0,0 +1,66 @@
+# app/services/passwords.py
+import os
+import hmac
+import base64
+import asyncio
+import hashlib
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+# Salted scrypt (memory-hard, stdlib) stored as scrypt$<log2 N>$<r>$<p>$<salt>$<hash>.
+# Memory per hash is 128 * r * N bytes: 16 MiB at the defaults (N=2^14, r=8).
+# Tune with PASSWORD_SCRYPT_LOG_N / _R / _P; benchmarks/bench_password_kdf.py
+# reports logins/sec/core for each setting.
+SCRYPT_LOG_N = int(os.getenv("PASSWORD_SCRYPT_LOG_N", "14"))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+DKLEN = 32
+
+# OpenSSL's scrypt releases the GIL, so a small dedicated thread pool hashes on
+# several cores without touching Starlette's threadpool or blocking the event loop.
+# The pool size bounds concurrent hashes (and their memory); extra logins queue.
+POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+_pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="kdf")
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+    n = 1 << log_n
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=128 * r * n * (p + 1) + 1024 * 1024, dklen=DKLEN,
+    )
+
+def hash_password_sync(password: str, log_n: int = None, r: int = None, p: int = None) -> str:
+    log_n, r, p = log_n or SCRYPT_LOG_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = secrets.token_bytes(16)
+    return f"scrypt${log_n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, log_n, r, p))}"
+
+def verify_password_sync(password: str, stored: str) -> tuple:
+    """Returns (matches, needs_rehash)."""
+    if not stored:
+        return False, False
+    if stored.startswith("scrypt$"):
+        try:
+            _, log_n, r, p, salt, digest = stored.split("$")
+            log_n, r, p = int(log_n), int(r), int(p)
+            candidate = _scrypt(password, _unb64(salt), log_n, r, p)
+        except ValueError:
+            return False, False
+        ok = hmac.compare_digest(candidate, _unb64(digest))
+        return ok, ok and (log_n, r, p) != (SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P)
+    # Legacy unsalted SHA-256 hex digest: always rehash after a successful login
+    ok = hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), stored)
+    return ok, ok
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_pool, hash_password_sync, password)
+
+async def verify_password(password: str, stored: str) -> tuple:
+    if stored and not stored.startswith("scrypt$"):
+        return verify_password_sync(password, stored)  # cheap, no need to offload
+    return await asyncio.get_running_loop().run_in_executor(_pool, verify_password_sync, password, stored)
@@ -0,0 +1,191 @@
+# app/services/payroll.py
+import os
+import re
+import time
+import asyncio
+from datetime import date
+from app.services.supabase_client import supabase
+from app.services.pagination import iter_pages
+from app.services.cache import TTLCache
+
+# Same rules the HR hub applied in the browser: daily rate is CTC / 30, a month
+# has 26 working days unless the leave record says otherwise, and
+#   net_salary = daily_rate * (working_days - leave_days + overtime_days)
+# Invoice payouts (nurse_payment / nurse_payment_extra) belong to whoever is
+# named on the invoice and come on top of salary; Gig/Retainer staff have no
+# salary, so their pay is the invoice payouts alone.
+DAYS_PER_MONTH = 30
+DEFAULT_WORKING_DAYS = 26
+GIG = "Gig/Retainer"
+
+EMPLOYEE_COLUMNS = "id,name,employment_type,work_type,work_location,designation,earnings_per_month,status,created_at"
+INVOICE_COLUMNS = ("id,date,created_at,customer_name,service,plan,shift,"
+                   "nurse_name,nurse_payment,nurse_name_extra,nurse_payment_extra,secondary_staff_id")
+
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# One computed month per key (month_year,); writes to employees, leaves or
+# invoices invalidate it (a month loaded across such a write is not cached),
+# the TTL catches changes made outside the API.
+payroll_cache = TTLCache(
+    "payroll",
+    maxsize=int(os.getenv("PAYROLL_CACHE_SIZE", "24")),
+    ttl=float(os.getenv("PAYROLL_CACHE_TTL", "600")),
+)
+_locks = {}
+
+def month_bounds(month_year: str) -> tuple:
+    """'2026-02' -> ('2026-02-01', '2026-03-01'). Raises ValueError on bad input."""
+    if not _MONTH_RE.match(month_year or ""):
+        raise ValueError("month_year must look like YYYY-MM")
+    year, month = int(month_year[:4]), int(month_year[5:])
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def _num(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _name_key(name) -> str:
+    return " ".join(str(name or "").split()).casefold()
+
+def leave_days(leave: dict, month_year: str) -> int:
+    """Distinct leave dates inside the month (stray or repeated dates do not count)."""
+    dates = (leave or {}).get("leave_dates") or []
+    return len({str(d)[:10] for d in dates if str(d).startswith(month_year)})
+
+def salary_terms(ctc, working_days=None, leaves: int = 0, overtime_days=None) -> dict:
+    daily_rate = _num(ctc) / DAYS_PER_MONTH
+    working_days = int(working_days or DEFAULT_WORKING_DAYS)
+    overtime_days = int(overtime_days or 0)
+    paid_days = max(working_days - leaves + overtime_days, 0)
+    return {
+        "daily_rate": round(daily_rate, 2),
+        "working_days": working_days,
+        "leave_days": leaves,
+        "overtime_days": overtime_days,
+        "paid_days": paid_days,
+        "overtime_pay": round(daily_rate * overtime_days, 2),
+        "net_salary": round(daily_rate * paid_days, 2),
+    }
+
+def compute_payroll(month_year: str, employees: list, leaves: list, invoices: list) -> dict:
+    """
+    One pass over each input, joined through dicts: employees by id and by
+    normalised name, leave records by employee id, invoice payouts by the
+    name columns. Payouts to names that match no employee (or several) are
+    reported as unmatched rather than guessed.
+    """
+    leave_by_emp = {str(l.get("employee_id")): l for l in leaves}
+
+    emp_by_name = {}
+    for emp in employees:
+        key = _name_key(emp.get("name"))
+        if key:
+            emp_by_name[key] = None if key in emp_by_name else str(emp["id"])
+
+    earned, assignments = {}, {}
+    unmatched = 0.0
+    for inv in invoices:
+        for name_col, pay_col in (("nurse_name", "nurse_payment"), ("nurse_name_extra", "nurse_payment_extra")):
+            name, amount = inv.get(name_col), _num(inv.get(pay_col))
+            if not _name_key(name):
+                continue
+            emp_id = emp_by_name.get(_name_key(name))
+            if emp_id is None:
+                unmatched += amount
+                continue
+            earned[emp_id] = earned.get(emp_id, 0.0) + amount
+            assignments[emp_id] = assignments.get(emp_id, 0) + 1
+        secondary = inv.get("secondary_staff_id")
+        if secondary:
+            assignments[str(secondary)] = assignments.get(str(secondary), 0) + 1
+
+    rows = []
+    for emp in employees:
+        emp_id = str(emp["id"])
+        leave = leave_by_emp.get(emp_id)
+        if emp.get("status") == "Terminated" and not (leave or emp_id in assignments):
+            continue
+        is_gig = emp.get("employment_type") == GIG
+        if is_gig:
+            terms = salary_terms(0, leaves=0)
+            terms.update(daily_rate=0.0, paid_days=0)
+        else:
+            leave = leave or {}
+            terms = salary_terms(emp.get("earnings_per_month"), leave.get("working_days"),
+                                 leave_days(leave, month_year), leave.get("overtime_days"))
+        invoice_earnings = round(earned.get(emp_id, 0.0), 2)
+        rows.append({
+            "employee_id": emp_id,
+            "name": emp.get("name"),
+            "employment_type": emp.get("employment_type") or "Payroll",
+            "work_location": emp.get("work_location"),
+            "designation": emp.get("designation"),
+            "ctc": 0.0 if is_gig else round(_num(emp.get("earnings_per_month")), 2),
+            "has_leave_record": emp_id in leave_by_emp,
+            **terms,
+            "invoice_count": assignments.get(emp_id, 0),
+            "invoice_earnings": invoice_earnings,
+            "total_pay": round(terms["net_salary"] + invoice_earnings, 2),
+        })
+    rows.sort(key=lambda r: (r["work_location"] or "", _name_key(r["name"])))
+
+    return {
+        "month_year": month_year,
+        "computed_at": time.time(),
+        "totals": {
+            "employees": len(rows),
+            "net_salary": round(sum(r["net_salary"] for r in rows), 2),
+            "overtime_pay": round(sum(r["overtime_pay"] for r in rows), 2),
+            "invoice_earnings": round(sum(r["invoice_earnings"] for r in rows), 2),
+            "total_pay": round(sum(r["total_pay"] for r in rows), 2),
+            "unmatched_invoice_payouts": round(unmatched, 2),
+        },
+        "employees": rows,
+    }
+
+async def _collect(query_factory, column: str = "created_at") -> list:
+    rows = []
+    async for batch in iter_pages(query_factory, column=column):
+        rows.extend(batch)
+    return rows
+
+async def load_month(month_year: str) -> tuple:
+    """Fetches the three inputs for one month concurrently: (employees, leaves, invoices)."""
+    start, end = month_bounds(month_year)
+    employees, leaves, dated, undated = await asyncio.gather(
+        _collect(lambda: supabase.table("employees").select(EMPLOYEE_COLUMNS)),
+        _collect(lambda: supabase.table("employee_leaves").select("*").eq("month_year", month_year),
+                 column="updated_at"),
+        _collect(lambda: supabase.table("invoices").select(INVOICE_COLUMNS).gte("date", start).lt("date", end)),
+        # Same month rule as the financial rollups: created_at when date is missing
+        _collect(lambda: supabase.table("invoices").select(INVOICE_COLUMNS)
+                 .is_("date", "null").gte("created_at", start).lt("created_at", end)),
+    )
+    return employees, leaves, dated + undated
+
+async def get_payroll(month_year: str, refresh: bool = False) -> dict:
+    """Cached per month; concurrent requests for a cold month share one computation."""
+    key = (month_year,)
+    if not refresh:
+        found, value = payroll_cache.get(key)
+        if found:
+            return value
+    lock = _locks.setdefault(month_year, asyncio.Lock())
+    async with lock:
+        if not refresh:
+            found, value = payroll_cache.get(key)
+            if found:
+                return value
+        generation = payroll_cache.generation(month_year)
+        result = compute_payroll(month_year, *await load_month(month_year))
+        # A write during the load invalidated the cache: this result may predate it
+        if payroll_cache.generation(month_year) == generation:
+            payroll_cache.set(key, result)
+        else:
+            payroll_cache.discarded_loads += 1
+        return result
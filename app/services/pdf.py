@@ -0,0 +1,320 @@
+# app/services/pdf.py
+import re
+import zlib
+from functools import lru_cache
+from string import Template
+
+# Minimal PDF 1.4 writer plus the document templates it lays out. Text uses the
+# built-in Helvetica faces (no font embedding, WinAnsi encoding), so a one-page
+# invoice is a few KB and renders in milliseconds. Like the hand-written XLSX in
+# export.py, nothing here needs a third-party library.
+#
+# WinAnsi covers Latin-1 only. Text outside it (a Devanagari name, say) raises
+# UnsupportedText instead of being printed as "?": a legal document with a
+# mangled name is worse than none, and the caller can fall back to html2pdf.
+#
+# This module must stay free of app imports: it is what the render process
+# pool (renderer.py) imports in each worker.
+
+A4 = (595.28, 841.89)
+MARGIN = 45
+NAVY = (0.0, 0.129, 0.278)     # #002147
+GOLD = (0.773, 0.627, 0.396)   # #C5A065
+GREY = (0.45, 0.45, 0.45)
+BLACK = (0, 0, 0)
+
+# Advance widths (1/1000 em) for ASCII 32..126 from the Adobe AFM files
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+FONTS = {"regular": ("F1", "Helvetica", _HELVETICA), "bold": ("F2", "Helvetica-Bold", _HELVETICA_BOLD)}
+
+# Glyphs outside WinAnsi that turn up in our data
+_SUBSTITUTES = {"₹": "Rs.", "•": "-", "–": "-", "—": "-", "‘": "'", "’": "'",
+                "“": '"', "”": '"', " ": " "}
+_SUBSTITUTE_RE = re.compile("|".join(_SUBSTITUTES))
+
+class UnsupportedText(ValueError):
+    pass
+
+def clean(text) -> str:
+    return _SUBSTITUTE_RE.sub(lambda m: _SUBSTITUTES[m.group(0)], str(text))
+
+def text_width(text: str, font: str, size: float) -> float:
+    widths = FONTS[font][2]
+    return sum(widths[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text) * size / 1000
+
+def wrap(text: str, font: str, size: float, width: float) -> list:
+    lines = []
+    for paragraph in clean(text).splitlines() or [""]:
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, font, size) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+def _escape(text: str) -> bytes:
+    text = clean(text)
+    try:
+        raw = text.encode("cp1252")
+    except UnicodeEncodeError:
+        bad = "".join(dict.fromkeys(c for c in text if not c.encode("cp1252", errors="ignore")))
+        raise UnsupportedText(f"Cannot render {bad!r} with the built-in PDF fonts (Latin text only)")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+class PdfWriter:
+    """Pages of text, lines and filled rectangles; y is measured from the top of the page."""
+
+    def __init__(self, size: tuple = A4, title: str = ""):
+        self.width, self.height = size
+        self.title = title
+        self.pages = []
+
+    def new_page(self):
+        self.pages.append([])
+
+    def text(self, x: float, y: float, text: str, font: str = "regular", size: float = 10, color: tuple = BLACK,
+             page: int = -1):
+        r, g, b = color
+        self.pages[page].append(
+            b"BT %.3f %.3f %.3f rg /%s %.1f Tf %.2f %.2f Td (" % (r, g, b, FONTS[font][0].encode(), size, x, self.height - y)
+            + _escape(text) + b") Tj ET")
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5, color: tuple = GREY):
+        r, g, b = color
+        self.pages[-1].append(b"%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S" % (
+            r, g, b, width, x1, self.height - y1, x2, self.height - y2))
+
+    def rect(self, x: float, y: float, w: float, h: float, color: tuple):
+        r, g, b = color
+        self.pages[-1].append(b"%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f" % (r, g, b, x, self.height - y - h, w, h))
+
+    def output(self) -> bytes:
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # page tree, filled in once the page ids are known
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+            b"<< /Title (" + _escape(self.title) + b") /Producer (Vesak Care) >>",
+        ]
+        kids = []
+        for ops in self.pages:
+            stream = zlib.compress(b"\n".join(ops))
+            objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources "
+                           b"<< /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % (
+                               self.width, self.height, len(objects)))
+            kids.append(len(objects))
+        objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+        out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+        return bytes(out)
+
+# --- Templates ---
+# A template is a list of blocks laid out top to bottom. Text values are
+# string.Template strings ("${customer_name}") filled from the render context;
+# "table" rows come from a list in the context.
+
+LETTERHEAD = [
+    ("band", {}),
+    ("text", {"text": "Vesak Care Foundation", "font": "bold", "size": 18, "color": NAVY}),
+    ("text", {"text": "Home Healthcare Services  -  Pune  |  Mumbai  |  Kolhapur", "size": 8, "color": GREY}),
+    ("rule", {"color": GOLD, "width": 1}),
+]
+
+FOOTER = [
+    ("spacer", {"height": 18}),
+    ("text", {"text": "Thank you for choosing Vesak Care Foundation!", "size": 8, "color": GREY}),
+    ("rule", {"color": GOLD, "width": 0.5}),
+    ("text", {"text": "Instagram / Facebook: @VesakCare", "size": 8, "color": GREY}),
+]
+
+TEMPLATES = {
+    "invoice": {
+        "title": "Invoice ${number}",
+        "blocks": LETTERHEAD + [
+            ("heading", {"text": "INVOICE"}),
+            ("fields", {"columns": 2, "rows": [
+                ("Invoice No.", "${number}"), ("Date", "${date}"),
+                ("Reference", "${ref_no}"), ("Status", "${status}"),
+            ]}),
+            ("heading", {"text": "Billed To"}),
+            ("fields", {"columns": 2, "rows": [
+                ("Name", "${customer_name}"), ("Mobile", "${customer_mobile}"),
+                ("Age / Gender", "${customer_age} / ${customer_gender}"), ("Location", "${customer_location}"),
+            ]}),
+            ("paragraph", {"label": "Address", "text": "${customer_address}"}),
+            ("heading", {"text": "Service Details"}),
+            ("table", {"source": "lines", "columns": [
+                ("Service", "service", 0.40), ("Plan", "plan", 0.20), ("Shift", "shift", 0.20), ("Amount", "amount", 0.20),
+            ]}),
+            ("fields", {"columns": 2, "rows": [
+                ("Service Start", "${service_started}"), ("Service End", "${service_ended}"),
+                ("Staff", "${staff}"), ("Period", "${period}"),
+            ]}),
+            ("totals", {"rows": [("Total", "${total}"), ("Paid", "${paid}"), ("Balance", "${balance}")]}),
+            ("paragraph", {"label": "Notes", "text": "${notes}"}),
+        ] + FOOTER,
+    },
+    "letter": {
+        "title": "${title}",
+        "blocks": LETTERHEAD + [
+            ("fields", {"columns": 2, "rows": [("Ref. No.", "${ref_no}"), ("Date", "${date}")]}),
+            ("spacer", {"height": 6}),
+            ("paragraph", {"text": "To,\n${recipient_name}\n${recipient_designation}\n${recipient_address}"}),
+            ("heading", {"text": "Subject: ${subject}"}),
+            ("paragraph", {"text": "${body}"}),
+            ("spacer", {"height": 30}),
+            ("text", {"text": "For Vesak Care Foundation", "font": "bold", "size": 10}),
+            ("spacer", {"height": 24}),
+            ("text", {"text": "Authorised Signatory", "size": 9, "color": GREY}),
+        ] + FOOTER,
+    },
+}
+
+def _compile_value(value):
+    return Template(value) if isinstance(value, str) and "$" in value else value
+
+@lru_cache(maxsize=None)
+def compiled(name: str) -> tuple:
+    """Parses every ${...} string of a template once per process."""
+    if name not in TEMPLATES:
+        raise KeyError(f"Unknown template {name!r}")
+    spec = TEMPLATES[name]
+    blocks = []
+    for kind, options in spec["blocks"]:
+        opts = {}
+        for key, value in options.items():
+            if key == "rows":
+                value = tuple((label, _compile_value(v)) for label, v in value)
+            opts[key] = _compile_value(value)
+        blocks.append((kind, opts))
+    return Template(spec["title"]), tuple(blocks)
+
+def _fill(value, context: dict) -> str:
+    return value.safe_substitute(context).strip(" /") if isinstance(value, Template) else value
+
+class _Layout:
+    def __init__(self, pdf: PdfWriter):
+        self.pdf = pdf
+        self.y = MARGIN
+        self.bottom = pdf.height - MARGIN - 20
+        self.content_width = pdf.width - 2 * MARGIN
+        pdf.new_page()
+
+    def need(self, height: float):
+        if self.y + height > self.bottom:
+            self.pdf.new_page()
+            self.y = MARGIN
+
+def render_pdf(name: str, context: dict) -> bytes:
+    """Lays out template `name` with `context` (all values pre-formatted strings, plus table rows)."""
+    title, blocks = compiled(name)
+    pdf = PdfWriter(title=_fill(title, context))
+    layout = _Layout(pdf)
+    width = layout.content_width
+
+    for kind, opts in blocks:
+        if kind == "band":
+            pdf.rect(0, 0, pdf.width, 8, NAVY)
+            layout.y += 10
+        elif kind == "text":
+            size = opts.get("size", 10)
+            layout.need(size + 4)
+            layout.y += size + 4
+            pdf.text(MARGIN, layout.y, _fill(opts["text"], context), opts.get("font", "regular"), size, opts.get("color", BLACK))
+        elif kind == "rule":
+            layout.y += 8
+            pdf.line(MARGIN, layout.y, MARGIN + width, layout.y, opts.get("width", 0.5), opts.get("color", GREY))
+            layout.y += 4
+        elif kind == "spacer":
+            layout.y += opts["height"]
+        elif kind == "heading":
+            layout.need(30)
+            layout.y += 22
+            pdf.text(MARGIN, layout.y, _fill(opts["text"], context), "bold", 11, NAVY)
+            layout.y += 4
+        elif kind == "fields":
+            columns = opts["columns"]
+            col_width = width / columns
+            rows = opts["rows"]
+            for i in range(0, len(rows), columns):
+                layout.need(16)
+                layout.y += 15
+                for j, (label, value) in enumerate(rows[i:i + columns]):
+                    x = MARGIN + j * col_width
+                    pdf.text(x, layout.y, label, "regular", 8, GREY)
+                    text = _fill(value, context) or "-"
+                    pdf.text(x + 78, layout.y, wrap(text, "bold", 9, col_width - 84)[0], "bold", 9)
+        elif kind == "paragraph":
+            text = _fill(opts["text"], context)
+            if not text:
+                continue
+            if opts.get("label"):
+                layout.need(16)
+                layout.y += 15
+                pdf.text(MARGIN, layout.y, opts["label"], "regular", 8, GREY)
+            for line in wrap(text, "regular", 9.5, width):
+                layout.need(13)
+                layout.y += 13
+                pdf.text(MARGIN, layout.y, line, "regular", 9.5)
+        elif kind == "table":
+            cols = opts["columns"]
+            layout.need(40)
+            layout.y += 8
+            pdf.rect(MARGIN, layout.y, width, 18, NAVY)
+            x = MARGIN
+            for label, _, share in cols:
+                pdf.text(x + 6, layout.y + 12, label, "bold", 9, (1, 1, 1))
+                x += width * share
+            layout.y += 18
+            for row in context.get(opts["source"]) or []:
+                layout.need(18)
+                x = MARGIN
+                for _, key, share in cols:
+                    cell = wrap(str(row.get(key) or "-"), "regular", 9, width * share - 10)[0]
+                    pdf.text(x + 6, layout.y + 12, cell, "regular", 9)
+                    x += width * share
+                layout.y += 18
+                pdf.line(MARGIN, layout.y, MARGIN + width, layout.y, 0.3)
+        elif kind == "totals":
+            for label, value in opts["rows"]:
+                layout.need(16)
+                layout.y += 16
+                text = _fill(value, context) or "-"
+                pdf.text(MARGIN + width * 0.6, layout.y, label, "bold" if label == "Total" else "regular", 10, NAVY)
+                pdf.text(MARGIN + width - text_width(text, "bold", 10), layout.y, text, "bold", 10)
+
+    # Page numbers, as the browser renderer stamps them
+    total = len(pdf.pages)
+    for i in range(total):
+        label = f"Page {i + 1} of {total}"
+        pdf.text((pdf.width - text_width(label, "regular", 8)) / 2, pdf.height - 14, label, "regular", 8, GREY, page=i)
+    return pdf.output()
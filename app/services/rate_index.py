@@ -0,0 +1,113 @@
+# app/services/rate_index.py
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from app.services.resilience import UpstreamUnavailable
+
+logger = logging.getLogger("vesak.rates")
+
+class RateIndex:
+    """
+    In-memory index of service_rates for the Inquiry Form lookup.
+
+    Resolves the fallback chain (sub-location rate -> location-wide rate ->
+    any rate for the location) with dict lookups instead of up to three
+    PostgREST calls. Writes through the rates router patch it row by row;
+    a periodic full reload picks up changes made by other workers.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._exact = {}      # (location, sub_location, service, plan, shift) -> row
+        self._by_combo = {}   # (location, service, plan, shift) -> {rate_id: row}
+        self._keys = {}       # rate_id -> exact key, so updates can move a row
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(row: dict) -> tuple:
+        return (
+            row.get("location"),
+            row.get("sub_location") or None,
+            row.get("service_category"),
+            row.get("plan_type"),
+            row.get("shift_type"),
+        )
+
+    @property
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, rows: list):
+        self._exact.clear()
+        self._by_combo.clear()
+        self._keys.clear()
+        for row in rows:
+            self.upsert(row)
+        self._loaded_at = time.monotonic()
+
+    async def ensure_loaded(self, loader):
+        """
+        Full (re)load via `loader()` when empty or stale; concurrent callers share one load.
+        A stale index keeps answering while Supabase is unreachable.
+        """
+        if self.is_fresh:
+            return
+        async with self._lock:
+            if not self.is_fresh:
+                try:
+                    self.load(await loader())
+                except UpstreamUnavailable as e:
+                    if self._loaded_at is None:
+                        raise
+                    logger.warning("serving stale rate index: %s", e)
+
+    def upsert(self, row: dict):
+        rate_id = row.get("id")
+        if rate_id in self._keys:
+            self.remove(rate_id)
+        key = self._key(row)
+        self._exact[key] = row
+        self._by_combo.setdefault((key[0],) + key[2:], {})[rate_id] = row
+        self._keys[rate_id] = key
+
+    def remove(self, rate_id: str):
+        key = self._keys.pop(rate_id, None)
+        if key is None:
+            return
+        if self._exact.get(key, {}).get("id") == rate_id:
+            del self._exact[key]
+        combo = self._by_combo.get((key[0],) + key[2:])
+        if combo is not None:
+            combo.pop(rate_id, None)
+            if not combo:
+                del self._by_combo[(key[0],) + key[2:]]
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def resolve(self, location: str, service: str, plan: str, shift: str, sub_location: Optional[str] = None) -> Optional[dict]:
+        # 1. Specific sub-location rate
+        if sub_location:
+            row = self._exact.get((location, sub_location, service, plan, shift))
+            if row:
+                return row
+        # 2. Location-level rate (sub_location is NULL)
+        row = self._exact.get((location, None, service, plan, shift))
+        if row:
+            return row
+        # 3. Any rate saved for this location / service / plan / shift
+        combo = self._by_combo.get((location, service, plan, shift))
+        if combo:
+            return next(iter(combo.values()))
+        return None
+
+    def __len__(self):
+        return len(self._keys)
+
+# RATE_INDEX=0 skips the in-memory index and resolves via the resolve_service_rate() RPC.
+RATE_INDEX_ENABLED = os.getenv("RATE_INDEX", "1") not in ("0", "false", "False")
+
+rate_index = RateIndex(ttl=float(os.getenv("REFERENCE_CACHE_TTL", "300")))
@@ -0,0 +1,260 @@
+# app/services/renderer.py
+import os
+import re
+import asyncio
+import logging
+import zipfile
+import itertools
+import multiprocessing
+from datetime import datetime, date, timezone
+from concurrent.futures import ProcessPoolExecutor
+from postgrest.exceptions import APIError
+from app.services.pdf import render_pdf, compiled, TEMPLATES
+from app.services.pagination import iter_pages
+from app.services.payroll import month_bounds
+from app.services.supabase_client import supabase, get_invoice
+from app.services import document_store
+
+# Server-side PDFs (POST /api/documents/render) replacing html2pdf in the browser.
+# Layout is CPU-bound pure Python, so it runs in a small process pool: renders
+# use every core without holding the event loop, and RENDER_POOL_SIZE bounds how
+# many run at once (the rest queue on the executor).
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+MAX_BATCH = int(os.getenv("RENDER_MAX_BATCH", "1000"))
+# Batch renders in flight at once; a finished PDF is zipped (and stored) before
+# the next starts, so a batch holds a few PDFs in memory, never the whole month
+BATCH_WINDOW = RENDER_POOL_SIZE * 2
+
+BATCH_STATUSES = ("Confirmed", "Active", "Completed")
+
+logger = logging.getLogger("vesak.render")
+
+_pool = None
+
+def _warm_worker():
+    # Compile every template once per worker instead of on its first render
+    for name in TEMPLATES:
+        compiled(name)
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent has an event loop and connection-pool threads
+        _pool = ProcessPoolExecutor(max_workers=RENDER_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_warm_worker)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def render(template: str, context: dict) -> bytes:
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown template {template!r} (expected one of {', '.join(TEMPLATES)})")
+    return await asyncio.get_running_loop().run_in_executor(pool(), render_pdf, template, context)
+
+# --- Context ---
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+def _date(value) -> str:
+    if not value:
+        return ""
+    try:
+        return datetime.fromisoformat(str(value)[:10]).strftime("%d-%m-%Y")
+    except ValueError:
+        return str(value)
+
+def _inr(value) -> str:
+    """12345678.5 -> 'Rs. 1,23,45,678.50' (Indian digit grouping, as toLocaleString('en-IN'))."""
+    try:
+        amount = float(value or 0)
+    except (TypeError, ValueError):
+        return ""
+    whole, fraction = f"{abs(amount):.2f}".split(".")
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    grouped = ",".join(groups + [tail])
+    return f"{'-' if amount < 0 else ''}Rs. {grouped}.{fraction}"
+
+def invoice_context(row: dict) -> dict:
+    """Everything the invoice template shows, pre-formatted, from a get_invoice() row."""
+    total = row.get("total_amount") if row.get("total_amount") is not None else row.get("net_amount") or row.get("amount")
+    try:
+        balance = float(total or 0) - float(row.get("amount_paid") or 0)
+    except (TypeError, ValueError):
+        balance = None
+    staff = ", ".join(n for n in (row.get("nurse_name"), row.get("nurse_name_extra"), row.get("secondary_staff_name")) if n)
+    return {
+        "number": _text(row.get("invoice_number") or row.get("invoice_no") or row.get("ref_no")),
+        "ref_no": _text(row.get("ref_no")),
+        "date": _date(row.get("date") or row.get("created_at")),
+        "status": _text(row.get("status")),
+        "customer_name": _text(row.get("customer_name")),
+        "customer_mobile": _text(row.get("customer_mobile")),
+        "customer_age": _text(row.get("customer_age")),
+        "customer_gender": _text(row.get("customer_gender")),
+        "customer_location": _text(row.get("customer_location") or row.get("location")),
+        "customer_address": _text(row.get("customer_address")),
+        "service_started": _date(row.get("service_started")),
+        "service_ended": _date(row.get("service_ended")),
+        "staff": staff,
+        "period": _text(row.get("period")),
+        "lines": [{
+            "service": _text(row.get("service") or row.get("service_category")),
+            "plan": _text(row.get("plan") or row.get("plan_type")),
+            "shift": _text(row.get("shift") or row.get("shift_type")),
+            "amount": _inr(row.get("amount") if row.get("amount") is not None else total),
+        }],
+        "total": _inr(total),
+        "paid": _inr(row.get("amount_paid")),
+        "balance": _inr(balance) if balance is not None else "",
+        "notes": _text(row.get("notes")),
+    }
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BLOCK_RE = re.compile(r"</(p|div|li|h\d)>|<br\s*/?>", re.IGNORECASE)
+
+def letter_context(data: dict) -> dict:
+    """Official letter fields (as the document form sends them); the Quill body HTML becomes plain paragraphs."""
+    body = _BLOCK_RE.sub("\n", _text(data.get("body") or data.get("document_body")))
+    body = _TAG_RE.sub("", body).replace("&nbsp;", " ").replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+    return {
+        "title": _text(data.get("title") or data.get("subject") or "Letter"),
+        "ref_no": _text(data.get("ref_no") or data.get("doc_ref_no")),
+        "date": _date(data.get("date") or data.get("doc_date") or date.today().isoformat()),
+        "recipient_name": _text(data.get("recipient_name")),
+        "recipient_designation": _text(data.get("recipient_designation")),
+        "recipient_address": _text(data.get("recipient_address")),
+        "subject": _text(data.get("subject") or data.get("document_subject")),
+        "body": re.sub(r"\n{3,}", "\n\n", body).strip(),
+    }
+
+def file_name(template: str, context: dict) -> str:
+    label = context.get("number") or context.get("ref_no") or context.get("title") or "document"
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", label).strip("_") or "document"
+    return f"{template}-{safe}.pdf"
+
+# --- Rendering + storage ---
+
+async def load_invoice(invoice_id: str) -> dict:
+    try:
+        res = await get_invoice(invoice_id)
+    except APIError as e:
+        if e.code == "PGRST116":  # single() matched no row
+            raise LookupError(f"Invoice {invoice_id} not found")
+        raise
+    if getattr(res, "error", None) or not res.data:
+        raise LookupError(f"Invoice {invoice_id} not found")
+    return res.data
+
+def storage_name(template: str, name: str, invoice_id: str = None) -> str:
+    """
+    The document_store name a render is versioned under. Invoices go by id:
+    their friendly name can repeat (every unnumbered invoice is
+    invoice-document.pdf) and would merge unrelated invoices into one history.
+    """
+    if invoice_id:
+        return f"invoices/{invoice_id}.pdf"
+    return f"official/{name}"
+
+async def store(pdf: bytes, template: str, context: dict, name: str, user_name: str, invoice_id: str = None) -> dict:
+    """Saves the PDF as the next version of storage_name(); unchanged PDFs are not re-stored."""
+    upload = document_store.Upload.of(pdf)
+    try:
+        row, _ = await document_store.save(
+            upload, storage_name(template, name, invoice_id), template, title=name[:-4], user_name=user_name,
+            invoice_id=invoice_id,
+            metadata={"rendered_at": datetime.now(timezone.utc).isoformat(), "renderer": "server",
+                      "file_name": name},
+        )
+    finally:
+        upload.close()
+    return row
+
+async def month_invoices(month_year: str, statuses: tuple = BATCH_STATUSES) -> list:
+    """Invoices dated in the month (created_at when date is empty), same rule as payroll."""
+    start, end = month_bounds(month_year)
+
+    async def collect(factory) -> list:
+        return [row async for page in iter_pages(factory) for row in page]
+
+    dated, undated = await asyncio.gather(
+        collect(lambda: supabase.table("invoices").select("*").in_("status", list(statuses))
+                .gte("date", start).lt("date", end)),
+        collect(lambda: supabase.table("invoices").select("*").in_("status", list(statuses))
+                .is_("date", "null").gte("created_at", start).lt("created_at", end)),
+    )
+    return dated + undated
+
+async def iter_batch(rows: list, template: str = "invoice"):
+    """
+    Renders rows in the pool, BATCH_WINDOW at a time, yielding (row, result) as
+    each finishes: result is (name, pdf, context), or the exception it failed with.
+    """
+    # Zip entry names, fixed up front so a repeated name (unnumbered invoices)
+    # gets the same id suffix on every run rather than one in finishing order
+    names = [file_name(template, invoice_context(row)) for row in rows]
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+
+    async def one(row, name):
+        if counts[name] > 1:
+            name = f"{name[:-4]}-{row.get('id')}.pdf"
+        context = invoice_context(row)
+        return name, await render(template, context), context
+
+    pending, queued = {}, iter(zip(rows, names))
+    try:
+        while True:
+            for row, name in itertools.islice(queued, BATCH_WINDOW - len(pending)):
+                pending[asyncio.ensure_future(one(row, name))] = row
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                row = pending.pop(task)
+                if task.exception() is not None:
+                    logger.warning("render failed for invoice %s: %s", row.get("id"), task.exception())
+                    yield row, task.exception()
+                    continue
+                yield row, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+class _ZipSink:
+    """Write-only file for ZipFile: keeps what was written until take()."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+async def zip_stream(files):
+    """Zips an async iterator of (name, bytes), yielding the archive as each file is added."""
+    sink = _ZipSink()
+    # PDF streams are already deflated; storing them keeps zipping near-free
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        async for name, data in files:
+            zf.writestr(name, data)
+            yield sink.take()
+    yield sink.take()   # central directory
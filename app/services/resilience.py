@@ -0,0 +1,260 @@
+# app/services/resilience.py
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import httpx
+from postgrest.exceptions import APIError
+from app.services.metrics import upstream_retries, breaker_rejections, faults_injected
+
+# Failure handling for every upstream (Supabase) call:
+#
+# - Deadlines: each execute() gets UPSTREAM_READ_DEADLINE / UPSTREAM_WRITE_DEADLINE
+#   seconds in total, retries included, instead of the 30 s HTTP client timeout.
+# - Retries: only reads (GET/HEAD, and RPCs listed in IDEMPOTENT_RPCS) are retried,
+#   UPSTREAM_RETRIES times with full-jitter backoff, on connection errors,
+#   timeouts and PostgREST's database-unavailable errors. A write that failed
+#   mid-flight may have landed, so it is never replayed here (clients retry
+#   with an Idempotency-Key).
+# - Circuit breaker: after UPSTREAM_BREAKER_THRESHOLD consecutive failures the
+#   upstream is considered down and calls fail at once with CircuitOpen for
+#   UPSTREAM_BREAKER_COOLDOWN seconds; then a single probe decides whether to
+#   close it again. Meanwhile reference data is served stale from the cache.
+# - Fault injection: UPSTREAM_FAULTS="latency=0.2:1.5,error=0.1:503,drop=0.05,seed=7"
+#   delays, fails or drops that share of upstream requests, for tests and
+#   benchmarks. Never set it in production.
+READ_DEADLINE = float(os.getenv("UPSTREAM_READ_DEADLINE", "8"))
+WRITE_DEADLINE = float(os.getenv("UPSTREAM_WRITE_DEADLINE", "15"))
+RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.1"))
+RETRY_BACKOFF_MAX = 1.0
+BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "15"))
+
+# POST RPCs that only read, so they may be retried like GETs
+IDEMPOTENT_RPCS = {"resolve_service_rate", "search_directory", "financial_summary"}
+# PostgREST's own "cannot reach the database" errors (sent as 503 / 504)
+UNAVAILABLE_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+logger = logging.getLogger("vesak.upstream")
+
+class UpstreamUnavailable(Exception):
+    """Supabase could not be reached in time; the API answers 503."""
+
+    def __init__(self, message: str, retry_after: float = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+class UpstreamTimeout(UpstreamUnavailable):
+    pass
+
+# --- Circuit breaker ---
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0        # consecutive
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Raises CircuitOpen while the upstream is considered down."""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if remaining > 0 or self._probing:
+            self.rejected += 1
+            breaker_rejections.inc(self.name)
+            raise CircuitOpen(f"{self.name} unavailable (circuit open)", retry_after=max(1, round(remaining)))
+        # Cool-down over: let exactly one request through to test the water
+        self.state = "half_open"
+        self._probing = True
+
+    def success(self):
+        if self.state != "closed":
+            logger.info("%s circuit closed", self.name)
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+            if self.state == "closed":
+                logger.error("%s circuit opened after %d consecutive failures", self.name, self.failures)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opened += 1
+
+    def abandon(self):
+        """A request was cancelled before it got an answer: no verdict, but free the probe slot."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "threshold": self.threshold,
+            "cooldown_seconds": self.cooldown,
+            "times_opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+breaker = CircuitBreaker("supabase")
+
+# --- Fault injection ---
+
+class FaultInjector:
+    """Parses UPSTREAM_FAULTS and applies it to outgoing requests."""
+
+    def __init__(self, spec: str = ""):
+        self.spec = spec or ""
+        self.latency = (0.0, 0.0)   # (probability, seconds)
+        self.error = (0.0, 503)     # (probability, status)
+        self.drop = 0.0
+        seed = None
+        for part in filter(None, (p.strip() for p in self.spec.split(","))):
+            name, _, value = part.partition("=")
+            args = value.split(":")
+            if name == "latency":
+                self.latency = (float(args[0]), float(args[1]) if len(args) > 1 else 1.0)
+            elif name == "error":
+                self.error = (float(args[0]), int(args[1]) if len(args) > 1 else 503)
+            elif name == "drop":
+                self.drop = float(args[0])
+            elif name == "seed":
+                seed = int(args[0])
+            else:
+                raise ValueError(f"Unknown UPSTREAM_FAULTS entry {part!r} (latency, error, drop, seed)")
+        self.random = random.Random(seed)
+
+    def __bool__(self) -> bool:
+        return bool(self.latency[0] or self.error[0] or self.drop)
+
+    async def apply(self, request: httpx.Request):
+        """Returns an injected error response, raises an injected connection error, or returns None."""
+        if self.random.random() < self.latency[0]:
+            faults_injected.inc("latency")
+            await asyncio.sleep(self.latency[1])
+        if self.random.random() < self.drop:
+            faults_injected.inc("drop")
+            raise httpx.ConnectError("injected fault: connection dropped", request=request)
+        if self.random.random() < self.error[0]:
+            faults_injected.inc("error")
+            body = json.dumps({"code": "PGRST000", "message": "injected fault", "details": None, "hint": None})
+            return httpx.Response(self.error[1], content=body.encode(), request=request,
+                                  headers={"content-type": "application/json"})
+        return None
+
+    def stats(self) -> dict:
+        return {"spec": self.spec, "latency": self.latency, "error": self.error, "drop": self.drop}
+
+faults = FaultInjector(os.getenv("UPSTREAM_FAULTS", ""))
+if faults:
+    logger.warning("UPSTREAM_FAULTS is set (%s): upstream requests will be delayed / failed on purpose", faults.spec)
+
+def set_faults(spec: str):
+    """Replaces the injected faults at runtime (benchmarks, tests)."""
+    global faults
+    faults = FaultInjector(spec)
+
+async def guarded(request: httpx.Request, send) -> httpx.Response:
+    """Transport-level wrapper: breaker check, injected faults, then the real request."""
+    breaker.allow()
+    try:
+        response = (await faults.apply(request) if faults else None) or await send(request)
+    except asyncio.CancelledError:
+        breaker.abandon()
+        raise
+    except Exception:
+        breaker.failure()
+        raise
+    if response.status_code >= 500:
+        breaker.failure()
+    else:
+        breaker.success()
+    return response
+
+# --- Deadlines and retries ---
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, CircuitOpen):
+        return False
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, APIError):
+        return error.code in UNAVAILABLE_CODES
+    return False
+
+def _unavailable(error: Exception) -> bool:
+    return _retryable(error) or isinstance(error, UpstreamUnavailable)
+
+async def call(operation, target: str, read: bool, deadline: float = None):
+    """
+    Runs `operation()` (one upstream round-trip) within `deadline` seconds,
+    retrying reads. Upstream failures come out as UpstreamUnavailable; any
+    other error (bad filter, constraint violation...) is re-raised as is.
+    """
+    loop = asyncio.get_running_loop()
+    budget = deadline or (READ_DEADLINE if read else WRITE_DEADLINE)
+    ends = loop.time() + budget
+    attempts = RETRIES + 1 if read else 1
+    for attempt in range(attempts):
+        remaining = ends - loop.time()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            return await asyncio.wait_for(operation(), remaining)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                # The transport saw a cancellation, not an answer; count the timeout here
+                breaker.failure()
+            if not _unavailable(e):
+                raise
+            delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt))
+            if attempt + 1 < attempts and _retryable(e) and loop.time() + delay < ends:
+                upstream_retries.inc(target)
+                logger.info("retrying %s after %s (attempt %d)", target, type(e).__name__, attempt + 2)
+                await asyncio.sleep(delay)
+                continue
+            if isinstance(e, UpstreamUnavailable):
+                raise
+            if isinstance(e, asyncio.TimeoutError):
+                raise UpstreamTimeout(f"{target}: no answer within {budget:g}s") from e
+            reason = getattr(e, "message", None) or e
+            raise UpstreamUnavailable(f"{target}: {type(e).__name__}: {reason}") from e
+
+def upstream_cause(error: BaseException):
+    """
+    The UpstreamUnavailable behind `error`, if any. Routers turn exceptions into
+    HTTPException(400, str(e)); this lets the app answer 503 for those instead.
+    """
+    for _ in range(4):
+        if error is None or isinstance(error, UpstreamUnavailable):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+def is_read(method: str, target: str) -> bool:
+    return method in ("GET", "HEAD") or (target.startswith("rpc:") and target[4:] in IDEMPOTENT_RPCS)
+
+def stats() -> dict:
+    return {
+        "breaker": breaker.stats(),
+        "deadlines": {"read": READ_DEADLINE, "write": WRITE_DEADLINE},
+        "retries": RETRIES,
+        "idempotent_rpcs": sorted(IDEMPOTENT_RPCS),
+        "faults": faults.stats() if faults else None,
+    }
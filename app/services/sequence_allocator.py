@@ -0,0 +1,101 @@
+# app/services/sequence_allocator.py
+import os
+import random
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+from app.services.supabase_client import reserve_invoice_seq_block, reserve_sequence_block
+from app.services.resilience import CircuitOpen
+
+logger = logging.getLogger("vesak.sequences")
+
+class SequenceUnavailable(RuntimeError):
+    """Raised when no sequence block could be reserved; callers must not invent a number."""
+
+class SequenceAllocator:
+    """
+    Hands out sequence numbers from blocks reserved in a single RPC.
+
+    `reserve(key, count)` must atomically advance the counter for `key` by
+    `count` and return the new last value; numbers last-count+1 .. last then
+    belong to this process. Numbers left in a block at shutdown are skipped,
+    so sequences stay unique but may have gaps.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        reserve: Callable[[Hashable, int], Awaitable[int]],
+        block_size: int = 10,
+        retries: int = 3,
+        backoff: float = 0.2,
+    ):
+        self.name = name
+        self.reserve = reserve
+        self.block_size = max(1, block_size)
+        self.retries = retries
+        self.backoff = backoff
+        self._blocks = {}   # key -> [next_value, last_value]
+        self._locks = {}
+        self.issued = 0
+        self.reservations = 0
+        self.failures = 0
+
+    def _lock(self, key) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def next(self, key: Hashable) -> int:
+        async with self._lock(key):
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                last = await self._reserve_with_retry(key)
+                block = self._blocks[key] = [last - self.block_size + 1, last]
+                # Blocks for past months are never used again
+                for stale in [k for k in self._blocks if k != key and self._blocks[k][0] > self._blocks[k][1]]:
+                    del self._blocks[stale]
+            value = block[0]
+            block[0] += 1
+            self.issued += 1
+            return value
+
+    async def _reserve_with_retry(self, key) -> int:
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                last = int(await self.reserve(key, self.block_size))
+                self.reservations += 1
+                return last
+            except Exception as e:
+                last_error = e
+                if isinstance(e, CircuitOpen):
+                    break   # Supabase is known to be down; fail now
+                if attempt < self.retries:
+                    # Exponential backoff with full jitter
+                    await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        self.failures += 1
+        logger.error("ALERT: could not reserve %s sequence block for %s after %d attempts: %s",
+                     self.name, key, attempt + 1, last_error)
+        raise SequenceUnavailable(f"Could not reserve {self.name} sequence for {key}: {last_error}")
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "block_size": self.block_size,
+            "issued": self.issued,
+            "reservations": self.reservations,
+            "failures": self.failures,
+            "open_blocks": {"/".join(k) if isinstance(k, tuple) else str(k): b[1] - b[0] + 1 for k, b in self._blocks.items() if b[0] <= b[1]},
+        }
+
+SEQUENCE_BLOCK_SIZE = int(os.getenv("SEQUENCE_BLOCK_SIZE", "10"))
+
+# Invoice numbers (IN-{ABBR}-{DDMMYY}-{SEQ}-{Client}) share one counter per MMYY month.
+invoice_numbers = SequenceAllocator("invoice", reserve_invoice_seq_block, block_size=SEQUENCE_BLOCK_SIZE)
+
+# Document numbers from /api/sequences/next, keyed (location, month_year).
+document_numbers = SequenceAllocator(
+    "document", lambda key, count: reserve_sequence_block(*key, count), block_size=SEQUENCE_BLOCK_SIZE
+)
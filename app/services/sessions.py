@@ -0,0 +1,151 @@
+# app/services/sessions.py
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import logging
+from fastapi import HTTPException, Request
+from pydantic import BaseModel
+
+logger = logging.getLogger("vesak.sessions")
+
+# Stateless session tokens: base64url(claims).base64url(HMAC-SHA256(claims)).
+# Verifying one is a hash + a dict lookup, so every router can check identity and
+# role without a `users` query. Revocation goes through a small in-memory denylist.
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(12 * 3600)))
+SESSION_COOKIE = "vesak_session"
+# AUTH_REQUIRED=0 lets unauthenticated requests through as the X-User-Name header
+# (old behaviour) -- only meant for local tooling while clients migrate.
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "1") not in ("0", "false", "False")
+
+_secret = os.getenv("SESSION_SECRET")
+if not _secret:
+    _secret = secrets.token_hex(32)
+    logger.warning("SESSION_SECRET is not set: sessions use a per-process key, "
+                   "end on restart and are not shared between workers")
+_KEY = _secret.encode("utf-8")
+
+class SessionUser(BaseModel):
+    id: str
+    username: str
+    role: str
+    page_access: dict = {}
+    permissions: dict = {}
+    jti: str = ""
+    iat: float = 0
+    exp: float = 0
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(_KEY, body.encode("ascii"), hashlib.sha256).digest())
+
+def issue_token(user: dict) -> tuple:
+    """Returns (token, expires_at) for a `users` row."""
+    now = time.time()
+    claims = {
+        "sub": str(user["id"]),
+        "name": user["username"],
+        "role": user.get("role") or "",
+        "page_access": user.get("page_access") or {},
+        "permissions": user.get("permissions") or {},
+        "iat": round(now, 3),
+        "exp": int(now + SESSION_TTL),
+        "jti": secrets.token_urlsafe(12),
+    }
+    body = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{body}.{_sign(body)}", claims["exp"]
+
+class Denylist:
+    """
+    Revoked token ids (kept only until they would have expired anyway) and
+    per-user cut-offs: revoke_user() invalidates every token issued before it,
+    e.g. on password reset or when an account is disabled. Per process.
+    """
+
+    def __init__(self):
+        self._tokens = {}   # jti -> exp
+        self._users = {}    # user id -> revoked-before timestamp
+
+    def revoke_token(self, jti: str, exp: float):
+        self._tokens[jti] = exp
+        self._purge()
+
+    def revoke_user(self, user_id: str):
+        self._users[str(user_id)] = time.time()
+
+    def is_revoked(self, session: SessionUser) -> bool:
+        if session.jti in self._tokens:
+            return True
+        cutoff = self._users.get(session.id)
+        return cutoff is not None and session.iat <= cutoff
+
+    def _purge(self):
+        now = time.time()
+        for jti in [j for j, exp in self._tokens.items() if exp < now]:
+            del self._tokens[jti]
+        for uid in [u for u, cutoff in self._users.items() if cutoff + SESSION_TTL < now]:
+            del self._users[uid]
+
+    def __len__(self):
+        return len(self._tokens) + len(self._users)
+
+denylist = Denylist()
+
+def verify_token(token: str) -> SessionUser:
+    body, _, signature = token.partition(".")
+    if not body or not hmac.compare_digest(signature, _sign(body)):
+        raise ValueError("bad signature")
+    try:
+        claims = json.loads(_b64decode(body))
+    except ValueError:
+        raise ValueError("malformed token")
+    if claims.get("exp", 0) < time.time():
+        raise ValueError("expired")
+    session = SessionUser(
+        id=claims["sub"], username=claims["name"], role=claims["role"],
+        page_access=claims.get("page_access") or {}, permissions=claims.get("permissions") or {},
+        jti=claims["jti"], iat=claims["iat"], exp=claims["exp"],
+    )
+    if denylist.is_revoked(session):
+        raise ValueError("revoked")
+    return session
+
+def _request_tokens(request: Request) -> list:
+    tokens = []
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        tokens.append(auth[7:].strip())
+    # Cookie covers plain links (exports) and EventSource, which cannot set headers
+    if request.cookies.get(SESSION_COOKIE):
+        tokens.append(request.cookies[SESSION_COOKIE])
+    return tokens
+
+async def require_session(request: Request) -> SessionUser:
+    """Router dependency: verifies the session token and stores it on request.state."""
+    session, error = None, "Not authenticated"
+    for token in _request_tokens(request):
+        try:
+            session = verify_token(token)
+            break
+        except ValueError as e:
+            error = f"Invalid session: {e}"
+    if session is None:
+        if AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail=error)
+        session = SessionUser(id="", username=request.headers.get("X-User-Name", "System"), role="")
+    request.state.session = session
+    return session
+
+def get_user_name(request: Request) -> str:
+    # Audit name for created_by_name / updated_by_name columns
+    session = getattr(request.state, "session", None)
+    return session.username if session else "System"
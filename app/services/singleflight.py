@@ -0,0 +1,55 @@
+# app/services/singleflight.py
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key starts the
+    work, callers arriving while it is in flight await the same result, and the
+    key is forgotten as soon as it completes (nothing is cached afterwards).
+
+    The shared result is the same object for every caller, so it must be
+    treated as read-only -- as with values from the reference cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}   # key -> asyncio.Task
+        self.leaders = 0     # calls that went upstream
+        self.followers = 0   # calls answered by someone else's in-flight call
+        self.epoch = 0
+
+    def bump(self):
+        """Called around every write: later reads never join a flight started before it."""
+        self.epoch += 1
+
+    def in_flight(self, key) -> bool:
+        return (self.epoch, key) in self._flights
+
+    async def do(self, key, fn):
+        key = (self.epoch, key)
+        task = self._flights.get(key)
+        if task is None:
+            # Own task, so a leader whose request is cancelled does not cancel its followers
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter has gone away
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.followers
+        return {
+            "name": self.name,
+            "in_flight": len(self._flights),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.followers,
+            "coalescing_ratio": round(self.followers / calls, 4) if calls else 0.0,
+        }
@@ -0,0 +1,79 @@
+# app/services/startup.py
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger("vesak.startup")
+
+# Cold-start work done in the lifespan, before uvicorn accepts connections.
+# On Render's free plan the service spins down when idle, so the first request
+# after a wake-up used to pay for DNS + TLS to Supabase and for every reference
+# cache miss. warm_up() moves that cost in front of the first request instead.
+#   STARTUP_WARMUP=0           skip the upstream warm-up entirely
+#   STARTUP_PREFETCH=0         open the connection but do not prefetch caches
+#   STARTUP_WARMUP_TIMEOUT=10  seconds before startup gives up and serves cold
+WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "1") not in ("0", "false", "False")
+PREFETCH_ENABLED = os.getenv("STARTUP_PREFETCH", "1") not in ("0", "false", "False")
+WARMUP_TIMEOUT = float(os.getenv("STARTUP_WARMUP_TIMEOUT", "10"))
+
+class StartupReport:
+    """Milliseconds spent per startup phase, exposed at /api/monitoring/startup."""
+
+    def __init__(self):
+        self.phases = {}
+        self.errors = {}
+        self.ready_at = None
+
+    def record(self, phase: str, started: float):
+        self.phases[phase] = round((time.perf_counter() - started) * 1000, 1)
+
+    def to_dict(self) -> dict:
+        return {"phases_ms": dict(self.phases), "errors": dict(self.errors), "ready_at": self.ready_at}
+
+startup_report = StartupReport()
+
+async def _timed(phase: str, coro):
+    started = time.perf_counter()
+    try:
+        await coro
+    except Exception as e:
+        startup_report.errors[phase] = str(e)
+        logger.warning("startup %s failed: %s", phase, e)
+    finally:
+        startup_report.record(phase, started)
+
+async def _open_connection():
+    from app.services.supabase_client import supabase, execute
+    # Smallest possible round-trip: resolves DNS and completes the TLS/HTTP2
+    # handshake so the pooled connection is already open for the first request
+    await execute(supabase.table("locations").select("id").limit(1))
+
+async def _prefetch():
+    from app.services.supabase_client import get_locations, get_budgets, get_service_rates
+    from app.services.rate_index import rate_index, RATE_INDEX_ENABLED
+    # Multiplexed over the connection opened above
+    jobs = [
+        _timed("prefetch_locations", asyncio.gather(get_locations(True), get_locations(False))),
+        _timed("prefetch_budgets", get_budgets()),
+        _timed("prefetch_rates", rate_index.ensure_loaded(get_service_rates) if RATE_INDEX_ENABLED
+               else get_service_rates()),
+    ]
+    await asyncio.gather(*jobs)
+
+async def warm_up():
+    """Never fatal: failures and timeouts are logged and the app starts cold."""
+    if not WARMUP_ENABLED:
+        return
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_run_warm_up(), WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        startup_report.errors["warm_up"] = f"timed out after {WARMUP_TIMEOUT:g}s"
+        logger.warning("startup warm-up timed out after %.1fs, serving cold", WARMUP_TIMEOUT)
+    startup_report.record("warm_up", started)
+
+async def _run_warm_up():
+    await _timed("upstream_connect", _open_connection())
+    if PREFETCH_ENABLED and "upstream_connect" not in startup_report.errors:
+        await _prefetch()
@@ -1,6 +1,14 @@
 # app/services/supabase_client.py
 import os
-from supabase import create_client, Client
+import time
+import base64
+import httpx
+from email.utils import parsedate_to_datetime
+from supabase import AsyncClient, AsyncClientOptions
+from app.services.cache import reference_cache, cached
+from app.services.metrics import upstream_target, record_upstream, upstream_reads
+from app.services.singleflight import SingleFlight
+from app.services import resilience
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -8,77 +16,282 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
     raise RuntimeError("Please set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY in your .env")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# --- Connection pool ---
+# One HTTP/2 connection multiplexes many concurrent PostgREST calls, so a small
+# pool is enough. Tune with SUPABASE_POOL_SIZE / SUPABASE_TIMEOUT if needed.
+POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+REQUEST_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+# Identical concurrent GETs share one upstream call (SINGLE_FLIGHT=0 disables)
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") not in ("0", "false", "False")
+
+class _MeteredStream(httpx.AsyncByteStream):
+    """Counts body bytes as the client reads them; reports once the body is closed."""
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+        self.size = 0
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.size += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+        if self.on_close is not None:
+            self.on_close(self.size)
+            self.on_close = None
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """
+    Delegating transport so the backend can be swapped without rebuilding the
+    client. Also records per table / RPC latency, body size and errors, and the
+    newest `Date` Supabase has answered with (server_time).
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.server_time = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        target = upstream_target(request.url.path)
+        started = time.perf_counter()
+        try:
+            # Circuit breaker (and injected faults in test mode) see Storage calls too
+            response = await resilience.guarded(request, self.inner.handle_async_request)
+        except resilience.CircuitOpen:
+            raise
+        except Exception:
+            record_upstream(target, request.method, time.perf_counter() - started, 0, None)
+            raise
+
+        self._saw_date(response.headers.get("date"))
+
+        def done(size: int):
+            record_upstream(target, request.method, time.perf_counter() - started, response.status_code, size)
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_MeteredStream(response.stream, done),
+            extensions=response.extensions,
+        )
+
+    def _saw_date(self, value: str):
+        try:
+            sent = parsedate_to_datetime(value) if value else None
+        except (TypeError, ValueError):
+            return
+        if sent is not None and sent.tzinfo is not None and (self.server_time is None or sent > self.server_time):
+            self.server_time = sent
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+transport = UpstreamTransport(httpx.AsyncHTTPTransport(
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=POOL_SIZE,
+        max_keepalive_connections=POOL_SIZE,
+        keepalive_expiry=60,
+    ),
+))
+
+http_client = httpx.AsyncClient(
+    transport=transport,
+    timeout=httpx.Timeout(REQUEST_TIMEOUT),
+    follow_redirects=True,
+)
+
+supabase: AsyncClient = AsyncClient(
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    AsyncClientOptions(httpx_client=http_client),
+)
+
+def upstream_time():
+    """
+    Supabase's clock as of its latest response (HTTP Date, whole seconds, so it
+    can only lag); None until a response carried one. Never this host's clock.
+    """
+    return transport.server_time
+
+def use_transport(inner: httpx.AsyncBaseTransport):
+    """Route all upstream calls through another transport (local stand-ins, benchmarks)."""
+    transport.inner = inner
+
+async def close_client():
+    await http_client.aclose()
+
+reads = SingleFlight("upstream_reads")
+
+def _read_key(query):
+    """Identity of a GET/HEAD query (builder type, URL, params, headers); None for writes."""
+    req = getattr(query, "request", None)
+    if req is None or req.http_method not in ("GET", "HEAD"):
+        return None
+    # single()/maybe_single() shape the same response differently, so the builder is part of the key
+    return (type(query).__name__, req.http_method, str(req.path), str(req.params),
+            tuple(sorted(req.headers.multi_items())))
+
+async def execute(query, deadline: float = None):
+    """
+    Single choke point for every PostgREST round-trip. Each call gets a deadline
+    (resilience.READ_DEADLINE / WRITE_DEADLINE unless given) and reads are
+    retried; failures to reach Supabase raise resilience.UpstreamUnavailable.
+    """
+    req = getattr(query, "request", None)
+    method = req.http_method if req is not None else "POST"
+    target = upstream_target(str(req.path)) if req is not None else "unknown"
+    if req is not None:
+        # postgrest-py's own 503 retry sleeps 1-4 s and retries writes too; ours replaces it
+        req.retry_enabled = False
+
+    def run():
+        return resilience.call(query.execute, target, resilience.is_read(method, target), deadline)
+
+    key = _read_key(query) if SINGLE_FLIGHT else None
+    if key is None:
+        if SINGLE_FLIGHT:
+            # Reads that start after this write (or during it) never join an older flight
+            reads.bump()
+            try:
+                return await run()
+            finally:
+                reads.bump()
+        return await run()
+
+    upstream_reads.inc(target, "coalesced" if reads.in_flight(key) else "sent")
+    return await reads.do(key, run)
+
+def quote(value: str) -> str:
+    """Quotes a value for use inside a PostgREST or=() / and=() filter."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+def with_actor(query, actor: str):
+    """Names who made a write for the phase34 audit trigger (X-Audit-Actor, base64 of the UTF-8 name)."""
+    if actor:
+        query.request.headers["X-Audit-Actor"] = base64.b64encode(actor.encode()).decode()
+    return query
 
 # --- Staff Directory ---
-def upsert_staff(payload: dict):
+async def upsert_staff(payload: dict):
     # If Aadhar exists, this updates fields (like mobile)
-    return supabase.table("staff").upsert(payload, on_conflict="aadhar").execute()
+    return await execute(supabase.table("staff").upsert(payload, on_conflict="aadhar"))
 
-def search_staff(query: str):
-    # Search by mobile or aadhar
-    return supabase.table("staff").select("*").or_(f"mobile.eq.{query},aadhar.eq.{query}").execute()
+async def search_staff(query: str):
+    # Search by mobile or aadhar (quoted: the value is user input inside an or=() filter)
+    return await execute(supabase.table("staff").select("*").or_(f"mobile.eq.{quote(query)},aadhar.eq.{quote(query)}"))
 
 # --- Customer Auto-fill ---
-def search_customers(mobile: str):
+async def search_customers(mobile: str):
     # Search inquiries for existing customer data by mobile
-    return supabase.table("inquiries").select("customer_name,customer_age,customer_gender,customer_address,customer_location").eq("customer_mobile", mobile).order("created_at", desc=True).limit(1).execute()
+    return await execute(supabase.table("inquiries").select("customer_name,customer_age,customer_gender,customer_address,customer_location").eq("customer_mobile", mobile).order("created_at", desc=True).limit(1))
 
+async def search_directory(query: str, kinds: list, location: str = None, limit: int = 10):
+    # Ranked typeahead over customers / staff / employees (phase27 migration)
+    params = {"p_query": query, "p_kinds": kinds, "p_location": location, "p_limit": limit}
+    return await execute(supabase.rpc("search_directory", params))
 
-def list_clients(limit: int = 100):
-    return supabase.table("clients").select("*").order("created_at", desc=True).limit(limit).execute()
+async def list_clients(limit: int = 100):
+    return await execute(supabase.table("clients").select("*").order("created_at", desc=True).limit(limit))
 
-def get_client(client_id: str):
-    return supabase.table("clients").select("*").eq("id", client_id).single().execute()
+async def get_client(client_id: str):
+    return await execute(supabase.table("clients").select("*").eq("id", client_id).single())
 
-def upsert_client(payload: dict):
-    return supabase.table("clients").upsert(payload).execute()
+async def upsert_client(payload: dict):
+    return await execute(supabase.table("clients").upsert(payload))
 
-def create_invoice(payload: dict):
-    return supabase.table("invoices").insert(payload).execute()
+async def create_invoice(payload: dict):
+    return await execute(supabase.table("invoices").insert(payload))
 
-def update_invoice(invoice_id: str, payload: dict):
-    return supabase.table("invoices").update(payload).eq("id", invoice_id).execute()
+async def update_invoice(invoice_id: str, payload: dict):
+    return await execute(supabase.table("invoices").update(payload).eq("id", invoice_id))
 
-def get_invoice(invoice_id: str):
-    return supabase.table("invoices").select("*").eq("id", invoice_id).single().execute()
+async def get_invoice(invoice_id: str):
+    return await execute(supabase.table("invoices").select("*").eq("id", invoice_id).single())
 
-def list_invoices(limit: int = 100):
-    return supabase.table("invoices").select("*").order("created_at", desc=True).limit(limit).execute()
+async def list_invoices(limit: int = 100):
+    return await execute(supabase.table("invoices").select("*").order("created_at", desc=True).limit(limit))
 
-def create_document(payload: dict):
-    return supabase.table("official_documents").insert(payload).execute()
+async def create_document(payload: dict):
+    return await execute(supabase.table("official_documents").insert(payload))
 
-def get_next_sequence(doc_type_code: str, location_code: str, month_year: str):
+async def get_next_sequence(doc_type_code: str, location_code: str, month_year: str):
     # Calls the 'next_sequence' Postgres function
     params = {
         "p_doc_type": doc_type_code,
         "p_location": location_code,
         "p_month_year": month_year
     }
-    return supabase.rpc("next_sequence", params).execute()
+    return await execute(supabase.rpc("next_sequence", params))
+
+# --- Sequence blocks (see app/services/sequence_allocator.py) ---
+async def reserve_invoice_seq_block(month_year: str, count: int) -> int:
+    # Advances invoice_sequences by `count` in one call; returns the new last value
+    res = await execute(supabase.rpc("reserve_invoice_seq_block", {"p_month_year": month_year, "p_count": count}))
+    return res.data
+
+async def reserve_sequence_block(location_code: str, month_year: str, count: int) -> int:
+    # Per-location counter for next_sequence() style numbers (phase26 migration)
+    params = {"p_location": location_code, "p_month_year": month_year, "p_count": count}
+    res = await execute(supabase.rpc("reserve_sequence_block", params))
+    return res.data
+
+# --- Locations ---
+async def edit_sub_locations(changes: list, actor: str = None) -> list:
+    # [{"location_id", "op": "add"|"remove", "name"}] applied atomically in order (phase29 migration);
+    # returns the updated location rows
+    res = await execute(with_actor(supabase.rpc("edit_sub_locations", {"p_changes": changes}), actor))
+    return res.data or []
 
 # --- Rate Management ---
-def upsert_service_rate(payload: dict):
+async def upsert_service_rate(payload: dict, actor: str = None):
     # Upserts based on unique constraint (location, service_category, plan_type, shift_type)
     # The payload MUST include these 4 fields to match correctly, or an ID.
-    return supabase.table("service_rates").upsert(payload).execute()
+    return await execute(with_actor(supabase.table("service_rates").upsert(payload), actor))
 
-def list_service_rates(location: str = None, service_category: str = None):
+async def list_service_rates(location: str = None, service_category: str = None):
     query = supabase.table("service_rates").select("*").order("location", desc=False)
     if location:
         query = query.eq("location", location)
     if service_category:
         query = query.eq("service_category", service_category)
-    return query.execute()
+    return await execute(query)
 
-def get_service_rate(location: str, service: str, plan: str, shift: str):
+async def get_service_rate(location: str, service: str, plan: str, shift: str):
     # Precise lookup for Inquiry Form
-    return supabase.table("service_rates")\
+    return await execute(supabase.table("service_rates")\
         .select("*")\
         .eq("location", location)\
         .eq("service_category", service)\
         .eq("plan_type", plan)\
         .eq("shift_type", shift)\
-        .maybe_single()\
-        .execute()
+        .maybe_single())
+
+# --- Reference data (cached, invalidated by the writing routers) ---
+async def get_locations(active_only: bool = True) -> list:
+    async def load():
+        query = supabase.table("locations").select("*").order("name")
+        if active_only:
+            query = query.eq("is_active", True)
+        return (await execute(query)).data or []
+    return await cached(reference_cache, ("locations", "active" if active_only else "all"), load)
+
+async def get_location_abbreviation(name: str):
+    for loc in await get_locations(active_only=False):
+        if loc.get("name") == name:
+            return loc.get("abbreviation")
+    return None
+
+async def get_service_rates(location: str = None, service_category: str = None) -> list:
+    async def load():
+        return (await list_service_rates(location, service_category)).data or []
+    return await cached(reference_cache, ("service_rates", "list", location, service_category), load)
+
+async def get_budgets() -> list:
+    async def load():
+        return (await execute(supabase.table("budgets").select("*").order("category"))).data or []
+    return await cached(reference_cache, ("budgets", "all"), load)
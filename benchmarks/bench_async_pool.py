@@ -0,0 +1,121 @@
+# benchmarks/bench_async_pool.py
+"""
+Before/after latency for the dashboard fan-out (/api/invoices/, /api/employees/,
+/api/expenses/) against a fake PostgREST with fixed upstream latency.
+
+  before: sync `def` handlers on the shared sync client (Starlette threadpool, 40 workers)
+  after:  the real app, async handlers on the pooled HTTP/2 client
+
+Usage:
+  python -m benchmarks.bench_async_pool --requests 600 --concurrency 200 --latency-ms 80
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.setdefault("SESSION_SECRET", "bench-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from postgrest import SyncPostgrestClient
+
+ROWS = [{"id": str(i), "name": f"Row {i}", "status": "Active"} for i in range(50)]
+PATHS = ["/api/invoices/", "/api/employees/", "/api/expenses/"]
+
+
+def auth_headers() -> dict:
+    from app.services.sessions import issue_token
+    token, _ = issue_token({"id": "bench", "username": "bench", "role": "Founding Member"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def build_before_app(latency: float) -> FastAPI:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, json=ROWS)
+
+    rest = SyncPostgrestClient(
+        os.environ["SUPABASE_URL"] + "/rest/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    app = FastAPI()
+
+    @app.get("/api/invoices/")
+    def invoices():
+        return rest.table("invoices").select("*").order("created_at", desc=True).limit(200).execute().data
+
+    @app.get("/api/employees/")
+    def employees():
+        return rest.table("employees").select("*").order("name").execute().data
+
+    @app.get("/api/expenses/")
+    def expenses():
+        return rest.table("expenses").select("*").order("expense_date", desc=True).execute().data
+
+    return app
+
+
+def build_after_app(latency: float) -> FastAPI:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=ROWS)
+
+    from app.services.supabase_client import use_transport
+    use_transport(httpx.MockTransport(handler))
+    from app.main import app
+    return app
+
+
+async def drive(app: FastAPI, total: int, concurrency: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+        async def one(i: int):
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.get(PATHS[i % len(PATHS)])
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def report(label: str, latencies, elapsed: float):
+    print(f"{label:<8} n={len(latencies):<5} "
+          f"p50={statistics.median(latencies):8.1f}ms "
+          f"p99={percentile(latencies, 99):8.1f}ms "
+          f"rps={len(latencies) / elapsed:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    before = asyncio.run(drive(build_before_app(latency), args.requests, args.concurrency))
+    after = asyncio.run(drive(build_after_app(latency), args.requests, args.concurrency))
+    report("before", *before)
+    report("after", *after)
+
+
+if __name__ == "__main__":
+    main()
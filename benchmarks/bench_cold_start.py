@@ -0,0 +1,144 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold-start check: time from spawning a fresh `uvicorn app.main:app` process to
+the first successful (200) authenticated API request -- what a user waits for
+after Render's free plan has spun the service down.
+
+The upstream is a local fake PostgREST (plain HTTP) with a per-request latency
+and an extra per-connection setup cost standing in for DNS + TLS to Supabase.
+Each run is done with the lifespan warm-up on and off, and the server's own
+phase timings (/api/monitoring/startup) are printed alongside.
+
+Usage:
+  python -m benchmarks.bench_cold_start --runs 3 --latency-ms 40 --connect-ms 150
+  python -m benchmarks.bench_cold_start --max-ms 4000   # exit non-zero on regression
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "bench-secret"
+
+
+def fake_postgrest(latency: float, connect: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            time.sleep(connect)  # once per connection, like a TLS handshake
+            super().setup()
+
+        def _reply(self):
+            length = int(self.headers.get("content-length") or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(latency)
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def auth_headers() -> dict:
+    os.environ["SESSION_SECRET"] = SECRET
+    sys.path.insert(0, ROOT)
+    from app.services.sessions import issue_token
+    token, _ = issue_token({"id": "bench", "username": "bench", "role": "Founding Member"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def cold_start(upstream: str, headers: dict, warm_up: bool, timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ,
+               SUPABASE_URL=upstream, SUPABASE_SERVICE_ROLE_KEY="bench-key",
+               SESSION_SECRET=SECRET, STARTUP_WARMUP="1" if warm_up else "0")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=url, headers=headers, timeout=timeout) as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("server did not answer in time")
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited with {proc.returncode}")
+                sent = time.perf_counter()
+                try:
+                    r = client.get("/api/locations")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if r.status_code == 200:
+                    done = time.perf_counter()
+                    break
+                time.sleep(0.01)
+            report = client.get("/api/monitoring/startup").json()
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {
+        "first_ok_ms": (done - started) * 1000,
+        "first_request_ms": (done - sent) * 1000,
+        "phases": report.get("phases_ms", {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--connect-ms", type=float, default=150.0, help="extra cost per new upstream connection")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if median time-to-first-OK (warm-up on) exceeds this")
+    args = parser.parse_args()
+
+    server = fake_postgrest(args.latency_ms / 1000, args.connect_ms / 1000)
+    upstream = f"http://127.0.0.1:{server.server_address[1]}"
+    headers = auth_headers()
+
+    medians = {}
+    for warm_up in (False, True):
+        runs = [cold_start(upstream, headers, warm_up, args.timeout) for _ in range(args.runs)]
+        first_ok = statistics.median(r["first_ok_ms"] for r in runs)
+        first_req = statistics.median(r["first_request_ms"] for r in runs)
+        medians[warm_up] = first_ok
+        print(f"warm_up={'on ' if warm_up else 'off'} time_to_first_ok={first_ok:8.1f}ms "
+              f"first_request={first_req:7.1f}ms phases={json.dumps(runs[-1]['phases'])}")
+
+    server.shutdown()
+    if args.max_ms is not None and medians[True] > args.max_ms:
+        sys.exit(f"cold start regression: {medians[True]:.0f}ms > {args.max_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_events.py
+"""
+Event bus fan-out: --connections idle subscribers (one task each awaiting its
+queue, as an open /api/events stream does) receive --events notifications.
+Reports memory per idle connection and publish-to-delivery latency across all
+of them.
+
+Usage:
+  python -m benchmarks.bench_events --connections 5000 --events 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import tracemalloc
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def run(connections: int, events: int):
+    from app.services.events import EventBus
+
+    bus = EventBus()
+    delivered = []
+
+    async def consumer(sub, expected: int):
+        for _ in range(expected):
+            await sub.queue.get()
+            delivered.append(time.perf_counter())
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subs = [bus.subscribe() for _ in range(connections)]
+    tasks = [asyncio.ensure_future(consumer(sub, events)) for sub in subs]
+    await asyncio.sleep(0)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+
+    latencies = []
+    for i in range(events):
+        delivered.clear()
+        started = time.perf_counter()
+        bus.publish("invoices", {"op": "update", "ids": [str(i)]})
+        while len(delivered) < connections:
+            await asyncio.sleep(0)
+        latencies.append((max(delivered) - started) * 1000)
+
+    await asyncio.gather(*tasks)
+    for sub in subs:
+        bus.unsubscribe(sub)
+    bus._heartbeat.cancel()
+    return per_connection, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    per_connection, latencies = asyncio.run(run(args.connections, args.events))
+    print(f"connections={args.connections} memory_per_idle_connection={per_connection / 1024:.1f}KiB "
+          f"fanout_p50={statistics.median(latencies):.1f}ms fanout_max={max(latencies):.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_invoice_allocator.py
+"""
+Concurrency check for invoice numbering: N parallel "Confirmed" POST /api/invoices/
+against a fake PostgREST whose reserve_invoice_seq_block RPC is an atomic counter
+with fixed latency (and optional transient failures).
+
+Runs once with block_size=1 (one RPC per confirmation, the old behaviour) and once
+with the configured block size, and exits non-zero if any invoice number is issued
+twice (within or across the runs), is missing or malformed, or if a confirmation
+fails while --fail-rate is 0. Safe to run as a CI check.
+
+Usage:
+  python -m benchmarks.bench_invoice_allocator --confirmations 200 --block-size 10 --latency-ms 40
+"""
+import os
+import sys
+import json
+import time
+import random
+import re
+import asyncio
+import argparse
+from collections import Counter
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.setdefault("SESSION_SECRET", "bench-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+# IN-<location>-<DDMMYY>-<sequence>-<customer>; the sequence part must be unique
+NUMBER_RE = re.compile(r"^(IN-PUN-\d{6}-\d{3,})-")
+
+
+def auth_headers() -> dict:
+    from app.services.sessions import issue_token
+    token, _ = issue_token({"id": "bench", "username": "bench", "role": "Founding Member"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakePostgrest:
+    def __init__(self, latency: float, fail_rate: float):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.counters = {}
+        self.rpc_calls = 0
+        self.rpc_failures = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        path = request.url.path
+        if path.endswith("/rpc/reserve_invoice_seq_block"):
+            self.rpc_calls += 1
+            if random.random() < self.fail_rate:
+                self.rpc_failures += 1
+                return httpx.Response(503, json={"message": "upstream unavailable"})
+            body = json.loads(request.content)
+            key = body["p_month_year"]
+            # Single event loop: the read-modify-write below is atomic, like the UPSERT
+            self.counters[key] = self.counters.get(key, 0) + body["p_count"]
+            return httpx.Response(200, json=self.counters[key])
+        if path.endswith("/locations"):
+            return httpx.Response(200, json=[{"name": "Pune", "abbreviation": "PUN"}])
+        if path.endswith("/invoices") and request.method == "POST":
+            return httpx.Response(201, json=[json.loads(request.content)])
+        return httpx.Response(200, json=[])
+
+
+async def run(app, fake: FakePostgrest, allocator, block_size: int, confirmations: int):
+    allocator.block_size = block_size
+    allocator._blocks.clear()
+    fake.rpc_calls = fake.rpc_failures = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+        async def confirm(i: int):
+            r = await client.post("/api/invoices/", json={
+                "status": "Confirmed", "location": "Pune", "customer_name": f"Client {i}",
+            })
+            return r.status_code, (r.json()[0].get("invoice_number") if r.status_code == 200 else None)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(confirm(i) for i in range(confirmations)))
+        elapsed = time.perf_counter() - started
+
+    numbers = [n for status, n in results if status == 200]
+    failed = sum(1 for status, _ in results if status != 200)
+    duplicates = [n for n, c in Counter(sequence_part(n) for n in numbers).items() if c > 1]
+    print(f"block_size={block_size:<4} ok={len(numbers):<5} failed={failed:<4} "
+          f"duplicates={len(duplicates):<3} rpc_calls={fake.rpc_calls:<5} "
+          f"rpc_failures={fake.rpc_failures:<4} elapsed={elapsed * 1000:8.1f}ms")
+    return numbers, failed
+
+
+def sequence_part(number: str):
+    match = NUMBER_RE.match(number or "")
+    return match.group(1) if match else None
+
+
+def check(numbers: list, failed: int, expected: int, fail_rate: float) -> list:
+    """Everything that is wrong with a run's output; empty when it is correct."""
+    problems = []
+    malformed = [n for n in numbers if sequence_part(n) is None]
+    duplicates = sorted(k for k, c in Counter(map(sequence_part, numbers)).items() if k and c > 1)
+    if duplicates:
+        problems.append(f"{len(duplicates)} invoice numbers issued more than once: {duplicates[:5]}")
+    if malformed:
+        problems.append(f"{len(malformed)} malformed invoice numbers: {malformed[:5]}")
+    if not fail_rate and (failed or len(numbers) != expected):
+        problems.append(f"{failed} of {expected} confirmations failed without injected failures")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--confirmations", type=int, default=200)
+    parser.add_argument("--block-size", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of reserve RPCs that return 503")
+    args = parser.parse_args()
+
+    fake = FakePostgrest(args.latency_ms / 1000, args.fail_rate)
+    from app.services.supabase_client import use_transport
+    use_transport(httpx.MockTransport(fake))
+    from app.main import app
+    from app.services.sequence_allocator import invoice_numbers
+
+    async def both():
+        # Same month for both runs, so numbers must also be unique across them
+        single, single_failed = await run(app, fake, invoice_numbers, 1, args.confirmations)
+        blocks, blocks_failed = await run(app, fake, invoice_numbers, args.block_size, args.confirmations)
+        return single + blocks, single_failed + blocks_failed
+
+    numbers, failed = asyncio.run(both())
+    problems = check(numbers, failed, 2 * args.confirmations, args.fail_rate)
+    if problems:
+        sys.exit("FAILED: " + "; ".join(problems))
+    print(f"OK: {len(numbers)} unique invoice numbers")
+
+
+if __name__ == "__main__":
+    main()
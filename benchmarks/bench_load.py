@@ -0,0 +1,301 @@
+# benchmarks/bench_load.py
+"""
+Load test: runs the API (`uvicorn app.main:app`) against the local PostgREST
+stand-in (benchmarks/fake_postgrest.py) and drives realistic scenarios with
+--users concurrent clients for --duration seconds each:
+
+  dashboard      full invoice list, locations, then delta polls of /changes
+  rate_lookup    inquiry form: locations, then rate lookups for random plans
+  invoice_burst  confirm new inquiries (invoice numbers allocated) and edit them
+  bulk_import    NDJSON rate import of --bulk-rows rows
+  search         typeahead: /api/search per keystroke of a name or mobile
+                 (from 2 characters), half of them restricted to a location
+
+Reports throughput and latency percentiles per endpoint and upstream calls per
+scenario. --save-baseline writes the results as JSON; --baseline compares a run
+against one and exits non-zero when an endpoint's p90 latency or throughput
+regresses by more than --tolerance.
+
+Usage:
+  python -m benchmarks.bench_load --users 10 --duration 10 --latency-ms 20
+  python -m benchmarks.bench_load --save-baseline benchmarks/baseline.json
+  python -m benchmarks.bench_load --baseline benchmarks/baseline.json --tolerance 0.2
+  python -m benchmarks.bench_load --scenarios rate_lookup --fixtures fixtures.json
+  python -m benchmarks.bench_load --faults "latency=0.1:2,error=0.05:503,seed=1"
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "bench-secret"
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from benchmarks.fake_postgrest import LOCATIONS, SERVICES, PLANS, SHIFTS
+
+SCENARIOS = ("dashboard", "rate_lookup", "invoice_burst", "bulk_import", "search")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn(module_app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env},
+    )
+
+
+def wait_ready(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}   # endpoint -> [latency ms]
+        self.errors = {}
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        res = await client.request(method, url, **kwargs)
+        self.samples.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+        if res.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return res
+
+    def summary(self, elapsed: float) -> dict:
+        out = {}
+        for endpoint, values in sorted(self.samples.items()):
+            stats = {"requests": len(values), "errors": self.errors.get(endpoint, 0),
+                     "rps": round(len(values) / elapsed, 2)}
+            for pct in PERCENTILES:
+                stats[f"p{pct}_ms"] = round(percentile(values, pct), 2)
+            stats["max_ms"] = round(max(values), 2)
+            out[endpoint] = stats
+        return out
+
+
+# --- Scenarios -----------------------------------------------------------------
+# One iteration of what a user does; each worker repeats it until time is up.
+
+async def dashboard(client, rec: Recorder, rng: random.Random, args):
+    res = await rec.call(client, "GET /api/invoices/", "GET", "/api/invoices/?limit=200")
+    await rec.call(client, "GET /api/locations", "GET", "/api/locations")
+    cursor = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+    for _ in range(3):
+        res = await rec.call(client, "GET /api/invoices/changes", "GET", "/api/invoices/changes", params={"since": cursor})
+        if res.status_code == 200:
+            cursor = res.json()["cursor"]
+
+
+async def rate_lookup(client, rec: Recorder, rng: random.Random, args):
+    await rec.call(client, "GET /api/locations", "GET", "/api/locations")
+    for _ in range(5):
+        location, _, subs = rng.choice(LOCATIONS)
+        params = {"location": location, "service": rng.choice(SERVICES), "plan": rng.choice(PLANS),
+                  "shift": rng.choice(SHIFTS), "sub_location": rng.choice(subs)}
+        await rec.call(client, "GET /api/rates/lookup", "GET", "/api/rates/lookup", params=params)
+
+
+async def invoice_burst(client, rec: Recorder, rng: random.Random, args):
+    location, _, subs = rng.choice(LOCATIONS)
+    payload = {"customer_name": f"Bench {uuid.uuid4().hex[:8]}", "customer_mobile": f"9{rng.randrange(10**8, 10**9)}",
+               "location": location, "customer_location": rng.choice(subs), "status": "Confirmed",
+               "service_category": rng.choice(SERVICES), "total_amount": rng.randrange(5000, 90000, 500)}
+    res = await rec.call(client, "POST /api/invoices/", "POST", "/api/invoices/", json=payload)
+    if res.status_code < 400 and res.json():
+        invoice_id = res.json()[0]["id"]
+        await rec.call(client, "PUT /api/invoices/{invoice_id}", "PUT", f"/api/invoices/{invoice_id}",
+                       json={"status": "Active"})
+
+
+async def bulk_import(client, rec: Recorder, rng: random.Random, args):
+    # Ids come from a fixed pool, so repeated imports update rows instead of growing the table
+    lines = []
+    for i in range(args.bulk_rows):
+        location, _, subs = LOCATIONS[i % len(LOCATIONS)]
+        lines.append(json.dumps({
+            "id": str(uuid.UUID(int=i + 1)), "location": location, "sub_location": subs[i % len(subs)],
+            "service_category": SERVICES[i % len(SERVICES)], "plan_type": PLANS[i % len(PLANS)],
+            "shift_type": SHIFTS[i % len(SHIFTS)], "market_rate": rng.randrange(800, 3000, 50),
+        }))
+    await rec.call(client, "POST /api/rates/bulk", "POST", "/api/rates/bulk", content="\n".join(lines).encode(),
+                   headers={"content-type": "application/x-ndjson"})
+
+
+async def search(client, rec: Recorder, rng: random.Random, args):
+    # Synthetic customers are "Customer <n>" with 10-digit mobiles starting with 9
+    typed = rng.choice([f"Customer {rng.randrange(args.invoices)}", f"9{rng.randrange(10**8, 10**9)}"])
+    params = {"location": rng.choice(LOCATIONS)[0]} if rng.random() < 0.5 else {}
+    for end in range(2, min(len(typed), 8) + 1):
+        await rec.call(client, "GET /api/search", "GET", "/api/search", params={"q": typed[:end], **params})
+
+
+async def run_scenario(name: str, base_url: str, headers: dict, args) -> dict:
+    step = globals()[name]
+    rec = Recorder()
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(n: int):
+        rng = random.Random(args.seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            await step(client, rec, rng, args)
+
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.users)))
+        return rec.summary(time.perf_counter() - started)
+
+
+# --- Reporting -------------------------------------------------------------------
+
+def print_results(results: dict):
+    print(f"{'scenario':<14} {'endpoint':<32} {'reqs':>6} {'err':>4} {'rps':>8} "
+          + " ".join(f"{'p%d' % p:>8}" for p in PERCENTILES) + f" {'max':>8}  upstream")
+    for scenario, data in results.items():
+        upstream = sum(data["upstream"].values())
+        for endpoint, s in data["endpoints"].items():
+            print(f"{scenario:<14} {endpoint:<32} {s['requests']:>6} {s['errors']:>4} {s['rps']:>8.1f} "
+                  + " ".join(f"{s['p%d_ms' % p]:>8.1f}" for p in PERCENTILES) + f" {s['max_ms']:>8.1f}  {upstream}")
+            upstream = ""
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Prints per-endpoint deltas against the baseline; returns the regressions."""
+    regressions = []
+    print(f"\n{'scenario':<14} {'endpoint':<32} {'p50':>16} {'p90':>16} {'rps':>16}")
+    for scenario, data in results.items():
+        for endpoint, s in data["endpoints"].items():
+            base = baseline.get("results", {}).get(scenario, {}).get("endpoints", {}).get(endpoint)
+            if not base:
+                print(f"{scenario:<14} {endpoint:<32} (not in baseline)")
+                continue
+
+            def delta(key):
+                return (s[key] - base[key]) / base[key] if base[key] else 0.0
+
+            marks = []
+            if delta("p90_ms") > tolerance:
+                marks.append("p90")
+            if delta("rps") < -tolerance:
+                marks.append("rps")
+            if marks:
+                regressions.append(f"{scenario} {endpoint}: {', '.join(marks)}")
+            print(f"{scenario:<14} {endpoint:<32} "
+                  + " ".join(f"{s[k]:>8.1f} {delta(k):>+6.0%}" for k in ("p50_ms", "p90_ms", "rps"))
+                  + ("  REGRESSION" if marks else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake PostgREST latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--invoices", type=int, default=2000, help="synthetic invoice rows")
+    parser.add_argument("--bulk-rows", type=int, default=500)
+    parser.add_argument("--fixtures", help="recorded tables (see fake_postgrest.py --record)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--faults", default="", help="UPSTREAM_FAULTS for the API, e.g. latency=0.1:2,error=0.05:503")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fake_port, app_port = free_port(), free_port()
+    fake_env = {"FAKE_PG_LATENCY_MS": str(args.latency_ms), "FAKE_PG_JITTER_MS": str(args.jitter_ms),
+                "FAKE_PG_INVOICES": str(args.invoices), "FAKE_PG_SEED": str(args.seed)}
+    if args.fixtures:
+        fake_env["FAKE_PG_FIXTURES"] = os.path.abspath(args.fixtures)
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    fake = spawn("benchmarks.fake_postgrest:app", fake_port, fake_env)
+    server = None
+    try:
+        wait_ready(f"{fake_url}/__stats")
+        server = spawn("app.main:app", app_port, {
+            "SUPABASE_URL": fake_url, "SUPABASE_SERVICE_ROLE_KEY": "bench-key", "SESSION_SECRET": SECRET,
+            "UPSTREAM_FAULTS": args.faults})
+        wait_ready(f"{app_url}/api/monitoring/startup")
+
+        os.environ.update({"SUPABASE_URL": fake_url, "SUPABASE_SERVICE_ROLE_KEY": "bench-key", "SESSION_SECRET": SECRET})
+        from app.services.sessions import issue_token
+        token, _ = issue_token({"id": "bench", "username": "bench", "role": "Founding Member"})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        results = {}
+        for name in scenarios:
+            httpx.post(f"{fake_url}/__reset")
+            endpoints = asyncio.run(run_scenario(name, app_url, headers, args))
+            results[name] = {"endpoints": endpoints, "upstream": httpx.get(f"{fake_url}/__stats").json()["calls"]}
+    finally:
+        for proc in (server, fake):
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    print_results(results)
+    report = {
+        "meta": {"users": args.users, "duration": args.duration, "latency_ms": args.latency_ms,
+                 "jitter_ms": args.jitter_ms, "invoices": args.invoices, "fixtures": args.fixtures,
+                 "faults": args.faults or None,
+                 "recorded_at": datetime.now(timezone.utc).isoformat()},
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if {k: baseline["meta"].get(k) for k in ("users", "latency_ms", "jitter_ms", "invoices")} != \
+                {k: report["meta"][k] for k in ("users", "latency_ms", "jitter_ms", "invoices")}:
+            print("warning: baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions beyond tolerance:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_password_kdf.py
+"""
+Login throughput for each scrypt cost setting.
+
+For every log2(N) in --log-n it measures:
+  single: sequential verifications on one thread  -> logins/sec/core, ms/login
+  pool:   --concurrency concurrent verify_password() calls through the real
+          password pool (PASSWORD_POOL_SIZE workers) -> logins/sec overall
+
+Pick the largest N whose per-core rate still covers the morning login spike
+with headroom, then set PASSWORD_SCRYPT_LOG_N.
+
+Usage:
+  python -m benchmarks.bench_password_kdf --log-n 12 13 14 15 --seconds 2
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import passwords
+
+
+def single_core(stored: str, seconds: float):
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        ok, _ = passwords.verify_password_sync("correct horse", stored)
+        assert ok
+        count += 1
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000
+
+
+async def pooled(stored: str, total: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            ok, _ = await passwords.verify_password("correct horse", stored)
+            assert ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-n", type=int, nargs="+", default=[12, 13, 14, 15])
+    parser.add_argument("--r", type=int, default=passwords.SCRYPT_R)
+    parser.add_argument("--p", type=int, default=passwords.SCRYPT_P)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"pool workers={passwords.POOL_SIZE} cpus={os.cpu_count()}")
+    for log_n in args.log_n:
+        stored = passwords.hash_password_sync("correct horse", log_n, args.r, args.p)
+        per_core, ms = single_core(stored, args.seconds)
+        total = max(passwords.POOL_SIZE * 4, int(per_core * passwords.POOL_SIZE * args.seconds))
+        pool_rate = asyncio.run(pooled(stored, total, args.concurrency))
+        mem = 128 * args.r * (1 << log_n) / (1024 * 1024)
+        print(f"log_n={log_n:<3} r={args.r} p={args.p} mem={mem:6.1f}MiB "
+              f"ms/login={ms:7.1f} logins/s/core={per_core:7.1f} logins/s(pool)={pool_rate:7.1f}")
+
+    legacy = "03ac674216f3e15c761ee1a5e255f067953623c8b388b4459e13f978d7c846f4"
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < 0.5:
+        passwords.verify_password_sync("1234", legacy)
+        count += 1
+    print(f"legacy sha256 logins/s/core={count / (time.perf_counter() - started):,.0f} (unsalted, rehashed on login)")
+
+
+if __name__ == "__main__":
+    main()
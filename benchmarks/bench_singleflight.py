@@ -0,0 +1,84 @@
+# benchmarks/bench_singleflight.py
+"""
+Morning admin-hub burst: --users concurrent clients each load /api/employees/ and
+/api/invoices/ from several panels at once, against a fake PostgREST with fixed
+latency. Runs with single-flight off and on and reports upstream calls, the
+coalescing ratio and request latency.
+
+Usage:
+  python -m benchmarks.bench_singleflight --users 20 --panels 3 --latency-ms 80
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.setdefault("SESSION_SECRET", "bench-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+ROWS = [{"id": str(i), "name": f"Row {i}", "created_at": "2026-01-01T00:00:00Z"} for i in range(300)]
+
+
+def auth_headers() -> dict:
+    from app.services.sessions import issue_token
+    token, _ = issue_token({"id": "bench", "username": "bench", "role": "Founding Member"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakePostgrest:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, json=ROWS)
+
+
+async def burst(app, users: int, panels: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth_headers()) as client:
+        async def load(path: str):
+            started = time.perf_counter()
+            r = await client.get(path)
+            assert r.status_code == 200, r.text
+            return (time.perf_counter() - started) * 1000
+
+        paths = ["/api/employees/", "/api/invoices/"] * panels
+        return await asyncio.gather(*(load(p) for _ in range(users) for p in paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--panels", type=int, default=3, help="identical loads per endpoint per user")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    fake = FakePostgrest(args.latency_ms / 1000)
+    from app.services import supabase_client
+    supabase_client.use_transport(httpx.MockTransport(fake))
+    from app.main import app
+
+    for enabled in (False, True):
+        supabase_client.SINGLE_FLIGHT = enabled
+        before = supabase_client.reads.stats()
+        fake.calls = 0
+        latencies = asyncio.run(burst(app, args.users, args.panels))
+        after = supabase_client.reads.stats()
+        coalesced = after["coalesced_calls"] - before["coalesced_calls"]
+        requests = len(latencies)
+        print(f"single_flight={'on ' if enabled else 'off'} requests={requests:<5} upstream_calls={fake.calls:<5} "
+              f"coalescing_ratio={coalesced / requests:.2f} p50={statistics.median(latencies):7.1f}ms "
+              f"max={max(latencies):7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/check_documents.py
+"""
+Correctness check for versioned document storage against the local PostgREST
+stand-in and a temporary DOCUMENT_STORE=local directory: re-saving identical
+bytes changes nothing, new content becomes the next version, every version
+downloads byte-for-byte, identical content under two names is stored once,
+concurrent saves of one name get distinct versions, the size limit holds, and
+large Supabase Storage uploads go out as 6 MB TUS chunks at the right
+offsets. Exits non-zero with the failed assertion.
+
+Usage:
+  python -m benchmarks.check_documents
+"""
+import os
+import sys
+import asyncio
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+
+STORE_DIR = tempfile.mkdtemp(prefix="vesak-documents-")
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.update(AUTH_REQUIRED="0", AUDIT_LOG="0", DOCUMENT_STORE="local", DOCUMENT_STORE_DIR=STORE_DIR,
+                  DOCUMENT_MAX_UPLOAD_MB="1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+def blob_count() -> int:
+    return sum(1 for p in Path(STORE_DIR).rglob("*") if p.is_file() and not p.name.endswith(".part"))
+
+
+async def upload(client, name: str, content: bytes, **params):
+    r = await client.post("/api/documents/upload", params={"name": name, **params}, content=content,
+                          headers={"Content-Type": "application/pdf"})
+    assert r.status_code == 200, f"upload of {name} failed: {r.status_code} {r.text}"
+    return r.json()
+
+
+async def check_versions(client):
+    first, second = os.urandom(200_000), os.urandom(150_000)
+    v1 = await upload(client, "official/check.pdf", first)
+    assert v1["changed"] and v1["data"]["metadata"]["current_version"] == 1
+    document = v1["data"]["id"]
+
+    blobs = blob_count()
+    same = await upload(client, "official/check.pdf", first)
+    assert not same["changed"], "identical bytes stored as a new version"
+    assert same["data"]["metadata"]["current_version"] == 1 and blob_count() == blobs
+
+    v2 = await upload(client, "official/check.pdf", second)
+    assert v2["changed"] and v2["data"]["id"] == document and v2["data"]["metadata"]["current_version"] == 2
+
+    history = (await client.get(f"/api/documents/{document}/versions")).json()["data"]
+    assert [v["version"] for v in history] == [2, 1], f"unexpected history {history}"
+
+    for version, content in ((1, first), (None, second)):
+        params = {"version": version} if version else {}
+        r = await client.get(f"/api/documents/{document}/file", params=params)
+        assert r.status_code == 200 and r.content == content, f"version {version or 'latest'} does not round-trip"
+        assert r.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    r = await client.get(f"/api/documents/{document}/file", params={"version": 9})
+    assert r.status_code == 404, "missing version did not 404"
+
+
+async def check_deduplication(client):
+    content = os.urandom(50_000)
+    blobs = blob_count()
+    await upload(client, "official/one.pdf", content)
+    await upload(client, "official/two.pdf", content)
+    assert blob_count() == blobs + 1, "identical content under two names stored twice"
+
+
+async def check_concurrent_saves(client):
+    results = await asyncio.gather(*(upload(client, "official/race.pdf", bytes([i]) * 1000) for i in range(8)))
+    versions = sorted(r["data"]["metadata"]["current_version"] for r in results)
+    assert versions == list(range(1, 9)), f"concurrent saves lost or repeated versions: {versions}"
+    assert len({r["data"]["id"] for r in results}) == 1, "concurrent saves created more than one document"
+
+
+async def check_limits(client):
+    r = await client.post("/api/documents/upload", params={"name": "official/big.pdf"}, content=b"x" * (1024 * 1024 + 1))
+    assert r.status_code == 413, f"oversized upload answered {r.status_code}"
+    r = await client.post("/api/documents/upload", params={"name": "official/empty.pdf"}, content=b"")
+    assert r.status_code == 400, f"empty upload answered {r.status_code}"
+
+
+async def check_resumable_chunks():
+    from app.services import supabase_client, document_store
+
+    calls = []
+
+    def storage(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.headers.get("upload-offset"), len(request.content)))
+        if request.method == "HEAD":
+            return httpx.Response(404)
+        if request.url.path.endswith("/upload/resumable"):
+            return httpx.Response(201, headers={"Location": f"{supabase_client.SUPABASE_URL}/storage/v1/upload/resumable/x"})
+        return httpx.Response(204 if request.method == "PATCH" else 200)
+
+    supabase_client.use_transport(httpx.MockTransport(storage))
+    store = document_store.SupabaseStore("documents")
+    size = 2 * document_store.CHUNK_SIZE + 123
+    large = document_store.Upload(limit=size)
+    large.write(os.urandom(size))
+    try:
+        await store.put("blobs/xx/large.pdf", large, "application/pdf")
+    finally:
+        large.close()
+    patches = [(offset, length) for method, offset, length in calls if method == "PATCH"]
+    chunk = document_store.CHUNK_SIZE
+    assert patches == [("0", chunk), (str(chunk), chunk), (str(2 * chunk), 123)], f"unexpected TUS chunks {patches}"
+
+
+async def run():
+    from benchmarks import fake_postgrest as fp
+    from app.services import supabase_client
+
+    fp.LATENCY = 0
+    supabase_client.use_transport(httpx.ASGITransport(app=fp.FakePostgrest(fp.synthetic_tables(5, 1))))
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        for check in (check_versions, check_deduplication, check_concurrent_saves, check_limits):
+            await check(client)
+            print(f"ok  {check.__name__}")
+    await check_resumable_chunks()
+    print("ok  check_resumable_chunks")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except AssertionError as e:
+        sys.exit(f"FAILED: {e}")
+    finally:
+        shutil.rmtree(STORE_DIR, ignore_errors=True)
@@ -0,0 +1,116 @@
+# benchmarks/check_events.py
+"""
+Correctness check for the /api/events bus (no server needed): topic filtering,
+in-order delivery, the single `resync` that replaces a slow subscriber's
+backlog, Last-Event-ID replay and its gap / restart detection, and that an
+invoice write through the API publishes a notification. Exits non-zero with
+the failed assertion.
+
+Usage:
+  python -m benchmarks.check_events
+"""
+import os
+import sys
+import json
+import asyncio
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.setdefault("AUTH_REQUIRED", "0")
+os.environ.setdefault("AUDIT_LOG", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+def drain(sub) -> list:
+    frames = []
+    while not sub.queue.empty():
+        frames.append(sub.queue.get_nowait())
+    return frames
+
+
+def event_ids(frames: list) -> list:
+    return [f.split(b"\n", 1)[0][4:].decode() for f in frames if f.startswith(b"id: ")]
+
+
+async def check_filtering_and_order():
+    from app.services.events import EventBus
+
+    bus = EventBus()
+    rates, everything = bus.subscribe(["rates"]), bus.subscribe()
+    published = [bus.publish(topic, {"n": n}) for n, topic in enumerate(["rates", "invoices", "rates", "locations"])]
+    assert event_ids(drain(rates)) == [published[0].id, published[2].id], "rates subscriber got other topics"
+    assert event_ids(drain(everything)) == [e.id for e in published], "events lost or out of order"
+    try:
+        bus.publish("nope")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown topic accepted")
+
+
+async def check_overflow_resync():
+    from app.services.events import EventBus, QUEUE_SIZE, RESYNC_FRAME
+
+    bus = EventBus()
+    slow = bus.subscribe()
+    for n in range(QUEUE_SIZE + 5):
+        bus.publish("invoices", {"n": n})
+    frames = drain(slow)
+    assert RESYNC_FRAME in frames, "full queue did not produce a resync"
+    assert frames.count(RESYNC_FRAME) == 1, "more than one resync queued"
+    assert len(frames) <= QUEUE_SIZE, "queue grew past its bound"
+
+
+async def check_replay():
+    from app.services.events import EventBus, HISTORY, RESYNC_FRAME
+
+    bus = EventBus()
+    first = bus.publish("invoices", {})
+    missed = [bus.publish(topic, {}) for topic in ("rates", "invoices", "locations")]
+    again = bus.subscribe(["invoices", "rates"], last_event_id=first.id)
+    assert event_ids(drain(again)) == [e.id for e in missed if e.topic != "locations"], "replay missed or repeated events"
+
+    assert drain(bus.subscribe(last_event_id=f"{bus.boot - 1}-1")) == [RESYNC_FRAME], "id from a previous boot not resynced"
+    for _ in range(HISTORY + 1):
+        bus.publish("rates", {})
+    assert drain(bus.subscribe(last_event_id=first.id)) == [RESYNC_FRAME], "gap beyond history not resynced"
+
+
+async def check_write_publishes():
+    from benchmarks import fake_postgrest as fp
+    from app.services import supabase_client
+    from app.services.events import event_bus
+
+    fp.LATENCY = 0
+    supabase_client.use_transport(httpx.ASGITransport(app=fp.FakePostgrest(fp.synthetic_tables(5, 1))))
+    from app.main import app
+
+    sub = event_bus.subscribe(["invoices"])
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+            r = await client.post("/api/invoices/", json={"customer_name": "Check", "status": "Pending", "location": "Pune"})
+            assert r.status_code == 200, f"invoice create failed: {r.status_code} {r.text}"
+            created = r.json()[0]["id"]
+        frames = drain(sub)
+        payloads = [json.loads(f.rsplit(b"data: ", 1)[1]) for f in frames if b"event: invoices" in f]
+        assert any(created in p.get("ids", []) for p in payloads), f"no invoices event for {created}: {frames}"
+    finally:
+        event_bus.unsubscribe(sub)
+
+
+CHECKS = [check_filtering_and_order, check_overflow_resync, check_replay, check_write_publishes]
+
+
+async def run():
+    for check in CHECKS:
+        await check()
+        print(f"ok  {check.__name__}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except AssertionError as e:
+        sys.exit(f"FAILED: {e}")
@@ -0,0 +1,140 @@
+# benchmarks/check_resilience.py
+"""
+Correctness check for upstream failure handling (app/services/resilience.py)
+against the local PostgREST stand-in: reads are retried and writes are not,
+the circuit opens after the threshold and then fails fast with 503 +
+Retry-After, reference data is served stale while it is open, a slow upstream
+is cut off at the deadline, the breaker closes again after the cool-down, an
+Idempotency-Key is not burnt by an outage, and a failed rate lookup is an
+error rather than {}. Exits non-zero with the failed assertion.
+
+Usage:
+  python -m benchmarks.check_resilience
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-key")
+os.environ.update(AUTH_REQUIRED="0", AUDIT_LOG="0", UPSTREAM_READ_DEADLINE="1", UPSTREAM_RETRIES="2",
+                  UPSTREAM_BREAKER_THRESHOLD="5", UPSTREAM_BREAKER_COOLDOWN="0.5", REFERENCE_CACHE_TTL="0.2")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+INVOICES = "/api/invoices/"
+
+
+class Upstream(httpx.AsyncBaseTransport):
+    """The stand-in behind a switch: while `down`, every request gets PostgREST's 503."""
+
+    def __init__(self, app):
+        self.inner = httpx.ASGITransport(app=app)
+        self.down = False
+        self.requests = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.method)
+        if self.down:
+            body = json.dumps({"code": "PGRST000", "message": "database unavailable", "details": None, "hint": None})
+            return httpx.Response(503, content=body.encode(), headers={"content-type": "application/json"})
+        return await self.inner.handle_async_request(request)
+
+    def sent(self, method: str) -> int:
+        return self.requests.count(method)
+
+
+async def check_lookup_is_not_empty(client, upstream, resilience):
+    upstream.down = True
+    r = await client.get("/api/rates/lookup", params={"location": "Pune", "service": "x", "plan": "y", "shift": "z"})
+    assert r.status_code == 503, f"failed rate lookup answered {r.status_code} {r.text}"
+    upstream.down = False
+    resilience.breaker.success()
+
+
+async def check_read_retries(client, upstream, resilience):
+    upstream.down, upstream.requests = True, []
+    r = await client.get(INVOICES, params={"limit": 5})
+    assert r.status_code == 503 and r.headers.get("retry-after"), f"down read answered {r.status_code}"
+    assert upstream.sent("GET") == resilience.RETRIES + 1, f"read sent {upstream.sent('GET')} times"
+    upstream.down = False
+    resilience.breaker.success()
+
+
+async def check_write_not_retried(client, upstream, resilience):
+    upstream.down, upstream.requests = True, []
+    r = await client.post("/api/documents/", json={"title": "x", "doc_type": "letter"})
+    assert r.status_code == 503, f"down write answered {r.status_code} {r.text}"
+    assert upstream.sent("POST") == 1, f"write sent {upstream.sent('POST')} times"
+    upstream.down = False
+    resilience.breaker.success()
+
+
+async def check_breaker_and_stale_reference(client, upstream, resilience):
+    fresh = await client.get("/api/locations")
+    assert fresh.status_code == 200
+    await asyncio.sleep(0.3)   # past REFERENCE_CACHE_TTL
+    upstream.down = True
+    while resilience.breaker.state != "open":
+        await client.get(INVOICES, params={"limit": 5})
+    upstream.requests = []
+    started = time.perf_counter()
+    r = await client.get(INVOICES, params={"limit": 5})
+    assert r.status_code == 503 and r.headers.get("retry-after"), f"open circuit answered {r.status_code}"
+    assert time.perf_counter() - started < 0.1 and not upstream.requests, "open circuit still called the upstream"
+    stale = await client.get("/api/locations")
+    assert stale.status_code == 200 and stale.json() == fresh.json(), "reference data not served stale"
+
+
+async def check_idempotency_key_survives_outage(client, upstream, resilience):
+    body, headers = {"customer_name": "Check", "status": "Pending", "location": "Pune"}, {"Idempotency-Key": "outage"}
+    r = await client.post(INVOICES, json=body, headers=headers)
+    assert r.status_code == 503, f"write during outage answered {r.status_code}"
+    upstream.down = False
+    await asyncio.sleep(resilience.BREAKER_COOLDOWN + 0.1)
+    r = await client.post(INVOICES, json=body, headers=headers)
+    assert r.status_code == 200 and not r.headers.get("idempotent-replayed"), "outage response was replayed"
+    assert resilience.breaker.state == "closed", "breaker did not close after recovery"
+
+
+async def check_deadline(client, upstream, resilience):
+    resilience.set_faults("latency=1:3")
+    try:
+        started = time.perf_counter()
+        r = await client.get(INVOICES, params={"limit": 5})
+        elapsed = time.perf_counter() - started
+    finally:
+        resilience.set_faults("")
+    assert r.status_code == 503 and elapsed < resilience.READ_DEADLINE + 0.5, \
+        f"slow read answered {r.status_code} after {elapsed:.2f}s"
+    await asyncio.sleep(resilience.BREAKER_COOLDOWN + 0.1)
+    resilience.breaker.success()
+
+
+CHECKS = [check_lookup_is_not_empty, check_read_retries, check_write_not_retried,
+          check_breaker_and_stale_reference, check_idempotency_key_survives_outage, check_deadline]
+
+
+async def run():
+    from benchmarks import fake_postgrest as fp
+    from app.services import supabase_client, resilience
+
+    fp.LATENCY = 0
+    upstream = Upstream(fp.FakePostgrest(fp.synthetic_tables(5, 1)))
+    supabase_client.use_transport(upstream)
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        for check in CHECKS:
+            await check(client, upstream, resilience)
+            print(f"ok  {check.__name__}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except AssertionError as e:
+        sys.exit(f"FAILED: {e}")
@@ -0,0 +1,502 @@
+# benchmarks/fake_postgrest.py
+"""
+Local PostgREST stand-in: an in-memory ASGI app that answers the subset of the
+PostgREST API this backend uses (filtered / ordered / paged selects, or=() and
+and() filters, insert / upsert / update / delete with Prefer headers, single()
+objects, count=exact and the RPCs from the migrations), with a configurable
+per-request latency so benchmarks see realistic round-trip times.
+
+Tables start from synthetic data, or from a recording of a real project
+(--record), so the app can be run and measured without Supabase:
+
+  FAKE_PG_LATENCY_MS=20 uvicorn benchmarks.fake_postgrest:app --port 54321
+  SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=x uvicorn app.main:app
+
+Environment:
+  FAKE_PG_LATENCY_MS   fixed latency per request (default 20)
+  FAKE_PG_JITTER_MS    extra uniform random latency (default 0)
+  FAKE_PG_FIXTURES     JSON file {table: [rows]} to load instead of synthetic data
+  FAKE_PG_INVOICES     synthetic invoice count (default 2000)
+  FAKE_PG_SEED         random seed for the synthetic data (default 7)
+
+Recording (reads every table listed from the project in SUPABASE_URL):
+  python -m benchmarks.fake_postgrest --record fixtures.json --tables invoices,service_rates,locations
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import random
+import asyncio
+import argparse
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl
+
+LATENCY = float(os.getenv("FAKE_PG_LATENCY_MS", "20")) / 1000
+JITTER = float(os.getenv("FAKE_PG_JITTER_MS", "0")) / 1000
+
+LOCATIONS = [
+    ("Pune", "PUN", ["Baner", "Kothrud", "Hadapsar", "Wakad"]),
+    ("Mumbai", "MUM", ["Andheri", "Bandra", "Powai"]),
+    ("Kolhapur", "KOP", ["Rajarampuri", "Shahupuri"]),
+]
+SERVICES = ["Patient Attendant Care", "Skilled Nursing", "Elderly Companion", "Maternal & Newborn"]
+PLANS = ["Daily", "Weekly", "Monthly"]
+SHIFTS = ["12 Hours (Day)", "12 Hours (Night)", "24 Hours"]
+STATUSES = ["Follow-up", "Confirmed", "Active", "Payment Pending", "Completed", "Not Interested"]
+
+# Tables whose updated_at a trigger bumps on UPDATE in the real schema
+TIMESTAMPED = {"invoices", "employees", "employee_leaves", "service_rates", "expenses", "clients"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def synthetic_tables(invoices: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    locations = [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128))), "name": name, "abbreviation": abbr,
+         "sub_locations": subs, "is_active": True, "created_at": (now - timedelta(days=400)).isoformat()}
+        for name, abbr, subs in LOCATIONS
+    ]
+    rates = []
+    for name, _, _ in LOCATIONS:
+        for service in SERVICES:
+            for plan in PLANS:
+                for shift in SHIFTS:
+                    market = rng.randrange(800, 3000, 50)
+                    rates.append({
+                        "id": str(uuid.UUID(int=rng.getrandbits(128))), "location": name, "sub_location": None,
+                        "service_category": service, "plan_type": plan, "shift_type": shift,
+                        "sub_service": None, "recurring_service": "No", "period": "Per Day",
+                        "market_rate": market, "min_rate": round(market * 1.08, 2), "max_rate": round(market * 1.15, 2),
+                        "created_at": (now - timedelta(days=200)).isoformat(),
+                        "updated_at": (now - timedelta(days=rng.randint(1, 200))).isoformat(),
+                    })
+    rows = []
+    for i in range(invoices):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))
+        name, _, subs = rng.choice(LOCATIONS)
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "customer_name": f"Customer {i}", "customer_mobile": f"9{rng.randrange(10**8, 10**9)}",
+            "location": name, "customer_location": rng.choice(subs),
+            "status": rng.choice(STATUSES), "service_category": rng.choice(SERVICES),
+            "plan_type": rng.choice(PLANS), "shift_type": rng.choice(SHIFTS),
+            "total_amount": rng.randrange(5000, 90000, 500), "invoice_number": None,
+            "data": {"notes": "x" * rng.randint(50, 400)},
+            "created_at": created.isoformat(),
+            "updated_at": (created + timedelta(minutes=rng.randint(0, 600))).isoformat(),
+        })
+    return {"locations": locations, "service_rates": rates, "invoices": rows}
+
+
+# --- Filters ------------------------------------------------------------------
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+
+@lru_cache(maxsize=200_000)
+def _coerce(value):
+    """Comparable form of a stored or filter value: datetimes and numbers by value."""
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    text = str(value)
+    if _DATE_RE.match(text):
+        iso = text.replace(" ", "T").replace("Z", "+00:00")
+        iso = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), iso, count=1)
+        try:
+            parsed = datetime.fromisoformat(iso)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return text
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _split_top(text: str) -> list:
+    """Splits on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current, i = [], 0, False, "", 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and quoted and i + 1 < len(text):
+            current += text[i:i + 2]
+            i += 2
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(current)
+            current = ""
+            i += 1
+            continue
+        current += ch
+        i += 1
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _like(pattern: str, case: bool):
+    regex = "^" + ".*".join(re.escape(p) for p in pattern.replace("%", "*").split("*")) + "$"
+    return re.compile(regex, 0 if case else re.IGNORECASE)
+
+
+def _compare(column: str, op: str, raw: str):
+    negate = op.startswith("not.")
+    if negate:
+        op = op[4:]
+    if op == "in":
+        wanted = {_unquote(v) for v in _split_top(raw.strip("()"))}
+        test = lambda v: v is not None and str(v) in wanted
+    elif op == "is":
+        target = {"null": None, "true": True, "false": False}.get(raw.lower(), raw)
+        test = lambda v: v is target or v == target
+    elif op in ("like", "ilike"):
+        regex = _like(_unquote(raw), op == "like")
+        test = lambda v: v is not None and bool(regex.match(str(v)))
+    elif op == "cs":
+        wanted = json.loads(raw) if raw.startswith("[") else [x for x in raw.strip("{}").split(",") if x]
+        test = lambda v: isinstance(v, list) and all(w in v for w in wanted)
+    else:
+        value = _coerce(_unquote(raw))
+        ops = {
+            "eq": lambda a: a == value, "neq": lambda a: a != value,
+            "gt": lambda a: a > value, "gte": lambda a: a >= value,
+            "lt": lambda a: a < value, "lte": lambda a: a <= value,
+        }
+        if op not in ops:
+            raise ValueError(f"unsupported operator {op}")
+        check = ops[op]
+
+        def test(v):
+            if v is None:
+                return False
+            a = _coerce(v) if not isinstance(v, (dict, list, bool)) else v
+            try:
+                return check(a)
+            except TypeError:
+                return check(str(a)) if op in ("eq", "neq") else False
+    get = _getter(column)
+    return (lambda row: not test(get(row))) if negate else (lambda row: test(get(row)))
+
+
+def _getter(column: str):
+    """Plain columns, or JSON paths such as metadata->>name / metadata->doc->>kind."""
+    if "->" not in column:
+        return lambda row: row.get(column)
+    parts = re.split(r"->>?", column)
+
+    def get(row):
+        value = row.get(parts[0])
+        for key in parts[1:]:
+            value = value.get(key) if isinstance(value, dict) else None
+        if column.split("->")[-1].startswith(">") and isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+    return get
+
+
+def _logic(expr: str):
+    """`col.op.value`, `and(...)` or `or(...)` inside a logic filter."""
+    for kind in ("and", "or"):
+        if expr.startswith(kind + "("):
+            subs = [_logic(part) for part in _split_top(expr[len(kind) + 1:-1])]
+            combine = all if kind == "and" else any
+            return lambda row: combine(f(row) for f in subs)
+    column, op, raw = expr.split(".", 2)
+    if op == "not":
+        op2, _, raw = raw.partition(".")
+        return _compare(column, "not." + op2, raw)
+    return _compare(column, op, raw)
+
+
+def parse_filters(params: list) -> list:
+    predicates = []
+    for key, value in params:
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        if key in ("or", "and"):
+            predicates.append(_logic(f"{key}{value}"))
+        else:
+            op, _, raw = value.partition(".")
+            if op == "not":
+                op2, _, raw = raw.partition(".")
+                op = "not." + op2
+            predicates.append(_compare(key, op, raw))
+    return predicates
+
+
+def _sort(rows: list, order: str) -> list:
+    for term in reversed([t for t in order.split(",") if t]):
+        parts = term.split(".")
+        column, desc = parts[0], "desc" in parts[1:]
+        nulls_first = "nullsfirst" in parts[1:] or ("nullslast" not in parts[1:] and desc)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: _sort_key(r[column]), reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _sort_key(value):
+    coerced = _coerce(value) if isinstance(value, (str, int, float)) else str(value)
+    if isinstance(coerced, datetime):
+        return (2, coerced)
+    if isinstance(coerced, (int, float)):
+        return (0, coerced)
+    return (1, str(coerced))
+
+
+def _project(rows: list, select: str) -> list:
+    if not select or select == "*":
+        return rows
+    columns = [c.strip().split(":")[0].split("::")[0] for c in _split_top(select) if "(" not in c]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+# --- The fake -----------------------------------------------------------------
+
+class FakePostgrest:
+    def __init__(self, tables: dict):
+        self.tables = {name: list(rows) for name, rows in tables.items()}
+        self.sequences = {}
+        self.calls = {}
+
+    def _count(self, target: str):
+        self.calls[target] = self.calls.get(target, 0) + 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        path = scope["path"]
+
+        if path == "/__stats":
+            return await self._send(send, 200, {"calls": self.calls, "rows": {t: len(r) for t, r in self.tables.items()}})
+        if path == "/__reset":
+            self.calls = {}
+            return await self._send(send, 200, {})
+
+        await asyncio.sleep(LATENCY + (random.uniform(0, JITTER) if JITTER else 0))
+        try:
+            status, payload, extra = self.handle(scope["method"], path, scope["query_string"].decode(), headers, body)
+        except (ValueError, KeyError) as e:
+            status, payload, extra = 400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None}, {}
+        await self._send(send, status, payload, extra)
+
+    async def _send(self, send, status: int, payload, extra: dict = None):
+        body = b"" if payload is None else json.dumps(payload, default=str).encode()
+        headers = [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(body)).encode())]
+        headers += [(k.encode(), v.encode()) for k, v in (extra or {}).items()]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def handle(self, method: str, path: str, query: str, headers: dict, body: bytes):
+        parts = path.split("/rest/v1/", 1)[-1].strip("/").split("/")
+        params = parse_qsl(query, keep_blank_values=True)
+        prefer = headers.get("prefer", "")
+        if parts[0] == "rpc":
+            self._count(f"rpc:{parts[1]}")
+            return 200, self.rpc(parts[1], json.loads(body or b"{}")), {}
+
+        table = parts[0]
+        self._count(table)
+        rows = self.tables.setdefault(table, [])
+        predicates = parse_filters(params)
+        matched = [r for r in rows if all(p(r) for p in predicates)]
+        args = dict(params)
+        representation = "return=representation" in prefer
+
+        if method in ("GET", "HEAD"):
+            total = len(matched)
+            if args.get("order"):
+                matched = _sort(matched, ",".join(v for k, v in params if k == "order"))
+            offset = int(args.get("offset", 0))
+            limit = int(args["limit"]) if "limit" in args else None
+            matched = matched[offset:offset + limit if limit is not None else None]
+            result = _project(matched, args.get("select", "*"))
+            extra = {}
+            if "count=" in prefer:
+                end = offset + len(result) - 1
+                extra["content-range"] = f"{offset}-{end}/{total}" if result else f"*/{total}"
+            if "vnd.pgrst.object" in headers.get("accept", ""):
+                if len(result) != 1:
+                    return 406, {"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned",
+                                 "details": f"The result contains {len(result)} rows", "hint": None}, {}
+                result = result[0]
+            return 200, None if method == "HEAD" else result, extra
+
+        if method == "POST":
+            payload = json.loads(body or b"[]")
+            records = payload if isinstance(payload, list) else [payload]
+            keys = [k for k in args.get("on_conflict", "id").split(",") if k]
+            merge = "resolution=merge-duplicates" in prefer
+            ignore = "resolution=ignore-duplicates" in prefer
+            written = []
+            index = {tuple(str(r.get(k)) for k in keys): r for r in rows} if merge or ignore else {}
+            for record in records:
+                existing = index.get(tuple(str(record.get(k)) for k in keys)) if merge or ignore else None
+                if existing is not None and ignore:
+                    continue
+                if existing is not None:
+                    existing.update(record)
+                    if table in TIMESTAMPED:
+                        existing["updated_at"] = _now()
+                    written.append(existing)
+                    continue
+                row = {"id": str(uuid.uuid4()), "created_at": _now(), **record}
+                if table in TIMESTAMPED:
+                    row.setdefault("updated_at", row["created_at"])
+                rows.append(row)
+                if merge or ignore:
+                    index[tuple(str(row.get(k)) for k in keys)] = row
+                written.append(row)
+            return 201, (_project(written, args.get("select", "*")) if representation else None), {}
+
+        if method == "PATCH":
+            changes = json.loads(body or b"{}")
+            for row in matched:
+                row.update(changes)
+                if table in TIMESTAMPED:
+                    row["updated_at"] = _now()
+            return 200, (matched if representation else None), {}
+
+        if method == "DELETE":
+            doomed = {id(r) for r in matched}
+            self.tables[table] = [r for r in rows if id(r) not in doomed]
+            return 200, (matched if representation else None), {}
+
+        return 405, {"message": f"{method} not supported"}, {}
+
+    # RPCs from the migrations, reduced to what the API relies on
+    def rpc(self, name: str, args: dict):
+        if name == "reserve_invoice_seq_block":
+            key = ("invoice", args["p_month_year"])
+        elif name == "reserve_sequence_block":
+            key = (args["p_location"], args["p_month_year"])
+        elif name == "resolve_service_rate":
+            candidates = [r for r in self.tables.get("service_rates", [])
+                          if r.get("location") == args["p_location"] and r.get("service_category") == args["p_service"]]
+            exact = [r for r in candidates if r.get("plan_type") == args["p_plan"] and r.get("shift_type") == args["p_shift"]]
+            sub = [r for r in exact if args.get("p_sub_location") and r.get("sub_location") == args["p_sub_location"]]
+            return (sub or [r for r in exact if not r.get("sub_location")] or exact or candidates or [None])[0]
+        elif name == "edit_sub_locations":
+            by_id = {str(r["id"]): r for r in self.tables.get("locations", [])}
+            for change in args["p_changes"]:
+                row = by_id.get(str(change["location_id"]))
+                if row is None:
+                    continue
+                subs = list(row.get("sub_locations") or [])
+                if change["op"] == "add" and change["name"] not in subs:
+                    subs.append(change["name"])
+                elif change["op"] == "remove":
+                    subs = [s for s in subs if s != change["name"]]
+                row["sub_locations"] = subs
+            return [by_id[i] for i in {str(c["location_id"]) for c in args["p_changes"]} if i in by_id]
+        elif name == "search_directory":
+            return self.search_directory(args)
+        elif name == "financial_summary":
+            return {}
+        else:
+            raise KeyError(f"function {name} is not faked")
+        self.sequences[key] = self.sequences.get(key, 0) + int(args["p_count"])
+        return self.sequences[key]
+
+    def search_directory(self, args: dict) -> list:
+        # Customers only (from invoices), with phase35's rules: prefixes below
+        # 3 characters, substrings from 3, p_location covering its sub-locations
+        q = (args.get("p_query") or "").strip().lower()
+        if len(q) < 2 or "customer" not in (args.get("p_kinds") or ["customer"]):
+            return []
+        places = None
+        if args.get("p_location"):
+            places = {args["p_location"]}
+            for row in self.tables.get("locations", []):
+                if row.get("name") == args["p_location"]:
+                    places.update(row.get("sub_locations") or [])
+        found = {}
+        for row in self.tables.get("invoices", []):
+            name, mobile = str(row.get("customer_name") or ""), str(row.get("customer_mobile") or "")
+            if places is not None and row.get("customer_location") not in places:
+                continue
+            if len(q) < 3:
+                hit = name.lower().startswith(q) or mobile.startswith(q)
+            else:
+                hit = q in name.lower() or q in mobile
+            if hit:
+                score = 1.0 if q in (name.lower(), mobile) else 0.9 if name.lower().startswith(q) or mobile.startswith(q) else 0.5
+                found.setdefault(mobile, {"kind": "customer", "id": str(row.get("id")), "name": name, "mobile": mobile,
+                                          "location": row.get("customer_location"), "sub_location": None, "score": score})
+        ranked = sorted(found.values(), key=lambda r: (-r["score"], r["name"]))
+        return ranked[:max(1, min(int(args.get("p_limit") or 10), 50))]
+
+
+def load_tables() -> dict:
+    fixtures = os.getenv("FAKE_PG_FIXTURES")
+    if fixtures:
+        with open(fixtures) as f:
+            return json.load(f)
+    return synthetic_tables(int(os.getenv("FAKE_PG_INVOICES", "2000")), int(os.getenv("FAKE_PG_SEED", "7")))
+
+
+def record(path: str, tables: list, page_size: int = 1000):
+    """Copies `tables` from the live project (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY) into a fixtures file."""
+    import httpx
+    from dotenv import load_dotenv
+    load_dotenv()
+    url, key = os.environ["SUPABASE_URL"].rstrip("/"), os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+    out = {}
+    with httpx.Client(base_url=f"{url}/rest/v1", headers={"apikey": key, "Authorization": f"Bearer {key}"}, timeout=60) as client:
+        for table in tables:
+            rows, offset = [], 0
+            while True:
+                res = client.get(f"/{table}", params={"select": "*", "order": "id", "limit": page_size, "offset": offset})
+                res.raise_for_status()
+                page = res.json()
+                rows.extend(page)
+                offset += len(page)
+                if len(page) < page_size:
+                    break
+            out[table] = rows
+            print(f"{table}: {len(rows)} rows", file=sys.stderr)
+    with open(path, "w") as f:
+        json.dump(out, f, default=str)
+
+
+app = FakePostgrest(load_tables())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", metavar="PATH", required=True, help="write a fixtures file from the live project")
+    parser.add_argument("--tables", default="invoices,service_rates,locations,employees,employee_leaves")
+    args = parser.parse_args()
+    record(args.record, [t.strip() for t in args.tables.split(",") if t.strip()])
@@ -0,0 +1,19 @@
+-- Phase 23: Indexes for server-side paginated / filtered list endpoints
+-- Keyset pagination pages newest-first on (created_at, id), so each list table
+-- needs a matching composite index to keep page cost flat as the table grows.
+
+-- 1. Invoices: keyset + common filters
+CREATE INDEX IF NOT EXISTS idx_invoices_created_id ON public.invoices (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_invoices_status ON public.invoices (status);
+CREATE INDEX IF NOT EXISTS idx_invoices_location ON public.invoices (location);
+CREATE INDEX IF NOT EXISTS idx_invoices_customer_location ON public.invoices (customer_location);
+CREATE INDEX IF NOT EXISTS idx_invoices_customer_mobile ON public.invoices (customer_mobile);
+
+-- 2. Employees: keyset + status / location filters
+CREATE INDEX IF NOT EXISTS idx_employees_created_id ON public.employees (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_employees_status_location ON public.employees (status, work_location);
+
+-- 3. Expenses: keyset + date range / category filters
+CREATE INDEX IF NOT EXISTS idx_expenses_created_id ON public.expenses (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON public.expenses (expense_date DESC);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON public.expenses (category);
@@ -0,0 +1,157 @@
+-- Phase 24: Precomputed financial aggregates for /api/financials/summary
+-- Invoice and expense totals are kept in small monthly rollup tables so the
+-- summary endpoint reads a handful of grouped rows instead of whole tables.
+-- Writes only mark the affected month dirty; refresh_financial_rollups()
+-- recomputes just those months (incremental refresh).
+
+-- 1. Rollup tables
+CREATE TABLE IF NOT EXISTS public.invoice_rollup_monthly (
+    month DATE NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    service TEXT NOT NULL DEFAULT '',
+    invoice_count INT NOT NULL DEFAULT 0,
+    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+    amount_paid NUMERIC(14,2) NOT NULL DEFAULT 0,
+    nurse_payouts NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, location, service)
+);
+
+CREATE TABLE IF NOT EXISTS public.expense_rollup_monthly (
+    month DATE NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    expense_count INT NOT NULL DEFAULT 0,
+    expenses NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category)
+);
+
+CREATE TABLE IF NOT EXISTS public.financial_rollup_dirty (
+    source TEXT NOT NULL, -- 'invoices' or 'expenses'
+    month DATE NOT NULL,
+    PRIMARY KEY (source, month)
+);
+
+-- 2. Dirty-month tracking triggers
+CREATE OR REPLACE FUNCTION public.mark_invoice_rollup_dirty()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO public.financial_rollup_dirty (source, month)
+        VALUES ('invoices', date_trunc('month', COALESCE(NEW.date::timestamptz, NEW.created_at))::date)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO public.financial_rollup_dirty (source, month)
+        VALUES ('invoices', date_trunc('month', COALESCE(OLD.date::timestamptz, OLD.created_at))::date)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS invoices_rollup_dirty ON public.invoices;
+CREATE TRIGGER invoices_rollup_dirty
+AFTER INSERT OR UPDATE OR DELETE ON public.invoices
+FOR EACH ROW EXECUTE FUNCTION public.mark_invoice_rollup_dirty();
+
+CREATE OR REPLACE FUNCTION public.mark_expense_rollup_dirty()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO public.financial_rollup_dirty (source, month)
+        VALUES ('expenses', date_trunc('month', NEW.expense_date)::date)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO public.financial_rollup_dirty (source, month)
+        VALUES ('expenses', date_trunc('month', OLD.expense_date)::date)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS expenses_rollup_dirty ON public.expenses;
+CREATE TRIGGER expenses_rollup_dirty
+AFTER INSERT OR UPDATE OR DELETE ON public.expenses
+FOR EACH ROW EXECUTE FUNCTION public.mark_expense_rollup_dirty();
+
+-- 3. Incremental refresh: recompute only dirty months
+CREATE OR REPLACE FUNCTION public.refresh_financial_rollups()
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    refreshed integer := 0;
+    d record;
+BEGIN
+    FOR d IN DELETE FROM public.financial_rollup_dirty RETURNING source, month LOOP
+        IF d.source = 'invoices' THEN
+            DELETE FROM public.invoice_rollup_monthly WHERE month = d.month;
+            INSERT INTO public.invoice_rollup_monthly
+                (month, location, service, invoice_count, revenue, amount_paid, nurse_payouts)
+            SELECT
+                d.month,
+                COALESCE(location, customer_location, ''),
+                COALESCE(service, ''),
+                COUNT(*),
+                -- Revenue follows the Admin Hub rule: Confirmed / Active invoices only
+                COALESCE(SUM(amount) FILTER (WHERE lower(status) IN ('confirmed', 'active')), 0),
+                COALESCE(SUM(amount_paid), 0),
+                COALESCE(SUM(COALESCE(nurse_payment, 0) + COALESCE(nurse_payment_extra, 0)), 0)
+            FROM public.invoices
+            WHERE date_trunc('month', COALESCE(date::timestamptz, created_at))::date = d.month
+            GROUP BY 2, 3;
+        ELSE
+            DELETE FROM public.expense_rollup_monthly WHERE month = d.month;
+            INSERT INTO public.expense_rollup_monthly (month, category, expense_count, expenses)
+            SELECT d.month, COALESCE(category, ''), COUNT(*), COALESCE(SUM(amount), 0)
+            FROM public.expenses
+            WHERE date_trunc('month', expense_date)::date = d.month
+            GROUP BY 2;
+        END IF;
+        refreshed := refreshed + 1;
+    END LOOP;
+    RETURN refreshed;
+END;
+$$;
+
+-- 4. One round-trip read used by the API: refresh dirty months, return grouped rows
+CREATE OR REPLACE FUNCTION public.financial_summary(p_from date DEFAULT NULL, p_to date DEFAULT NULL)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM public.refresh_financial_rollups();
+    RETURN jsonb_build_object(
+        'invoices', COALESCE((
+            SELECT jsonb_agg(to_jsonb(r) ORDER BY r.month)
+            FROM public.invoice_rollup_monthly r
+            WHERE (p_from IS NULL OR r.month >= date_trunc('month', p_from)::date)
+              AND (p_to IS NULL OR r.month <= p_to)
+        ), '[]'::jsonb),
+        'expenses', COALESCE((
+            SELECT jsonb_agg(to_jsonb(r) ORDER BY r.month)
+            FROM public.expense_rollup_monthly r
+            WHERE (p_from IS NULL OR r.month >= date_trunc('month', p_from)::date)
+              AND (p_to IS NULL OR r.month <= p_to)
+        ), '[]'::jsonb),
+        'payroll', COALESCE((SELECT SUM(earnings_per_month) FROM public.employees), 0)
+    );
+END;
+$$;
+
+-- 5. Backfill: mark every existing month dirty so the first read builds the rollups
+INSERT INTO public.financial_rollup_dirty (source, month)
+SELECT DISTINCT 'invoices', date_trunc('month', COALESCE(date::timestamptz, created_at))::date
+FROM public.invoices
+WHERE COALESCE(date::timestamptz, created_at) IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+INSERT INTO public.financial_rollup_dirty (source, month)
+SELECT DISTINCT 'expenses', date_trunc('month', expense_date)::date
+FROM public.expenses
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,36 @@
+-- Phase 25: Single-call service rate resolution
+-- Resolves the Inquiry Form fallback chain in one query:
+--   1. exact match: location + sub_location + service + plan + shift
+--   2. location-level rate (sub_location IS NULL)
+--   3. any rate for location + service + plan + shift
+-- The API serves lookups from an in-memory index; this function is used when
+-- the index is disabled (RATE_INDEX=0).
+
+CREATE INDEX IF NOT EXISTS idx_service_rates_lookup_sub
+ON public.service_rates (location, service_category, plan_type, shift_type, sub_location);
+
+CREATE OR REPLACE FUNCTION public.resolve_service_rate(
+    p_location text,
+    p_service text,
+    p_plan text,
+    p_shift text,
+    p_sub_location text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT to_jsonb(r)
+    FROM public.service_rates r
+    WHERE r.location = p_location
+      AND r.service_category = p_service
+      AND r.plan_type = p_plan
+      AND r.shift_type = p_shift
+    ORDER BY
+        CASE
+            WHEN p_sub_location IS NOT NULL AND r.sub_location = p_sub_location THEN 0
+            WHEN r.sub_location IS NULL THEN 1
+            ELSE 2
+        END
+    LIMIT 1;
+$$;
@@ -0,0 +1,64 @@
+-- Phase 26: Block reservation for invoice / document sequences
+-- The API reserves a block of numbers in one call and hands them out locally,
+-- instead of one RPC per confirmation. Each function atomically advances the
+-- counter by p_count and returns the new last value; the caller owns
+-- (last - p_count + 1) .. last. Unused numbers of a block are skipped (gaps),
+-- never reissued.
+
+-- 1. Invoice numbers (IN-{ABBR}-{DDMMYY}-{SEQ}-{Client}), one counter per MMYY
+CREATE OR REPLACE FUNCTION public.reserve_invoice_seq_block(p_month_year text, p_count integer DEFAULT 1)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_val integer;
+BEGIN
+    IF p_count < 1 THEN
+        RAISE EXCEPTION 'p_count must be positive';
+    END IF;
+
+    INSERT INTO public.invoice_sequences (month_year, last_val)
+    VALUES (p_month_year, p_count)
+    ON CONFLICT (month_year) DO UPDATE
+    SET last_val = public.invoice_sequences.last_val + p_count
+    RETURNING last_val INTO new_val;
+
+    RETURN new_val;
+END;
+$$;
+
+-- 2. Per-location counters for next_sequence() style document numbers
+-- (PREFIX-LOC-MMYY-SEQ). A location's counter starts from the shared
+-- monthly_sequences value for that month, so numbers already issued by
+-- next_sequence() are never reissued.
+CREATE TABLE IF NOT EXISTS public.location_sequences (
+    year_month TEXT NOT NULL,
+    location TEXT NOT NULL,
+    last_val INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (year_month, location)
+);
+
+CREATE OR REPLACE FUNCTION public.reserve_sequence_block(p_location text, p_month_year text, p_count integer DEFAULT 1)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_val integer;
+BEGIN
+    IF p_count < 1 THEN
+        RAISE EXCEPTION 'p_count must be positive';
+    END IF;
+
+    INSERT INTO public.location_sequences (year_month, location, last_val)
+    VALUES (
+        p_month_year,
+        p_location,
+        COALESCE((SELECT last_val FROM public.monthly_sequences WHERE year_month = p_month_year), 0) + p_count
+    )
+    ON CONFLICT (year_month, location) DO UPDATE
+    SET last_val = public.location_sequences.last_val + p_count
+    RETURNING last_val INTO new_val;
+
+    RETURN new_val;
+END;
+$$;
@@ -0,0 +1,92 @@
+-- Phase 27: Typeahead search over customers, staff and employees
+-- Trigram (pg_trgm) GIN indexes serve substring / fuzzy matches on names and
+-- prefix / substring matches on mobile numbers, so searches never scan tables.
+-- search_directory() ranks the candidates and backs GET /api/search.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. Trigram indexes (pg_trgm lowercases trigrams, so ILIKE and % share them)
+CREATE INDEX IF NOT EXISTS idx_employees_name_trgm ON public.employees USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_employees_mobile_trgm ON public.employees USING gin (mobile gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_name_trgm ON public.staff USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_mobile_trgm ON public.staff USING gin (mobile gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_inquiries_customer_name_trgm ON public.inquiries USING gin (customer_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_inquiries_customer_mobile_trgm ON public.inquiries USING gin (customer_mobile gin_trgm_ops);
+
+-- 2. Exact lookups used by customer auto-fill and staff auto-fill
+CREATE INDEX IF NOT EXISTS idx_inquiries_customer_mobile_created ON public.inquiries (customer_mobile, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_staff_mobile ON public.staff (mobile);
+CREATE INDEX IF NOT EXISTS idx_staff_aadhar ON public.staff (aadhar);
+
+-- 3. Ranked search
+-- Score: exact match 1.0, prefix 0.9, word prefix 0.8, otherwise trigram
+-- similarity. Customers are collapsed to their most recent inquiry per mobile.
+CREATE OR REPLACE FUNCTION public.search_directory(
+    p_query text,
+    p_kinds text[] DEFAULT ARRAY['customer', 'staff', 'employee'],
+    p_location text DEFAULT NULL,
+    p_limit integer DEFAULT 10
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    q text := lower(trim(p_query));
+    q_like text;
+    result jsonb;
+BEGIN
+    IF q IS NULL OR length(q) < 2 THEN
+        RETURN '[]'::jsonb;
+    END IF;
+    -- Escape LIKE wildcards typed by the user
+    q_like := replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_');
+
+    WITH candidates AS (
+        SELECT 'customer' AS kind, c.id::text AS id, c.customer_name AS name, c.customer_mobile AS mobile,
+               c.customer_location AS location, NULL::text AS sub_location
+        FROM (
+            SELECT DISTINCT ON (i.customer_mobile) i.*
+            FROM public.inquiries i
+            WHERE 'customer' = ANY (p_kinds)
+              AND (i.customer_name ILIKE '%' || q_like || '%'
+                   OR i.customer_name % q
+                   OR i.customer_mobile LIKE '%' || q_like || '%')
+            ORDER BY i.customer_mobile, i.created_at DESC
+        ) c
+        UNION ALL
+        SELECT 'staff', s.id::text, s.name, s.mobile, NULL, NULL
+        FROM public.staff s
+        WHERE 'staff' = ANY (p_kinds)
+          AND (s.name ILIKE '%' || q_like || '%'
+               OR s.name % q
+               OR s.mobile LIKE '%' || q_like || '%')
+        UNION ALL
+        SELECT 'employee', e.id::text, e.name, e.mobile, e.work_location, e.sub_location
+        FROM public.employees e
+        WHERE 'employee' = ANY (p_kinds)
+          AND e.status = 'Active'
+          AND (p_location IS NULL OR e.work_location = p_location)
+          AND (e.name ILIKE '%' || q_like || '%'
+               OR e.name % q
+               OR e.mobile LIKE '%' || q_like || '%')
+    ),
+    ranked AS (
+        SELECT c.*,
+            CASE
+                WHEN lower(c.name) = q OR c.mobile = q THEN 1.0
+                WHEN lower(c.name) LIKE q_like || '%' OR c.mobile LIKE q_like || '%' THEN 0.9
+                WHEN lower(c.name) LIKE '% ' || q_like || '%' THEN 0.8
+                ELSE round(similarity(lower(coalesce(c.name, '')), q)::numeric, 3)
+            END AS score
+        FROM candidates c
+    )
+    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.score DESC, r.name), '[]'::jsonb)
+    INTO result
+    FROM (
+        SELECT * FROM ranked ORDER BY score DESC, name LIMIT greatest(1, least(p_limit, 50))
+    ) r;
+
+    RETURN result;
+END;
+$$;
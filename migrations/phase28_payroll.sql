@@ -0,0 +1,10 @@
+-- Phase 28: Indexes for the server-side payroll engine (/api/payroll/{month_year})
+-- The engine reads one month of employee_leaves and invoices per computation;
+-- these keep both reads to an index range scan instead of a full table scan.
+
+-- 1. Leave records by month (the UNIQUE(employee_id, month_year) index leads with employee_id)
+CREATE INDEX IF NOT EXISTS idx_employee_leaves_month ON public.employee_leaves (month_year);
+
+-- 2. Invoices by service date, and by created_at for rows without a date
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON public.invoices (date);
+CREATE INDEX IF NOT EXISTS idx_invoices_undated_created ON public.invoices (created_at) WHERE date IS NULL;
@@ -0,0 +1,65 @@
+-- Phase 29: Atomic sub-location edits
+-- Adding or removing a sub-location used to read locations.sub_locations,
+-- change it in the API and write the whole array back (two round-trips, and
+-- concurrent edits overwrote each other). edit_sub_locations() applies the
+-- change inside one UPDATE per location, so the array is modified in place
+-- under the row lock and no edit is lost.
+
+-- 1. Apply a list of changes in one call
+-- p_changes: [{"location_id": "<uuid>", "op": "add" | "remove", "name": "Baner"}, ...]
+-- Changes are applied in order (an add then remove of the same name cancels
+-- out). Adding an existing name or removing a missing one is a no-op.
+-- Returns the final rows of every location that exists; unknown ids are
+-- simply absent from the result. Ids are compared as text (locations is a
+-- small reference table, so the cast costs nothing measurable).
+CREATE OR REPLACE FUNCTION public.edit_sub_locations(p_changes jsonb)
+RETURNS SETOF public.locations
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    c jsonb;
+    v_name text;
+    v_op text;
+    ids text[];
+BEGIN
+    IF jsonb_typeof(p_changes) IS DISTINCT FROM 'array' THEN
+        RAISE EXCEPTION 'p_changes must be a JSON array';
+    END IF;
+
+    SELECT array_agg(DISTINCT e->>'location_id')
+    INTO ids
+    FROM jsonb_array_elements(p_changes) e;
+
+    -- Lock every affected row up front, in id order, so two bulk edits
+    -- touching the same locations cannot deadlock
+    PERFORM 1 FROM public.locations WHERE id::text = ANY (ids) ORDER BY id FOR UPDATE;
+
+    FOR c IN SELECT * FROM jsonb_array_elements(p_changes) LOOP
+        v_name := trim(c->>'name');
+        v_op := c->>'op';
+        IF v_name IS NULL OR v_name = '' THEN
+            RAISE EXCEPTION 'sub-location name is required';
+        END IF;
+
+        IF v_op = 'add' THEN
+            UPDATE public.locations
+            SET sub_locations = COALESCE(sub_locations, '[]'::jsonb) || to_jsonb(v_name)
+            WHERE id::text = c->>'location_id'
+              AND NOT COALESCE(sub_locations, '[]'::jsonb) @> jsonb_build_array(v_name);
+        ELSIF v_op = 'remove' THEN
+            UPDATE public.locations
+            SET sub_locations = COALESCE((
+                SELECT jsonb_agg(e ORDER BY ord)
+                FROM jsonb_array_elements(sub_locations) WITH ORDINALITY AS t(e, ord)
+                WHERE e <> to_jsonb(v_name)
+            ), '[]'::jsonb)
+            WHERE id::text = c->>'location_id'
+              AND sub_locations @> jsonb_build_array(v_name);
+        ELSE
+            RAISE EXCEPTION 'unknown op "%" (expected add or remove)', v_op;
+        END IF;
+    END LOOP;
+
+    RETURN QUERY SELECT * FROM public.locations WHERE id::text = ANY (ids);
+END;
+$$;
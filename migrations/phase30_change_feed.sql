@@ -0,0 +1,38 @@
+-- Phase 30: Change feed for delta sync (GET /api/invoices/changes?since=...)
+-- Inserted and updated rows are found through updated_at, which the existing
+-- set_timestamp_invoices trigger bumps on every UPDATE (inserts take the column
+-- default). Deletes leave no row behind, so a trigger records a tombstone.
+
+-- 1. Tombstones
+CREATE TABLE IF NOT EXISTS public.deleted_rows (
+    table_name TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (table_name, row_id)
+);
+CREATE INDEX IF NOT EXISTS idx_deleted_rows_table_deleted ON public.deleted_rows (table_name, deleted_at);
+
+-- Tombstones are kept for 30 days; clients with an older cursor get 410 and
+-- reload the full list (CHANGE_FEED_RETENTION_DAYS on the API must match).
+CREATE OR REPLACE FUNCTION public.record_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.deleted_rows (table_name, row_id, deleted_at)
+    VALUES (TG_TABLE_NAME, OLD.id::text, now())
+    ON CONFLICT (table_name, row_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+
+    DELETE FROM public.deleted_rows
+    WHERE table_name = TG_TABLE_NAME AND deleted_at < now() - interval '30 days';
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS invoices_tombstone ON public.invoices;
+CREATE TRIGGER invoices_tombstone
+AFTER DELETE ON public.invoices
+FOR EACH ROW EXECUTE FUNCTION public.record_tombstone();
+
+-- 2. Keyset index for the feed: (updated_at, id) ascending
+CREATE INDEX IF NOT EXISTS idx_invoices_updated_id ON public.invoices (updated_at, id);
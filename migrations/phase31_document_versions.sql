@@ -0,0 +1,12 @@
+-- Phase 31: Versioned documents (app/services/document_store.py)
+-- Each logical document ("invoices/invoice-VC-0042.pdf") is one official_documents
+-- row found by metadata->>'name'; its versions live in metadata->'versions' and
+-- point at content-addressed blobs (blobs/ab/<sha256>.pdf) in the documents bucket.
+
+-- 1. Lookup by logical name (every save reads the current version first)
+CREATE INDEX IF NOT EXISTS idx_official_documents_name
+    ON public.official_documents ((metadata->>'name'), created_at DESC);
+
+-- 2. Lookup by content hash (which documents share a blob)
+CREATE INDEX IF NOT EXISTS idx_official_documents_sha256
+    ON public.official_documents ((metadata->>'sha256'));
@@ -0,0 +1,22 @@
+-- Phase 32: Audit log (app/services/audit.py, GET /api/audit)
+-- One row per changed record: who, when, and the field-level diff
+-- ({"field": {"from": old, "to": new}}). The API queues entries in memory and
+-- inserts them in batches; ids are generated by the API so a retried batch is
+-- ignored instead of stored twice.
+
+-- 1. Table
+CREATE TABLE IF NOT EXISTS public.audit_log (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    table_name TEXT NOT NULL,
+    row_id TEXT,
+    action TEXT NOT NULL,          -- create | update | delete | write | reset_password
+    actor TEXT,
+    changes JSONB NOT NULL DEFAULT '{}'::jsonb,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- 2. Keyset paging (created_at, id) newest first, overall and per record / actor
+CREATE INDEX IF NOT EXISTS idx_audit_log_created_id ON public.audit_log (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_log_row ON public.audit_log (table_name, row_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_log_actor ON public.audit_log (actor, created_at DESC);
+
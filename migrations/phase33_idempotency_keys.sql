@@ -0,0 +1,18 @@
+-- Phase 33: Idempotency keys (app/services/idempotency.py, IDEMPOTENCY_PERSIST=1)
+-- Responses to POST /api/invoices/ and /api/documents/ requests that carried an
+-- Idempotency-Key, so a retry after an API restart still gets the original
+-- response. key is "<endpoint>:<user>:<client key>"; body is base64.
+
+-- 1. Table
+CREATE TABLE IF NOT EXISTS public.idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    headers JSONB NOT NULL DEFAULT '{}'::jsonb,
+    body TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- 2. Expiry sweep (the API deletes expired keys every 100 new ones)
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON public.idempotency_keys (expires_at);
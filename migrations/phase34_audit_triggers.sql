@@ -0,0 +1,74 @@
+-- Phase 34: Audit inserts and updates in the database (audit_log, phase 32)
+-- The API used to read each row before writing it so it could diff old and new,
+-- an extra blocking round-trip on every audited write. The trigger below sees
+-- OLD and NEW of the write itself and stores the same field-level diff
+-- ({"field": {"from": old, "to": new}}) in audit_log. Deletes, invoices and
+-- users are still logged by the API from rows it already holds.
+--
+-- The actor is the X-Audit-Actor request header (base64 of the UTF-8 name, set
+-- by with_actor() in app/services/supabase_client.py); writes without it fall
+-- back to the row's updated_by_name / created_by_name.
+
+-- 1. Diff OLD -> NEW; updated_at / updated_by_name are bumped on every write
+--    and would only add noise, and an update that changed nothing is skipped
+CREATE OR REPLACE FUNCTION public.audit_row_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    old_row JSONB := CASE WHEN TG_OP = 'UPDATE' THEN to_jsonb(OLD) ELSE '{}'::jsonb END;
+    new_row JSONB := to_jsonb(NEW);
+    changes JSONB := '{}'::jsonb;
+    field TEXT;
+    header TEXT := current_setting('request.headers', true)::json->>'x-audit-actor';
+    actor TEXT;
+BEGIN
+    FOR field IN SELECT jsonb_object_keys(old_row || new_row) LOOP
+        CONTINUE WHEN field IN ('updated_at', 'updated_by_name');
+        IF coalesce(old_row->field, 'null'::jsonb) IS DISTINCT FROM coalesce(new_row->field, 'null'::jsonb) THEN
+            changes := changes || jsonb_build_object(field, jsonb_build_object(
+                'from', coalesce(old_row->field, 'null'::jsonb),
+                'to', coalesce(new_row->field, 'null'::jsonb)));
+        END IF;
+    END LOOP;
+    IF changes = '{}'::jsonb THEN
+        RETURN NULL;
+    END IF;
+
+    IF header ~ '^[A-Za-z0-9+/]+={0,2}$' THEN
+        actor := convert_from(decode(header, 'base64'), 'UTF8');
+    END IF;
+    actor := coalesce(actor, new_row->>'updated_by_name', new_row->>'created_by_name', 'System');
+
+    INSERT INTO public.audit_log (table_name, row_id, action, actor, changes)
+    VALUES (TG_TABLE_NAME, new_row->>'id', CASE TG_OP WHEN 'INSERT' THEN 'create' ELSE 'update' END, actor, changes);
+    RETURN NULL;
+END;
+$$;
+
+-- 2. Audited tables (an upsert that hits an existing row fires the UPDATE
+--    trigger, so it is logged as an update with the real previous values)
+DROP TRIGGER IF EXISTS locations_audit ON public.locations;
+CREATE TRIGGER locations_audit
+AFTER INSERT OR UPDATE ON public.locations
+FOR EACH ROW EXECUTE FUNCTION public.audit_row_change();
+
+DROP TRIGGER IF EXISTS service_rates_audit ON public.service_rates;
+CREATE TRIGGER service_rates_audit
+AFTER INSERT OR UPDATE ON public.service_rates
+FOR EACH ROW EXECUTE FUNCTION public.audit_row_change();
+
+DROP TRIGGER IF EXISTS budgets_audit ON public.budgets;
+CREATE TRIGGER budgets_audit
+AFTER INSERT OR UPDATE ON public.budgets
+FOR EACH ROW EXECUTE FUNCTION public.audit_row_change();
+
+DROP TRIGGER IF EXISTS expenses_audit ON public.expenses;
+CREATE TRIGGER expenses_audit
+AFTER INSERT OR UPDATE ON public.expenses
+FOR EACH ROW EXECUTE FUNCTION public.audit_row_change();
+
+DROP TRIGGER IF EXISTS employees_audit ON public.employees;
+CREATE TRIGGER employees_audit
+AFTER INSERT OR UPDATE ON public.employees
+FOR EACH ROW EXECUTE FUNCTION public.audit_row_change();
@@ -0,0 +1,143 @@
+-- Phase 35: Directory search for 2-character queries and by location (phase 27)
+-- A 2-character query has no trigram, so the phase 27 ILIKE '%q%' / % filters
+-- could not use the GIN indexes and scanned inquiries, staff and employees in
+-- full. Queries shorter than 3 characters now only match name / mobile
+-- prefixes, served by the btree text_pattern_ops indexes below; 3+ characters
+-- keep the trigram path. p_location now also restricts customers (their
+-- customer_location is the location or one of its sub-locations); staff have
+-- no location, so a location-restricted search leaves them out.
+
+-- 1. Prefix indexes (lower(name) so prefixes match case-insensitively)
+CREATE INDEX IF NOT EXISTS idx_employees_name_prefix ON public.employees (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_employees_mobile_prefix ON public.employees (mobile text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_name_prefix ON public.staff (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_mobile_prefix ON public.staff (mobile text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_inquiries_customer_name_prefix ON public.inquiries (lower(customer_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_inquiries_customer_mobile_prefix ON public.inquiries (customer_mobile text_pattern_ops);
+
+-- 2. Ranked search (same scores and result shape as phase 27)
+CREATE OR REPLACE FUNCTION public.search_directory(
+    p_query text,
+    p_kinds text[] DEFAULT ARRAY['customer', 'staff', 'employee'],
+    p_location text DEFAULT NULL,
+    p_limit integer DEFAULT 10
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    q text := lower(trim(p_query));
+    q_like text;
+    n integer := greatest(1, least(p_limit, 50));
+    places text[];
+    result jsonb;
+BEGIN
+    IF q IS NULL OR length(q) < 2 THEN
+        RETURN '[]'::jsonb;
+    END IF;
+    -- Escape LIKE wildcards typed by the user
+    q_like := replace(replace(replace(q, '\', '\\'), '%', '\%'), '_', '\_');
+
+    IF p_location IS NOT NULL THEN
+        SELECT array_agg(DISTINCT place) INTO places
+        FROM (
+            SELECT p_location AS place
+            UNION ALL
+            SELECT jsonb_array_elements_text(coalesce(l.sub_locations, '[]'::jsonb))
+            FROM public.locations l
+            WHERE l.name = p_location
+        ) p;
+    END IF;
+
+    IF length(q) < 3 THEN
+        -- Prefix only: every candidate scores 1.0 (exact) or 0.9, so each kind
+        -- contributes at most n rows
+        WITH candidates AS (
+            (SELECT 'customer' AS kind, c.id::text AS id, c.customer_name AS name, c.customer_mobile AS mobile,
+                    c.customer_location AS location, NULL::text AS sub_location
+             FROM (
+                 SELECT DISTINCT ON (i.customer_mobile) i.*
+                 FROM public.inquiries i
+                 WHERE 'customer' = ANY (p_kinds)
+                   AND (places IS NULL OR i.customer_location = ANY (places))
+                   AND (lower(i.customer_name) LIKE q_like || '%' OR i.customer_mobile LIKE q_like || '%')
+                 ORDER BY i.customer_mobile, i.created_at DESC
+             ) c
+             ORDER BY c.customer_name LIMIT n)
+            UNION ALL
+            (SELECT 'staff', s.id::text, s.name, s.mobile, NULL, NULL
+             FROM public.staff s
+             WHERE 'staff' = ANY (p_kinds)
+               AND p_location IS NULL
+               AND (lower(s.name) LIKE q_like || '%' OR s.mobile LIKE q_like || '%')
+             ORDER BY s.name LIMIT n)
+            UNION ALL
+            (SELECT 'employee', e.id::text, e.name, e.mobile, e.work_location, e.sub_location
+             FROM public.employees e
+             WHERE 'employee' = ANY (p_kinds)
+               AND e.status = 'Active'
+               AND (p_location IS NULL OR e.work_location = p_location)
+               AND (lower(e.name) LIKE q_like || '%' OR e.mobile LIKE q_like || '%')
+             ORDER BY e.name LIMIT n)
+        ),
+        ranked AS (
+            SELECT c.*, CASE WHEN lower(c.name) = q OR c.mobile = q THEN 1.0 ELSE 0.9 END AS score
+            FROM candidates c
+        )
+        SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.score DESC, r.name), '[]'::jsonb)
+        INTO result
+        FROM (SELECT * FROM ranked ORDER BY score DESC, name LIMIT n) r;
+        RETURN result;
+    END IF;
+
+    WITH candidates AS (
+        SELECT 'customer' AS kind, c.id::text AS id, c.customer_name AS name, c.customer_mobile AS mobile,
+               c.customer_location AS location, NULL::text AS sub_location
+        FROM (
+            SELECT DISTINCT ON (i.customer_mobile) i.*
+            FROM public.inquiries i
+            WHERE 'customer' = ANY (p_kinds)
+              AND (places IS NULL OR i.customer_location = ANY (places))
+              AND (i.customer_name ILIKE '%' || q_like || '%'
+                   OR i.customer_name % q
+                   OR i.customer_mobile LIKE '%' || q_like || '%')
+            ORDER BY i.customer_mobile, i.created_at DESC
+        ) c
+        UNION ALL
+        SELECT 'staff', s.id::text, s.name, s.mobile, NULL, NULL
+        FROM public.staff s
+        WHERE 'staff' = ANY (p_kinds)
+          AND p_location IS NULL
+          AND (s.name ILIKE '%' || q_like || '%'
+               OR s.name % q
+               OR s.mobile LIKE '%' || q_like || '%')
+        UNION ALL
+        SELECT 'employee', e.id::text, e.name, e.mobile, e.work_location, e.sub_location
+        FROM public.employees e
+        WHERE 'employee' = ANY (p_kinds)
+          AND e.status = 'Active'
+          AND (p_location IS NULL OR e.work_location = p_location)
+          AND (e.name ILIKE '%' || q_like || '%'
+               OR e.name % q
+               OR e.mobile LIKE '%' || q_like || '%')
+    ),
+    ranked AS (
+        SELECT c.*,
+            CASE
+                WHEN lower(c.name) = q OR c.mobile = q THEN 1.0
+                WHEN lower(c.name) LIKE q_like || '%' OR c.mobile LIKE q_like || '%' THEN 0.9
+                WHEN lower(c.name) LIKE '% ' || q_like || '%' THEN 0.8
+                ELSE round(similarity(lower(coalesce(c.name, '')), q)::numeric, 3)
+            END AS score
+        FROM candidates c
+    )
+    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.score DESC, r.name), '[]'::jsonb)
+    INTO result
+    FROM (
+        SELECT * FROM ranked ORDER BY score DESC, name LIMIT n
+    ) r;
+
+    RETURN result;
+END;
+$$;
@@ -93,5 +93,52 @@ async function loadInvoiceToForm(invoiceId) {
     }
 }
 
+// --- Delta sync ---
+// Lists are loaded in full once, then kept current through the /changes feed:
+// only rows inserted or updated since the cursor, plus ids of deleted rows.
+
+// Pages through the feed until caught up. Returns null when the server says the
+// cursor has expired (410); the caller should then reload the full list.
+async function fetchChanges(path, cursor, cursorId) {
+    const fetcher = window.apiFetch || fetch;
+    const changes = [];
+    const deleted = [];
+    for (;;) {
+        const params = new URLSearchParams({ since: cursor });
+        if (cursorId) params.set('after_id', cursorId);
+        const res = await fetcher(`${path}?${params.toString()}`);
+        if (res.status === 410) return null;
+        if (!res.ok) throw new Error('Change feed failed: ' + res.status);
+        const page = await res.json();
+        changes.push(...page.changes);
+        deleted.push(...page.deleted);
+        cursor = page.cursor;
+        cursorId = page.cursor_id;
+        if (!page.has_more) break;
+    }
+    return { changes, deleted, cursor, cursorId };
+}
+
+// Folds a feed into `rows` by id: tombstones drop rows, changes replace or add
+// them. Re-sorted newest-first on sortKey and trimmed to `limit`, so the result
+// matches what a full reload of the same list would return.
+function mergeChanges(rows, feed, { sortKey = 'created_at', limit = null } = {}) {
+    const byId = new Map(rows.map(r => [r.id, r]));
+    feed.deleted.forEach(id => byId.delete(id));
+    feed.changes.forEach(r => byId.set(r.id, r));
+    const merged = [...byId.values()].sort((a, b) => String(b[sortKey] || '').localeCompare(String(a[sortKey] || '')));
+    return limit ? merged.slice(0, limit) : merged;
+}
+
+// Starting cursor after a full load: newest updated_at seen, less a minute so
+// writes still committing while the list loaded are picked up on the next sync.
+function syncCursor(rows) {
+    const newest = rows.reduce((max, r) => Math.max(max, Date.parse(r.updated_at || r.created_at) || 0), 0);
+    return new Date((newest || Date.now()) - 60000).toISOString();
+}
+
 window.saveInquiryAsInvoice = saveInquiryAsInvoice;
 window.loadInvoiceToForm = loadInvoiceToForm;
+window.fetchChanges = fetchChanges;
+window.mergeChanges = mergeChanges;
+window.syncCursor = syncCursor;
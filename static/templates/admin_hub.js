@@ -4,6 +4,18 @@ document.addEventListener('DOMContentLoaded', () => {
     fetchOverviewData();
     fetchUsers();
     fetchLocations();
+
+    // Live updates: reload the open tab when another admin edits rates / locations
+    if (window.subscribeEvents) {
+        const isOpen = id => { const el = document.getElementById(`content-${id}`); return el && !el.classList.contains('hidden'); };
+        subscribeEvents({
+            rates: () => { if (isOpen('rates')) fetchRates(); },
+            locations: () => {
+                if (isOpen('locations')) fetchLocations();
+                if (isOpen('rates')) fetchLocationsForRates();
+            },
+        });
+    }
 });
 
 // ==========================================
@@ -69,8 +81,8 @@ function switchTab(tabId) {
 // ==========================================
 async function fetchUsers() {
     try {
-        const myRole = sessionStorage.getItem('userRole');
-        const response = await apiFetch(`/api/users?viewer_role=${encodeURIComponent(myRole || '')}`);
+        // Visible roles are derived server-side from the session token
+        const response = await apiFetch('/api/users');
         const users = await response.json();
         const tbody = document.getElementById('usersTableBody');
         tbody.innerHTML = '';
@@ -715,25 +727,18 @@ async function deleteBudget(id) {
 let financialChart = null;
 async function fetchFinancialData() {
     try {
-        const [invRes, expRes, bgtRes, empRes] = await Promise.all([
-            apiFetch('/api/invoices/'), apiFetch('/api/expenses/'), apiFetch('/api/budgets/'), apiFetch('/api/employees/')
-        ]);
-        const invoices = await invRes.json();
-        const expenses = await expRes.json();
-        const budgets = await bgtRes.json();
-        const employees = await empRes.json();
-
-        // Revenue from confirmed/active
-        const confirmedInvoices = invoices.filter(i => { const s = (i.status || '').toLowerCase(); return s === 'confirmed' || s === 'active'; });
-        const totalRevenue = confirmedInvoices.reduce((s, i) => s + parseFloat(i.rate_agreed || i.amount || 0), 0);
-        const totalExpenses = expenses.reduce((s, e) => s + parseFloat(e.amount || 0), 0);
-
-        // Payroll
-        const totalPayroll = employees.reduce((s, e) => s + parseFloat(e.earnings_per_month || 0), 0);
-        const grossEarnings = totalRevenue - totalPayroll;
-        const netEarnings = grossEarnings - totalExpenses;
-
-        const totalBudget = budgets.reduce((s, b) => s + parseFloat(b.budget_amount || 0), 0);
+        // Aggregates are precomputed server-side (see /api/financials/summary)
+        const res = await apiFetch('/api/financials/summary?group_by=month');
+        if (!res.ok) throw new Error('Failed to fetch financial summary');
+        const summary = await res.json();
+        const t = summary.totals;
+
+        const totalRevenue = t.revenue;
+        const totalExpenses = t.expenses;
+        const grossEarnings = t.gross_earnings;
+        const netEarnings = t.net_earnings;
+
+        const totalBudget = summary.budget_variance.reduce((s, b) => s + b.budget, 0);
         const budgetUtil = totalBudget > 0 ? Math.round((totalExpenses / totalBudget) * 100) : 0;
 
         document.getElementById('fin_revenue').textContent = `₹ ${totalRevenue.toLocaleString('en-IN')}`;
@@ -746,15 +751,14 @@ async function fetchFinancialData() {
         document.getElementById('fin_gross').className = `text-2xl font-bold ${grossEarnings >= 0 ? 'text-blue-600' : 'text-red-600'}`;
         document.getElementById('fin_earnings').className = `text-2xl font-bold ${netEarnings >= 0 ? 'text-indigo-600' : 'text-red-600'}`;
 
-        generateSmartAdvice(totalRevenue, totalExpenses, netEarnings, budgetUtil, expenses, budgets);
-        renderFinancialChart(invoices, expenses);
+        generateSmartAdvice(totalRevenue, totalExpenses, netEarnings, budgetUtil, summary.expenses_by_category, summary.budget_variance);
+        renderFinancialChart(summary.groups, summary.expenses_by_month);
 
         // Budget vs Actual
         const container = document.getElementById('budgetVsActualContainer');
         container.innerHTML = '';
-        budgets.forEach(b => {
-            const catExpenses = expenses.filter(e => e.category === b.category).reduce((s, e) => s + parseFloat(e.amount || 0), 0);
-            const pct = b.budget_amount > 0 ? Math.round((catExpenses / b.budget_amount) * 100) : 0;
+        summary.budget_variance.forEach(b => {
+            const pct = b.utilisation_pct;
             const barColor = pct > 100 ? 'bg-red-500' : pct > 75 ? 'bg-yellow-500' : 'bg-green-500';
             container.innerHTML += `
                 <div class="flex items-center gap-4">
@@ -762,14 +766,14 @@ async function fetchFinancialData() {
                     <div class="flex-1 bg-gray-100 rounded-full h-3">
                         <div class="${barColor} h-3 rounded-full transition-all" style="width: ${Math.min(pct, 100)}%"></div>
                     </div>
-                    <span class="text-xs font-bold ${pct > 100 ? 'text-red-600' : 'text-gray-500'}">₹${catExpenses.toLocaleString('en-IN')} / ₹${parseFloat(b.budget_amount).toLocaleString('en-IN')} (${pct}%)</span>
+                    <span class="text-xs font-bold ${pct > 100 ? 'text-red-600' : 'text-gray-500'}">₹${b.actual.toLocaleString('en-IN')} / ₹${b.budget.toLocaleString('en-IN')} (${pct}%)</span>
                 </div>
             `;
         });
     } catch (err) { console.error('Financials fetch error:', err); }
 }
 
-function renderFinancialChart(invoicesData, expensesData) {
+function renderFinancialChart(revenueByMonth, expensesByMonth) {
     const ctx = document.getElementById('financialChart')?.getContext('2d');
     if (!ctx) return;
     if (financialChart) financialChart.destroy();
@@ -777,8 +781,9 @@ function renderFinancialChart(invoicesData, expensesData) {
     const revByMonth = new Array(12).fill(0);
     const expByMonth = new Array(12).fill(0);
 
-    if (invoicesData) invoicesData.forEach(inv => { const d = new Date(inv.date || inv.created_at); revByMonth[d.getMonth()] += parseFloat(inv.amount || inv.net_amount || 0); });
-    if (expensesData) expensesData.forEach(exp => { const d = new Date(exp.expense_date); expByMonth[d.getMonth()] += parseFloat(exp.amount || 0); });
+    // Rollup months arrive as 'YYYY-MM-01'
+    if (revenueByMonth) revenueByMonth.forEach(g => { revByMonth[parseInt(g.month.slice(5, 7), 10) - 1] += g.revenue; });
+    if (expensesByMonth) expensesByMonth.forEach(e => { expByMonth[parseInt(e.month.slice(5, 7), 10) - 1] += e.expenses; });
 
     financialChart = new Chart(ctx, {
         type: 'bar',
@@ -799,10 +804,8 @@ function generateSmartAdvice(revenue, expenses, earnings, budgetUtil, expensesAr
     else if (earnings > 0 && expenses > revenue * 0.7) advices.push('⚠️ Expenses consuming over 70% of revenue. Review recurring costs.');
     if (budgetUtil > 100) advices.push('🚨 <strong>Budget Overrun!</strong> Actual spending exceeded defined budget.');
     else if (budgetUtil > 80) advices.push('🟡 Budget at ' + budgetUtil + '%. Approaching limit.');
-    const catMap = {};
-    expensesArr.forEach(e => { catMap[e.category] = (catMap[e.category] || 0) + parseFloat(e.amount || 0); });
-    const sorted = Object.entries(catMap).sort((a, b) => b[1] - a[1]);
-    if (sorted.length > 0) advices.push(`📊 Top expense: <strong>${sorted[0][0]}</strong> at ₹${sorted[0][1].toLocaleString('en-IN')}.`);
+    // expensesArr is already grouped by category and sorted largest first
+    if (expensesArr.length > 0) advices.push(`📊 Top expense: <strong>${expensesArr[0].category}</strong> at ₹${expensesArr[0].expenses.toLocaleString('en-IN')}.`);
     if (revenue === 0 && expenses === 0) advices.push('📝 No financial data yet. Start logging expenses and processing inquiries.');
     if (advices.length === 0) advices.push('✅ Financials look healthy! Revenue exceeds expenses and budget is within limits.');
     adviceEl.innerHTML = advices.join('<br><br>');
@@ -181,12 +181,18 @@ window.saveInquiryRecord = async function () {
     const url = editingId ? `/api/invoices/${editingId}` : '/api/invoices/';
     const method = editingId ? 'PUT' : 'POST';
 
+    const body = JSON.stringify(payload);
+    const headers = { 'Content-Type': 'application/json' };
+    if (!editingId) headers['Idempotency-Key'] = window.idempotencyKey(body);
+
     try {
         const response = await fetch(url, {
             method: method,
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
+            headers: headers,
+            body: body
         });
+        // A server answer (even an error) ends the attempt; only network failures retry with the key
+        window.settleIdempotencyKey(body);
 
         if (response.ok) {
             const returnedData = await response.json();
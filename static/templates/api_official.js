@@ -62,11 +62,14 @@ async function saveOfficialDocument() {
         btn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Saving...';
     }
 
+    const body = JSON.stringify(payload);
     try {
         const res = await apiFetch(`${API_BASE_OFFICIAL}/documents/`, {
             method: 'POST',
-            body: JSON.stringify(payload)
+            headers: { 'Idempotency-Key': window.idempotencyKey(body) },
+            body: body
         });
+        window.settleIdempotencyKey(body);
 
         if (!res.ok) {
             const txt = await res.text();
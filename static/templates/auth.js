@@ -78,9 +78,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     if (fallbackRes.ok) {
                         const fallbackData = await fallbackRes.json();
                         // Custom legacy success!
-                        sessionStorage.setItem('userRole', fallbackData.user.role);
-                        sessionStorage.setItem('userName', fallbackData.user.username);
-                        sessionStorage.setItem('accessToken', 'legacy-auth-token');
+                        storeApiSession(fallbackData);
                         window.location.href = 'index.html';
                         return;
                     } else {
@@ -91,27 +89,22 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (authData.session) {
                     nativeSession = authData.session;
 
-                    // Success! Fetch Role from custom Users table
-                    const { data: userRecord, error: dbError } = await window.supabaseClient
-                        .from('users')
-                        .select('role, username, is_active, permissions')
-                        .eq('username', usernameInput)
-                        .single();
-
-                    if (dbError || !userRecord) {
-                        throw new Error("User record not found in access control list.");
-                    }
-
-                    if (!userRecord.is_active) {
-                        throw new Error("Account is disabled. Contact Super Admin.");
+                    // Success! Exchange the Supabase session for an API session token
+                    // (role, permissions and page access are embedded in it)
+                    const sessionRes = await fetch('/api/auth/session', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Authorization': `Bearer ${nativeSession.access_token}`
+                        },
+                        body: JSON.stringify({ username: usernameInput })
+                    });
+                    const sessionData = await sessionRes.json();
+                    if (!sessionRes.ok) {
+                        throw new Error(sessionData.detail || "User record not found in access control list.");
                     }
 
-                    // Save to Session Storage
-                    sessionStorage.setItem('userRole', userRecord.role);
-                    sessionStorage.setItem('userName', userRecord.username);
-                    sessionStorage.setItem('userPermissions', JSON.stringify(userRecord.permissions || {}));
-                    sessionStorage.setItem('accessToken', nativeSession.access_token);
-
+                    storeApiSession(sessionData);
                     window.location.href = 'index.html';
                 }
             } catch (err) {
@@ -143,6 +136,18 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 });
 
+/**
+ * Saves the /api/auth/login or /api/auth/session response. The token is sent
+ * as a Bearer header by apiFetch (an HttpOnly cookie covers plain links).
+ */
+function storeApiSession(data) {
+    sessionStorage.setItem('userRole', data.user.role);
+    sessionStorage.setItem('userName', data.user.username);
+    sessionStorage.setItem('userPermissions', JSON.stringify(data.user.permissions || {}));
+    sessionStorage.setItem('userPageAccess', JSON.stringify(data.user.page_access || {}));
+    sessionStorage.setItem('accessToken', data.token);
+}
+
 /**
  * Dynamic Permission Helper
  */
@@ -215,6 +220,15 @@ function applyRoleBasedAccess(role) {
 
 // Add Logout function globally for the UI
 window.logoutUser = async function () {
+    try {
+        // Revoke server-side (also clears the session cookie)
+        await fetch('/api/auth/logout', {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${sessionStorage.getItem('accessToken') || ''}` }
+        });
+    } catch (e) {
+        console.error("Error revoking API session", e);
+    }
     try {
         if (window.supabaseClient) {
             await window.supabaseClient.auth.signOut();
@@ -23,6 +23,14 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initial fetch
     refreshDashboard();
 
+    // Live updates: invoice writes anywhere pull just the delta
+    if (window.subscribeEvents) {
+        subscribeEvents({
+            invoices: () => refreshDashboard(),
+            resync: () => refreshDashboard(true),
+        });
+    }
+
     // Setup KPI Click Handlers
     document.querySelectorAll('.kpi-card').forEach(card => {
         card.style.cursor = 'pointer';
@@ -43,27 +51,51 @@ function updateText(id, text) {
     if (el) el.innerText = text;
 }
 
-async function refreshDashboard() {
+// Delta sync state (see fetchChanges / mergeChanges in static/api.js)
+const DASHBOARD_LIMIT = 200;  // same window as GET /api/invoices/
+let dashboardCursor = null;
+let dashboardCursorId = null;
+
+async function refreshDashboard(full = false) {
     try {
-        const res = await apiFetch('/api/invoices/');
+        // After the first load only changed rows travel: kilobytes instead of the whole list
+        if (!full && dashboardCursor && typeof fetchChanges === 'function') {
+            const feed = await fetchChanges('/api/invoices/changes', dashboardCursor, dashboardCursorId);
+            if (feed) {
+                allInquiries = mergeChanges(allInquiries, feed, { limit: DASHBOARD_LIMIT });
+                dashboardCursor = feed.cursor;
+                dashboardCursorId = feed.cursorId;
+                renderDashboardData();
+                return;
+            }
+        }
+
+        const res = await apiFetch(`/api/invoices/?limit=${DASHBOARD_LIMIT}`);
         if (!res.ok) throw new Error('Failed to fetch data');
 
         const data = await res.json();
         allInquiries = data || [];
-
-        updateKPIs();
-        renderRecentActivity();
-        if (typeof renderChart === 'function') renderChart(allInquiries);
-
-        // Initial render for the Active tab (Allocation)
-        renderTable(allInquiries);
-        renderDashboardAllocationTable(allInquiries);
+        if (typeof syncCursor === 'function') {
+            dashboardCursor = syncCursor(allInquiries);
+            dashboardCursorId = null;
+        }
+        renderDashboardData();
 
     } catch (err) {
         console.error("Dashboard Error:", err);
     }
 }
 
+function renderDashboardData() {
+    updateKPIs();
+    renderRecentActivity();
+    if (typeof renderChart === 'function') renderChart(allInquiries);
+
+    // Initial render for the Active tab (Allocation)
+    renderTable(allInquiries);
+    renderDashboardAllocationTable(allInquiries);
+}
+
 function deriveStatus(item) {
     const inquiryStatus = item.shift_status || 'Pending';
     const paymentMade = item.payment_made === true || item.payment_made === 'true';
@@ -525,48 +557,25 @@ async function navigateToAllocation(id) {
 
 
 function exportCSV() {
-    // Filter data based on date range inputs if present
+    // Streamed server-side (/api/invoices/export) so large date ranges never load into the tab
     const start = document.getElementById('filterStartDate')?.value;
     const end = document.getElementById('filterEndDate')?.value;
 
-    let dataToExport = allInquiries;
-
-    if (start && end) {
-        const dStart = new Date(start);
-        const dEnd = new Date(end);
-        dataToExport = allInquiries.filter(i => {
-            const d = new Date(i.date);
-            return d >= dStart && d <= dEnd;
-        });
-    }
+    const params = new URLSearchParams({
+        format: 'csv',
+        fields: 'date,customer_name,customer_mobile,service,plan,service_status,amount',
+        labels: 'Call Date,Name,Mobile,Service Required,Sub Service,Status,Rate Agreed',
+        serial: 'Serial No',
+        date_column: 'date'
+    });
+    if (start) params.set('date_from', start);
+    if (end) params.set('date_to', end);
 
-    if (dataToExport.length === 0) return alert("No data to export");
-
-    // Build CSV
-    const headers = ["Serial No", "Call Date", "Name", "Mobile", "Service Required", "Sub Service", "Status", "Rate Agreed"];
-    const rows = dataToExport.map((i, idx) => [
-        idx + 1,
-        i.date,
-        `"${i.customer_name || ''}"`, // Quote strings
-        i.customer_mobile,
-        i.service,
-        `"${i.plan || ''}"`,
-        i.service_status,
-        i.amount
-    ]);
-
-    const csvContent = [
-        headers.join(','),
-        ...rows.map(r => r.join(','))
-    ].join('\n');
-
-    // Download
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
     const link = document.createElement("a");
-    const url = URL.createObjectURL(blob);
-    link.setAttribute("href", url);
+    link.setAttribute("href", `/api/invoices/export?${params.toString()}`);
     link.setAttribute("download", `vesak_report_${new Date().toISOString().slice(0, 10)}.csv`);
     link.style.visibility = 'hidden';
+    document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
 }
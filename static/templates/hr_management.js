@@ -713,13 +713,10 @@ async function saveLeaveRecord(empId) {
     const leaveDatesStr = document.getElementById(`leave-dates-${empId}`)?.value || '';
     const leaveDates = leaveDatesStr.split(',').map(d => d.trim()).filter(d => d);
     const overtimeDays = parseInt(document.getElementById(`overtime-${empId}`)?.value) || 0;
-    const emp = allEmployees.find(e => e.id === empId);
-    const ctc = emp?.earnings_per_month || 0;
-    const dailyRate = ctc / 30;
     const workingDays = 26;
-    const netSalary = dailyRate * (workingDays - leaveDates.length + overtimeDays);
 
     try {
+        // Daily rate and net salary are computed server-side from the employee's CTC
         const res = await apiFetch('/api/employee-leaves/', {
             method: 'POST',
             body: JSON.stringify({
@@ -727,13 +724,12 @@ async function saveLeaveRecord(empId) {
                 month_year: monthYear,
                 leave_dates: leaveDates,
                 overtime_days: overtimeDays,
-                working_days: workingDays,
-                daily_rate: Math.round(dailyRate * 100) / 100,
-                net_salary: Math.round(netSalary * 100) / 100
+                working_days: workingDays
             })
         });
         if (res.ok) {
-            alert('Leave record saved. Net Salary: ₹' + Math.round(netSalary).toLocaleString('en-IN'));
+            const saved = (await res.json()).data?.[0] || {};
+            alert('Leave record saved. Net Salary: ₹' + Math.round(saved.net_salary || 0).toLocaleString('en-IN'));
             loadLeaveData(empId);
         } else {
             alert('Failed to save leave record');
@@ -800,34 +796,21 @@ async function fetchEmployeeServiceHistory(empId, empName) {
     if (!container) return;
 
     try {
-        // Query invoices/inquiries where this staff was assigned
-        // Note: Using nurse_name as the link (as per current schema logic)
-        const res = await apiFetch(`/api/invoices/search?query=${encodeURIComponent(empName)}`);
+        // Invoice-linked earnings come from the server-side payroll for the current month
+        const monthYear = new Date().toISOString().slice(0, 7);
+        const res = await apiFetch(`/api/payroll/${monthYear}?employee_id=${encodeURIComponent(empId)}`);
         if (res.ok) {
-            const history = await res.json();
-            if (history.length === 0) {
-                container.innerHTML = '<div class="text-gray-400 italic">No historical service records found.</div>';
+            const row = (await res.json()).employees[0];
+            if (!row || row.invoice_count === 0) {
+                container.innerHTML = '<div class="text-gray-400 italic">No service assignments this month.</div>';
                 return;
             }
-
-            let html = '<div class="space-y-2">';
-            history.slice(0, 5).forEach(item => {
-                const serviceDesc = getDescriptiveServiceName(item.plan, item.service, item.shift);
-                html += `
-                    <div class="flex justify-between items-start border-b border-gray-100 pb-1">
-                        <div class="flex flex-col">
-                            <span class="font-bold text-gray-800">${item.customer_name}</span>
-                            <span class="text-[10px] text-royal-blue font-medium">${serviceDesc}</span>
-                        </div>
-                        <span class="text-[9px] text-gray-400 font-mono">${item.date}</span>
-                    </div>
-                `;
-            });
-            if (history.length > 5) {
-                html += `<div class="text-[9px] text-royal-blue font-bold mt-1 text-center">+ ${history.length - 5} more assignments</div>`;
-            }
-            html += '</div>';
-            container.innerHTML = html;
+            container.innerHTML = `
+                <div class="flex justify-between items-start border-b border-gray-100 pb-1">
+                    <span class="font-bold text-gray-800">${row.invoice_count} assignments in ${monthYear}</span>
+                    <span class="text-[10px] font-bold text-green-600">₹${Math.round(row.invoice_earnings).toLocaleString('en-IN')}</span>
+                </div>
+            `;
         }
     } catch (err) {
         container.innerHTML = '<div class="text-red-400">Failed to load logs.</div>';
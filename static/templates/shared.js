@@ -17,7 +17,9 @@ window.apiFetch = async function (url, options = {}) {
     }
 
     // Add default JSON content type if missing and body exists
-    if (options.body && !options.headers['Content-Type']) {
+    // (FormData / Blob bodies carry their own, e.g. the multipart boundary)
+    const ownType = options.body instanceof FormData || options.body instanceof Blob;
+    if (options.body && !ownType && !options.headers['Content-Type']) {
         options.headers['Content-Type'] = 'application/json';
     }
 
@@ -29,6 +31,52 @@ window.apiFetch = async function (url, options = {}) {
     return fetch(url, options);
 };
 
+/**
+ * Idempotency-Key for a create request. The same body gets the same key until
+ * settleIdempotencyKey(body) is called after a response, so a double click or a
+ * retry after a network error returns the first result instead of a duplicate.
+ * Keys live on window: index.html loads this file twice, so no top-level const.
+ */
+window.pendingIdempotencyKeys = window.pendingIdempotencyKeys || new Map();
+window.idempotencyKey = function (body) {
+    const pending = window.pendingIdempotencyKeys;
+    if (!pending.has(body)) {
+        const key = window.crypto?.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        pending.set(body, key);
+    }
+    return pending.get(body);
+};
+window.settleIdempotencyKey = function (body) {
+    window.pendingIdempotencyKeys.delete(body);
+};
+
+/**
+ * Live change notifications from /api/events (server-sent events).
+ * handlers: { invoices, rates, locations, resync } -> functions. Bursts of
+ * events are debounced per topic. The browser reconnects by itself and resumes
+ * from the last event id; `resync` (missed events) falls back to every handler.
+ * Authenticated by the session cookie, since EventSource cannot send headers.
+ */
+window.subscribeEvents = function (handlers, { debounceMs = 300 } = {}) {
+    if (typeof EventSource === 'undefined') return null;
+    const topics = Object.keys(handlers).filter(t => t !== 'resync');
+    const source = new EventSource(`/api/events?topics=${topics.join(',')}`, { withCredentials: true });
+    const timers = {};
+    const schedule = (key, fn) => {
+        clearTimeout(timers[key]);
+        timers[key] = setTimeout(fn, debounceMs);
+    };
+    topics.forEach(topic => source.addEventListener(topic, () => schedule(topic, handlers[topic])));
+    source.addEventListener('resync', () => {
+        if (handlers.resync) schedule('resync', handlers.resync);
+        else topics.forEach(topic => schedule(topic, handlers[topic]));
+    });
+    window.addEventListener('beforeunload', () => source.close());
+    return source;
+};
+
 function escapeHtml(str) {
     if (!str) return '';
     return String(str)